@@ -1,5 +1,19 @@
+import contextvars
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from utils import log
+from stage_graph import StageGraph, StageError
+from gazetteer import Gazetteer, DEFAULT_GAZETTEER_PATH
+from remote_inference import RemoteNliClient, RemoteInferenceError, rule_nli_logits
+from compiled_nli import CompiledNliRunner
+from intent_config import IntentConfig
+from intent_tree import descend
+from profiler import run_stage, profile_torch
+from utterance import Utterance
+from thread_profile import load_profile, apply_runtime
+from dialogue_session import SessionStore
 import pandas as pd
 from keybert import KeyBERT
 import json
@@ -12,6 +26,45 @@ from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassifica
 import re
 import torch
 
+"""
+    NLI 순전파 (배치)
+
+    Args:
+        tokenizer, model: NLI 토크나이저/모델
+        pairs: [(premise, hypothesis), ...]
+        max_length: 문장쌍 총 길이 상한
+
+    Returns:
+        [[contradiction, neutral, entailment], ...] 로짓 목록
+"""
+def nli_forward(tokenizer, model, pairs: list, max_length: int) -> list:
+    inputs = tokenizer(
+        [premise for premise, _ in pairs],       # premise: 사용자 원문 텍스트
+        [hypothesis for _, hypothesis in pairs], # hypothesis: 레이블별 가설 문장
+        return_tensors="pt",                     # PyTorch 텐서로 반환
+        truncation=True,                         # 최대 길이를 초과하면 잘라낸다
+        max_length=max_length,                   # 문장쌍 총 길이 상한(모델 한계에 맞춤)
+        padding=True                             # 배치 내 가장 긴 쌍에 맞춰 패딩
+    )
+
+    with torch.no_grad():                        # 추론 모드(gradient 비계산)로 메모리/속도 절약
+        return model(**inputs).logits.tolist()   # NLI 모델 전향 패스(forward) 한 번으로 전체 쌍 처리
+
+
+# 요청 처리 중 고정된 Intent 설정 스냅샷 (engine, IntentConfig).
+# StageGraph가 컨텍스트를 복사해 단계 스레드에도 전달하므로, 처리 중 리로드가 일어나도 같은 버전을 사용
+_pinned_config = contextvars.ContextVar("pinned_intent_config", default=None)
+
+_WHITESPACE = re.compile(r'\s+')
+
+# 후속 발화의 상대 볼륨 표현: "더 크게", "10 더 올려", "볼륨 줄여"
+#   (크게/작게는 "더"가 있을 때만 상대 조정. "크게"만 있으면 기존 규칙대로 최대)
+_RELATIVE_VOLUME = re.compile(
+    r'(?:(\d{1,3})\s*(?:만큼\s*)?)?(?:더\s*(크게|작게)|(?:더\s*)?(키워|올려|높여|줄여|낮춰|내려))'
+)
+_VOLUME_UP = ("크게", "키워", "올려", "높여")
+
+
 """
     범용 제어 시스템 NLU 엔진
 
@@ -22,6 +75,27 @@ import torch
 """
 class UniversalNluEngine:
     MAX_LENGTH = 128
+    STAGE_WORKERS = 4        # parse_text 단계 병렬 실행용 스레드 수 (요청 간 공유)
+    ZERO_SHOT_TEMPLATE = "This example is {}."   # transformers zero-shot 파이프라인 기본 가설 템플릿
+
+    # 시간 예산(budget_ms) 계획용 단계 비용 초기 추정치 (ms, XLM-R Large / CPU 기준).
+    # 실제 실행 시간을 지수 이동 평균으로 반영해 계속 갱신
+    DEFAULT_STAGE_COST_MS = {
+        "keywords": 80.0,            # KeyBERT 임베딩 1회
+        "intent_per_label": 150.0,   # Intent 후보 1개당 NLI
+        "slot_nlu": 300.0,           # 슬롯 1개 NLU 분류
+    }
+    COST_EWMA_ALPHA = 0.2
+    MIN_INTENT_CANDIDATES = 2        # 후보 축소 시 최소 후보 수
+
+    INTENT_TREE_MIN_CANDIDATES = 8   # 후보가 이 수 이상이면 계층형 트리로 분류 (intent_tree 사용 시)
+    INTENT_TREE_BEAM = 2             # 트리 단계별로 남길 노드 수
+
+    ANYTIME_THRESHOLD = 0.8          # anytime 모드 조기 종료 함의 확률 임계값
+    ANYTIME_AUDIT_EVERY = 20         # 조기 종료 N번마다 1번 전체 평가로 일치율 확인
+
+    SESSION_TTL_S = 120.0            # 대화 세션 유지 시간 (마지막 명령 기준, 초)
+    RELATIVE_VOLUME_STEP = 10        # "더 크게" / "더 작게" 한 번에 바꿀 볼륨 폭
     """
         NLU 엔진 초기화
 
@@ -34,16 +108,37 @@ class UniversalNluEngine:
             - 모델: XLM-RoBERTa Large + XNLI
             - 키워드 추출: KeyBERT (다국어 지원)
             - 잡음 필터: 한국어 불용어 리스트
+            - 장소 사전: stations.json 가제티어 (Aho-Corasick)
+            - 원격 추론: remote_url (또는 NLU_REMOTE_URL) 지정 시 NLI를 추론 서버로 오프로드하고,
+                         로컬에는 경량 폴백 모델(fallback_model_dir / NLU_FALLBACK_MODEL)만 로드.
+                         폴백 모델도 없으면 규칙 기반 점수로 동작
+            - 컴파일 모드: compile_mode (또는 NLU_COMPILE_MODE) = "trace" | "compile" 지정 시
+                         로컬 NLI를 고정 길이 버킷 그래프로 실행 (시작 시 전 버킷 워밍업,
+                         NLU_COMPILE_BENCHMARK=1이면 버킷별 eager 대비 지연도 측정)
+            - Intent 설정: 아래 기본값 대신 intent_config_path (또는 INTENT_CONFIG_PATH) JSON 사용 가능.
+                         실행 중 reload_config()로 모델 재로딩 없이 교체
+            - 계층형 분류: intent_tree=True (또는 NLU_INTENT_TREE=1) 지정 시 후보가 많으면
+                         도메인 트리를 빔 탐색으로 내려가며 분류 (모델 호출 수가 Intent 수에 비례하지 않음)
+            - anytime 모드: anytime=True (또는 NLU_ANYTIME=1) 지정 시 가설을 과거 선택 빈도 순으로 하나씩 평가하고
+                         함의 확률이 임계값 이상이면 나머지 가설은 평가하지 않음 (_select_hypothesis, Intent 분류에는 미적용)
+            - 스레드 프로파일: tune_threads.py가 저장한 thread_profile.json (또는 thread_profile_path /
+                         NLU_THREAD_PROFILE)이 있으면 모델 로드 전에 torch 스레드 수 등을 적용
+            - 대화 세션: parse_text(session_id=...)로 호출하면 클라이언트별 마지막 Intent/슬롯을 기억하고
+                         슬롯 값만 말한 후속 발화("볼륨 더 크게", "이번엔 방류로")는 Intent 분류 없이 해석
+                         (유지 시간: session_ttl 또는 NLU_SESSION_TTL 초)
     """
-    def __init__(self):
-        self.SCENARIO_TO_FILE = {
+    def __init__(self, gazetteer_path: str = DEFAULT_GAZETTEER_PATH, remote_url: str = None,
+                 fallback_model_dir: str = None, remote_timeout: float = 1.0, compile_mode: str = None,
+                 intent_config_path: str = None, intent_tree: bool = None, anytime: bool = None,
+                 thread_profile_path: str = None, session_ttl: float = None):
+        scenario_to_file = {
             "시험": "A.wav",
             "방류": "B.wav",
         }
 
         # Command 레벨 가설 상세
         # Command 레벨 가설 상세
-        self.COMMAND_HYPOTHESES = {
+        command_hypotheses = {
             # 1) 경보 방송
             "alert.broadcast": {
                 "description": "경보국 방송 수행. 시나리오(시험/방류)와 볼륨을 슬롯으로 추출.",
@@ -109,17 +204,149 @@ class UniversalNluEngine:
             },
         }
 
+        # 도메인(Intent 이름의 첫 마디) 가설 - 계층형 분류의 첫 단계
+        domain_hypotheses = {
+            "alert": "이 명령은 경보 방송이나 안내 방송을 내보내는 작업입니다.",
+            "data": "이 명령은 관측소의 수위, 우량 같은 데이터를 조회하는 작업입니다.",
+            "device": "이 명령은 장비나 센서의 상태를 점검하는 작업입니다.",
+        }
+
+        # Intent 설정 스냅샷 (설정 파일이 있으면 기본값 대신 사용)
+        self.config = IntentConfig(command_hypotheses, scenario_to_file, domain_hypotheses=domain_hypotheses)
+        self._config_lock = threading.Lock()
+        self.intent_config_path = intent_config_path or os.getenv("INTENT_CONFIG_PATH")
+        if self.intent_config_path and os.path.exists(self.intent_config_path):
+            self.config = IntentConfig.load(self.intent_config_path, previous=self.config)
+
+        if intent_tree is None:
+            intent_tree = os.getenv("NLU_INTENT_TREE", "0") == "1"
+        self.use_intent_tree = intent_tree
+
+        # 분류기(family)별 레이블 선택 횟수와 anytime 조기 종료 통계
+        if anytime is None:
+            anytime = os.getenv("NLU_ANYTIME", "0") == "1"
+        self.anytime = anytime
+        self.label_counts = {}
+        self.anytime_stats = {}
+        self._label_lock = threading.Lock()
+
+        # 클라이언트별 대화 세션 (후속 명령 문맥)
+        if session_ttl is None:
+            session_ttl = float(os.getenv("NLU_SESSION_TTL", str(self.SESSION_TTL_S)))
+        self.sessions = SessionStore(ttl=session_ttl)
+
         # 잡음 키워드
         self.NOISE = ["음", "어", "으", "아", "이제", "좀", "약간", "그", "저", "뭐", "뭐시기",
                       "그거", "저거", "이거", "있잖아", "있잖아요", "요", "잠깐", "빨리"]
+        self._noise_patterns = [(n, re.compile(r'\b' + re.escape(n) + r'\b')) for n in self.NOISE]
+
 
+        # 장비별 스레드 프로파일 (torch inter-op 스레드는 첫 연산 전에만 바꿀 수 있으므로 모델 로드 전에 적용)
+        self.thread_profile = load_profile(thread_profile_path) or {}
+        if self.thread_profile:
+            apply_runtime(self.thread_profile)
+        self.nli_batch_size = self.thread_profile.get("nli_batch_size")
 
         log("🤖 AI 모델 로딩 중...")
         model_dir = r"D:\models\xlmR_xnli"
 
+        # 원격 추론 서버 (지정 시 무거운 NLI는 원격에서 수행)
+        remote_url = remote_url or os.getenv("NLU_REMOTE_URL")
+        self.remote = RemoteNliClient(remote_url, timeout=remote_timeout) if remote_url else None
+
+        # 원격 모드에서는 대형 모델 대신 경량 폴백 모델만 로컬에 로드
+        if self.remote is not None:
+            local_model_dir = fallback_model_dir or os.getenv("NLU_FALLBACK_MODEL")
+            log(f"🌐 원격 추론 사용: {remote_url} (로컬 폴백: {local_model_dir or '규칙 기반'})")
+        else:
+            local_model_dir = model_dir
+
+        self.classifier = self._load_classifier(local_model_dir) if local_model_dir else None
+
+        # 로컬 NLI 컴파일 실행기 (버킷별 그래프를 미리 워밍업 → 첫 요청도 정상 지연)
+        compile_mode = compile_mode or os.getenv("NLU_COMPILE_MODE")
+        self.compiled = None
+        self.compiled_report = None
+        if compile_mode and self.classifier is not None:
+            self.compiled = CompiledNliRunner(self.classifier.tokenizer, self.classifier.model, mode=compile_mode)
+            self.compiled.warmup()
+            # 버킷별 eager 대비 지연 측정은 오래 걸리므로 요청 시에만 (NLU_COMPILE_BENCHMARK=1)
+            if os.getenv("NLU_COMPILE_BENCHMARK", "0") == "1":
+                self.compiled_report = self.compiled.benchmark()
+
+        # KeyBERT 키워드 추출기 초기화
+        # - 모델: DistilUSE (다국어 문장 임베딩)
+        # - 용도: 중요 키워드 자동 추출
+        self.keyword_extractor = KeyBERT('distiluse-base-multilingual-cased-v2')
+
+        # 시설명 가제티어 (댐/교/국 이름 + 별칭을 한 번의 스캔으로 검색)
+        self.gazetteer = Gazetteer.load(gazetteer_path)
+
+        # parse_text 단계 실행기 (키워드 추출 / Intent 분류 / 정규식 슬롯을 겹쳐 실행)
+        self.stage_executor = ThreadPoolExecutor(
+            max_workers=self.thread_profile.get("stage_workers") or self.STAGE_WORKERS,
+            thread_name_prefix="nlu-stage",
+        )
+        # 실행기별 사용 중인 parse_text 수 (교체된 실행기는 마지막 사용자가 끝날 때 종료)
+        self._stage_executor_users = {}
+        self._stage_executor_lock = threading.Lock()
+
+        # 단계별 관측 비용 (시간 예산 계획용)
+        self.stage_cost_ms = dict(self.DEFAULT_STAGE_COST_MS)
+
+        log("✅ AI 모델 로딩 완료!")
+
+    def _active_config(self) -> IntentConfig:
+        """처리 중인 요청에 고정된 설정 스냅샷 (요청 밖에서는 현재 설정)"""
+        pinned = _pinned_config.get()
+        if pinned is not None and pinned[0] is self:
+            return pinned[1]
+        return self.config
+
+    @property
+    def COMMAND_HYPOTHESES(self) -> dict:
+        return self._active_config().command_hypotheses
+
+    @property
+    def SCENARIO_TO_FILE(self) -> dict:
+        return self._active_config().scenario_to_file
+
+    def reload_config(self, path: str = None, data: dict = None) -> dict:
+        """
+        Intent 설정 핫 리로드 (모델은 그대로 유지)
+
+        Args:
+            path: 설정 JSON 경로 (생략 시 intent_config_path)
+            data: 설정 dict (지정 시 파일 대신 사용)
+
+        Returns:
+            dict: {"version", "rebuilt", "removed"}
+
+        Raises:
+            ValueError: 설정 오류 (기존 설정 유지)
+        """
+        with self._config_lock:
+            previous = self.config
+            if data is not None:
+                config = IntentConfig.from_dict(data, previous=previous)
+            else:
+                path = path or self.intent_config_path
+                if not path:
+                    raise ValueError("Intent 설정 파일 경로가 없습니다.")
+                config = IntentConfig.load(path, previous=previous)
+
+            # 참조 교체 한 번으로 원자적 전환 (진행 중인 요청은 이전 스냅샷으로 계속 처리)
+            self.config = config
+
+        log(f"🔄 Intent 설정 교체: v{previous.version} → v{config.version} "
+            f"(재구성 {config.rebuilt}, 삭제 {config.removed})")
+        return {"version": config.version, "rebuilt": config.rebuilt, "removed": config.removed}
+
+    @staticmethod
+    def _load_classifier(model_dir: str):
         # 옵션 2: 한국어 특화 모델 (KoBERT 기반)
         # Zero-Shot Classification 파이프라인 생성
-        self.classifier = pipeline(
+        return pipeline(
             "zero-shot-classification",               # 작업 타입: 제로샷 분류
             model=AutoModelForSequenceClassification.from_pretrained(
                 model_dir,                                 # 모델 경로
@@ -132,12 +359,104 @@ class UniversalNluEngine:
             ),
         )
 
-        # KeyBERT 키워드 추출기 초기화
-        # - 모델: DistilUSE (다국어 문장 임베딩)
-        # - 용도: 중요 키워드 자동 추출
-        self.keyword_extractor = KeyBERT('distiluse-base-multilingual-cased-v2')
+    """
+        NLI 로짓 계산 (원격 → 로컬 폴백)
 
-        log("✅ AI 모델 로딩 완료!")
+        Args:
+            pairs: [(premise, hypothesis), ...]
+            max_length: 문장쌍 총 길이 상한
+
+        Returns:
+            [[contradiction, neutral, entailment], ...]
+    """
+    def _nli_logits(self, pairs: list, max_length: int) -> list:
+        if self.remote is not None:
+            try:
+                return self.remote.logits(pairs, max_length)
+            except RemoteInferenceError as e:
+                log(f"  [원격 추론 실패 → 로컬 폴백] {e}")
+
+        if self.classifier is None:
+            return [rule_nli_logits(premise, hypothesis) for premise, hypothesis in pairs]
+
+        # 스레드 프로파일의 배치 크기로 나눠 순전파 (None이면 한 번에)
+        batch = self.nli_batch_size or len(pairs)
+        logits = []
+        for i in range(0, len(pairs), batch):
+            chunk = pairs[i:i + batch]
+            if self.compiled is not None:
+                logits.extend(profile_torch(self.compiled.logits, chunk, max_length))
+            else:
+                logits.extend(profile_torch(nli_forward, self.classifier.tokenizer, self.classifier.model, chunk, max_length))
+        return logits
+
+    def set_stage_workers(self, workers: int):
+        """parse_text 단계 실행 스레드 수 변경 (진행 중인 요청은 이전 실행기에서 끝까지 실행)"""
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nlu-stage")
+        with self._stage_executor_lock:
+            previous = self.stage_executor
+            self.stage_executor = executor
+            idle = previous not in self._stage_executor_users
+        if idle:
+            previous.shutdown(wait=False)
+
+    def _acquire_stage_executor(self) -> ThreadPoolExecutor:
+        """요청 하나가 끝까지 쓸 단계 실행기 (교체되어도 release 전까지 종료되지 않음)"""
+        with self._stage_executor_lock:
+            executor = self.stage_executor
+            self._stage_executor_users[executor] = self._stage_executor_users.get(executor, 0) + 1
+            return executor
+
+    def _release_stage_executor(self, executor: ThreadPoolExecutor):
+        with self._stage_executor_lock:
+            self._stage_executor_users[executor] -= 1
+            if self._stage_executor_users[executor]:
+                return
+            del self._stage_executor_users[executor]
+            retired = executor is not self.stage_executor
+        if retired:
+            executor.shutdown(wait=False)
+
+    """
+        가설별 함의(entailment) 확률
+
+        Args:
+            text: premise (사용자 입력)
+            hypotheses: 가설 문장 목록
+
+        Returns:
+            가설 순서대로의 함의 확률 목록
+    """
+    def _entailment_probs(self, text: str, hypotheses: list, max_length: int = MAX_LENGTH) -> list:
+        logits = torch.tensor(self._nli_logits([(text, h) for h in hypotheses], max_length))
+        probs = torch.softmax(logits, dim=-1)      # 로짓을 소프트맥스로 확률로 변환
+        return probs[:, -1].tolist()               # 마지막 인덱스를 함의(entailment)로 가정해 확률 추출
+
+    """
+        Zero-Shot 분류 (transformers 파이프라인과 같은 형식의 결과)
+
+        - 로컬 eager 모델만 쓸 때는 파이프라인을 그대로 호출
+          (문장쌍 배치 크기는 _nli_logits와 같이 스레드 프로파일의 nli_batch_size, 없으면 레이블 전부를 한 번에)
+        - 원격/규칙 경로에서는 레이블별 함의 로짓을 레이블끼리 softmax (multi_label=False 와 동일)
+
+        Returns:
+            {"labels": [...], "scores": [...]} (점수 내림차순)
+    """
+    def _zero_shot(self, text: str, labels: list) -> dict:
+        if self.remote is None and self.classifier is not None and self.compiled is None:
+            return profile_torch(self.classifier, text, candidate_labels=labels, multi_label=False,
+                                 batch_size=self.nli_batch_size or len(labels))
+
+        hypotheses = [self.ZERO_SHOT_TEMPLATE.format(label) for label in labels]
+        logits = torch.tensor(self._nli_logits([(text, h) for h in hypotheses], self.MAX_LENGTH))
+        scores = torch.softmax(logits[:, -1], dim=0).tolist()
+
+        ranked = sorted(zip(labels, scores), key=lambda x: x[1], reverse=True)
+        return {
+            "sequence": text,
+            "labels": [label for label, _ in ranked],
+            "scores": [score for _, score in ranked],
+        }
 
     """
         상태 체크 타입 분류
@@ -152,7 +471,7 @@ class UniversalNluEngine:
             "all": "이 명령은 전체 시스템 상태를 종합적으로 확인합니다."
         }
 
-        return self._classify_with_hypotheses(text, hypotheses)
+        return self._classify_with_hypotheses(text, hypotheses, family="check_type")
 
     """
         데이터 타입 분류
@@ -167,7 +486,7 @@ class UniversalNluEngine:
             "all": "이 명령은 모든 종류의 센서 데이터를 포함합니다."
         }
 
-        return self._classify_with_hypotheses(text, hypotheses)
+        return self._classify_with_hypotheses(text, hypotheses, family="data_type")
 
     """
         공통 분류 헬퍼 함수
@@ -175,76 +494,175 @@ class UniversalNluEngine:
         Args:
             text: 입력 텍스트
             hypotheses: {label: hypothesis} 딕셔너리
+            family: 레이블 선택 빈도를 따로 셀 분류기 이름
     
         Returns:
             최고 점수 레이블
     """
-    def _classify_with_hypotheses(self, text: str, hypotheses: dict) -> str:
-        tokenizer = self.classifier.tokenizer
-        model = self.classifier.model
+    def _classify_with_hypotheses(self, text: str, hypotheses: dict, family: str = "generic") -> str:
+        best_label, _ = self._select_hypothesis(family, text, hypotheses, max_length=512)
+        return best_label
 
-        scores = []
+    def _select_hypothesis(self, family: str, text: str, hypotheses: dict, max_length: int = MAX_LENGTH) -> tuple:
+        """
+        가설 중 함의 확률이 가장 높은 레이블 선택
 
-        for label, hypothesis in hypotheses.items():
-            inputs = tokenizer(
-                text,
-                hypothesis,
-                return_tensors="pt",
-                truncation=True,
-                max_length=512
-            )
+        - 기본: 전체 가설을 한 번의 배치로 평가
+        - anytime 모드: 과거 선택 빈도가 높은 레이블부터 하나씩 평가하다가
+          함의 확률이 임계값(ANYTIME_THRESHOLD) 이상인 첫 레이블에서 조기 종료
+          (가설마다 독립 softmax라 확률 합이 1이 아니므로 남은 가설의 상한은 없음 → 아직 평가하지 않은
+          가설이 더 높을 수 있고, 그 위험은 주기적 전체 평가(ANYTIME_AUDIT_EVERY)의 일치율로 확인)
+        - 사용처: 상태 체크/데이터 종류/명령/대상 범위/장소 분류기. parse_text의 Intent 분류(_classify_intent)는
+          레이블 간 softmax라 전체 가설이 필요하므로 anytime 모드와 무관
 
-            with torch.no_grad():
-                outputs = model(**inputs)
-                logits = outputs.logits[0]
-                probs = torch.softmax(logits, dim=0)
-                entailment_prob = probs[-1].item()
+        Args:
+            family: 분류기 이름 (선택 빈도/통계 구분용)
+            text: premise
+            hypotheses: {label: hypothesis}
 
-            scores.append((label, entailment_prob))
+        Returns:
+            (best_label, scores) - scores: 평가한 [(label, prob), ...] (확률 내림차순)
+        """
+        labels = list(hypotheses)
+        if self.anytime and len(labels) > 1:
+            scores = self._anytime_scores(family, text, hypotheses, max_length)
+        else:
+            probs = self._entailment_probs(text, [hypotheses[label] for label in labels], max_length)
+            scores = list(zip(labels, probs))
 
         scores.sort(key=lambda x: x[1], reverse=True)
-        return scores[0][0]
+        best_label = scores[0][0]
+        with self._label_lock:
+            counts = self.label_counts.setdefault(family, {})
+            counts[best_label] = counts.get(best_label, 0) + 1
+        return best_label, scores
+
+    def _anytime_scores(self, family: str, text: str, hypotheses: dict, max_length: int) -> list:
+        counts = self.label_counts.get(family, {})
+        order = sorted(hypotheses, key=lambda label: counts.get(label, 0), reverse=True)
+
+        scores = []
+        early = False
+        for label in order:
+            prob = self._entailment_probs(text, [hypotheses[label]], max_length)[0]
+            scores.append((label, prob))
+            if len(scores) < len(order) and prob >= self.ANYTIME_THRESHOLD:
+                early = True
+                break
+
+        with self._label_lock:
+            stats = self.anytime_stats.setdefault(family, {
+                "calls": 0, "early_exits": 0, "scored": 0, "total": 0, "audits": 0, "agreements": 0,
+            })
+            stats["calls"] += 1
+            stats["early_exits"] += early
+            stats["scored"] += len(scores)
+            stats["total"] += len(order)
+            audit = early and stats["early_exits"] % self.ANYTIME_AUDIT_EVERY == 1
+
+        # 조기 종료 결과를 주기적으로 전체 평가와 비교 (첫 조기 종료 포함)
+        if audit:
+            probs = self._entailment_probs(text, [hypotheses[label] for label in order], max_length)
+            full_best = order[max(range(len(order)), key=probs.__getitem__)]
+            early_best = max(scores, key=lambda x: x[1])[0]
+            with self._label_lock:
+                stats["audits"] += 1
+                stats["agreements"] += full_best == early_best
+
+        log(f"  [anytime:{family}] 가설 {len(scores)}/{len(order)}개 평가" + (" (조기 종료)" if early else ""))
+        return scores
+
+    def anytime_report(self) -> dict:
+        """분류기별 조기 종료율 / 평균 평가 가설 수 / 전체 평가와의 일치율"""
+        with self._label_lock:
+            snapshot = {family: dict(stats) for family, stats in self.anytime_stats.items()}
+
+        return {
+            family: {
+                "calls": stats["calls"],
+                "early_exit_rate": round(stats["early_exits"] / stats["calls"], 4),
+                "avg_scored": round(stats["scored"] / stats["calls"], 2),
+                "avg_total": round(stats["total"] / stats["calls"], 2),
+                "audits": stats["audits"],
+                "agreement": round(stats["agreements"] / stats["audits"], 4) if stats["audits"] else None,
+            }
+            for family, stats in snapshot.items() if stats["calls"]
+        }
 
-    def _classify_intent(self, text: str):
+    def _keyword_candidates(self, text) -> list:
         """
-        Intent 분류: 사용자 입력을 COMMAND_HYPOTHESES의 Intent로 분류
+        키워드 매칭 수 기준 Intent 후보 (매칭 수 내림차순, 매칭 없는 Intent 제외)
 
         Args:
-            text: 사용자 입력 텍스트
+            text: Utterance (결과를 발화에 메모해 예산 계획 / Intent 분류가 공유) 또는 문자열
 
         Returns:
-            str: 분류된 Intent (예: "alert.broadcast.start")
+            list: [(intent, keyword_match_count), ...]
         """
-        # 1단계: 키워드 기반 빠른 필터링
-        candidate_intents = []
+        if isinstance(text, Utterance):
+            return text.memo("keyword_candidates", lambda: self._keyword_candidates(text.text))
+
+        scored = []
+        lowered = text.lower()
 
-        for intent, config in self.COMMAND_HYPOTHESES.items():
-            # 키워드 매칭 점수 계산
+        for intent, derived in self._active_config().derived.items():
+            # 키워드 매칭 점수 계산 (소문자 키워드는 설정 로드 시 미리 준비)
             keyword_match_count = sum(
-                1 for keyword in config["keywords"]
-                if keyword in text.lower()
+                1 for keyword in derived.keywords
+                if keyword in lowered
             )
 
             if keyword_match_count > 0:
-                candidate_intents.append(intent)
+                scored.append((intent, keyword_match_count))
+
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return scored
+
+    def _classify_intent(self, text, max_candidates: int = None, use_model: bool = True, use_tree: bool = None):
+        """
+        Intent 분류: 사용자 입력을 COMMAND_HYPOTHESES의 Intent로 분류
+
+        Args:
+            text: 사용자 입력 (Utterance 또는 정규화된 문자열)
+            max_candidates: NLU 모델에 넘길 최대 후보 수 (시간 예산 부족 시 축소)
+            use_model: False면 키워드 매칭 1위 Intent를 바로 반환 (키워드 매칭이 없을 때만 모델 사용)
+            use_tree: 계층형 트리 사용 여부 (None이면 엔진 설정 intent_tree를 따름)
+
+        Returns:
+            str: 분류된 Intent (예: "alert.broadcast")
+        """
+        # 1단계: 키워드 기반 빠른 필터링 (예산 계획 때 계산한 결과가 있으면 재사용)
+        candidate_intents = [intent for intent, _ in self._keyword_candidates(text)]
+        text = str(text)
+
+        if candidate_intents and not use_model:
+            log(f"  [선택된 Intent - 키워드] {candidate_intents[0]}")
+            return candidate_intents[0]
 
         # 키워드 매칭된 Intent가 없으면 전체 Intent 사용
         if not candidate_intents:
             candidate_intents = list(self.COMMAND_HYPOTHESES.keys())
 
+        if max_candidates:
+            candidate_intents = candidate_intents[:max_candidates]
+
         log(f"  [Intent 후보] {candidate_intents}")
 
+        # 후보가 많으면 계층형 트리로 분류 (도메인 → Intent 순으로 빔 탐색)
+        if use_tree is None:
+            use_tree = self.use_intent_tree
+        if use_tree and len(candidate_intents) >= self.INTENT_TREE_MIN_CANDIDATES:
+            return self._classify_intent_tree(text, candidate_intents)
+
         # 2단계: NLU 모델로 정확한 Intent 분류
         intent_labels = [
             self.COMMAND_HYPOTHESES[intent]["description"]
             for intent in candidate_intents
         ]
 
-        result = self.classifier(
-            text,
-            candidate_labels=intent_labels,
-            multi_label=False
-        )
+        start = time.perf_counter()
+        result = self._zero_shot(text, intent_labels)
+        self._observe_cost("intent_per_label", (time.perf_counter() - start) * 1000 / len(intent_labels))
 
         # 결과를 DataFrame으로 보기 좋게 출력
         df = pd.DataFrame({
@@ -262,6 +680,77 @@ class UniversalNluEngine:
         log(f"  [선택된 Intent] {selected_intent}")
         return selected_intent
 
+    def _classify_intent_tree(self, text: str, candidates: list = None, beam_width: int = None):
+        """
+        계층형 Intent 분류 (도메인 트리 빔 탐색)
+
+        Args:
+            text: 사용자 입력 텍스트
+            candidates: 후보 Intent 목록 (None이면 전체)
+            beam_width: 단계별로 남길 노드 수
+
+        Returns:
+            str: 분류된 Intent
+        """
+        tree = self._active_config().intent_tree
+        intent, score, scored = descend(
+            tree,
+            lambda hypotheses: self._entailment_probs(text, hypotheses),
+            beam_width=beam_width or self.INTENT_TREE_BEAM,
+            allowed=set(candidates) if candidates else None,
+        )
+        log(f"  [선택된 Intent - 트리] {intent} (점수 {score:.4f}, 가설 {scored}개 평가)")
+        return intent
+
+    def evaluate_intent_tree(self, samples: list = None, beam_width: int = None) -> dict:
+        """
+        계층형 분류 vs 운영 평면 분류 정확도/비용 비교
+
+        - 평면: 운영 경로 그대로 (_classify_intent, 키워드 후보 필터 + zero-shot 템플릿 + 레이블 간 softmax, 트리 끔)
+        - 트리: 같은 키워드 후보에 대해 _classify_intent_tree (후보 수와 관계없이 항상 트리 사용)
+
+        Args:
+            samples: [(text, 정답 intent), ...] (생략 시 COMMAND_HYPOTHESES의 examples)
+            beam_width: 트리 빔 폭
+
+        Returns:
+            dict: {"samples", "flat": {"accuracy", "avg_hypotheses"}, "tree": {...}, "agreement"}
+        """
+        if samples is None:
+            samples = [(example, intent) for intent, config in self.COMMAND_HYPOTHESES.items()
+                       for example in config.get("examples", [])]
+
+        flat_correct = tree_correct = agree = flat_scored = tree_scored = 0
+
+        for text, gold in samples:
+            utterance = Utterance(text, self._preprocess(text))
+            candidates = [intent for intent, _ in self._keyword_candidates(utterance)] or list(self.COMMAND_HYPOTHESES)
+
+            flat = self._classify_intent(utterance, use_model=True, use_tree=False)
+            flat_scored += len(candidates)
+
+            tree, _, scored = descend(
+                self._active_config().intent_tree,
+                lambda hyps: self._entailment_probs(utterance.text, hyps),
+                beam_width=beam_width or self.INTENT_TREE_BEAM,
+                allowed=set(candidates),
+            )
+            tree_scored += scored
+
+            flat_correct += flat == gold
+            tree_correct += tree == gold
+            agree += flat == tree
+
+        n = len(samples) or 1
+        report = {
+            "samples": len(samples),
+            "flat": {"accuracy": round(flat_correct / n, 4), "avg_hypotheses": round(flat_scored / n, 2)},
+            "tree": {"accuracy": round(tree_correct / n, 4), "avg_hypotheses": round(tree_scored / n, 2)},
+            "agreement": round(agree / n, 4),
+        }
+        log(f"📊 계층형 vs 평면 분류: {report}")
+        return report
+
     def _extract_slot_with_regex(self, text: str, slot_name: str, pattern: str):
         """
         정규식으로 슬롯 추출 (1차 시도)
@@ -274,31 +763,57 @@ class UniversalNluEngine:
         Returns:
             추출된 값 또는 None
         """
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            value = match.group(1) if match.groups() else match.group(0)
+        value = self._search_pattern(text, pattern)
+        if value is not None:
             log(f"    [정규식 성공] {slot_name} = {value}")
-            return value
+        return value
+
+    def _search_pattern(self, text: str, pattern: str):
+        compiled = self._active_config().slot_patterns.get(pattern)
+        match = compiled.search(text) if compiled is not None else re.search(pattern, text, re.IGNORECASE)
+        if match:
+            return match.group(1) if match.groups() else match.group(0)
         return None
 
-    def _extract_slot_with_nlu(self, text: str, slot_name: str, candidates: list):
+    def _match_slot_patterns(self, text) -> dict:
+        """
+        모든 Intent의 슬롯 정규식을 미리 매칭 (Intent 분류와 무관하므로 병렬 실행 가능)
+
+        Args:
+            text: Utterance (결과를 발화에 메모) 또는 문자열
+
+        Returns:
+            dict: {pattern: 추출값 또는 None}
+        """
+        if isinstance(text, Utterance):
+            return text.memo("slot_patterns", lambda: self._match_slot_patterns(text.text))
+
+        return {
+            pattern: self._search_pattern(text, pattern)
+            for pattern in self._active_config().slot_patterns
+        }
+
+    def _extract_slot_with_nlu(self, text, slot_name: str, candidates: list, use_model: bool = True):
         """
         NLU 모델로 슬롯 추출 (2차 시도)
 
         Args:
-            text: 사용자 입력 텍스트
+            text: 사용자 입력 (Utterance 또는 문자열)
             slot_name: 슬롯 이름
             candidates: 가능한 후보 값 리스트
+            use_model: False면 모델 분류는 건너뜀 (숫자/표현 규칙만 적용, 나머지는 기본값으로)
 
         Returns:
             추출된 값 또는 None
         """
+        utterance = Utterance.of(text)
+        text = utterance.text
+
         # 특수 처리: volume 같은 숫자 슬롯
         if slot_name == "volume":
-            # 텍스트에서 숫자 추출
-            numbers = re.findall(r'\d+', text)
-            if numbers:
-                value = int(numbers[0])
+            # 발화의 숫자 언급 (발화 생성 시 한 번만 추출)
+            if utterance.numbers:
+                value = utterance.numbers[0][0]
                 # 범위 체크 (0~100)
                 if 0 <= value <= 100:
                     log(f"    [NLU-숫자] {slot_name} = {value}")
@@ -325,15 +840,13 @@ class UniversalNluEngine:
         # 문자열 후보만 필터링 (NLU 입력용)
         str_candidates = [str(c) for c in candidates if isinstance(c, str)]
 
-        if not str_candidates:
+        if not str_candidates or not use_model:
             return None
 
         try:
-            result = self.classifier(
-                text,
-                candidate_labels=str_candidates,
-                multi_label=False
-            )
+            start = time.perf_counter()
+            result = self._zero_shot(text, str_candidates)
+            self._observe_cost("slot_nlu", (time.perf_counter() - start) * 1000)
 
             value = result['labels'][0]
             score = result['scores'][0]
@@ -350,19 +863,24 @@ class UniversalNluEngine:
             log(f"    [NLU-오류] {slot_name}: {e}")
             return None
 
-    def _extract_slots(self, text: str, intent: str):
+    def _extract_slots(self, text, intent: str, pattern_hits: dict = None, use_nlu: bool = True):
         """
         Intent에 정의된 모든 슬롯 추출
 
         Args:
-            text: 사용자 입력 텍스트
+            text: 사용자 입력 (Utterance 또는 정규화된 문자열)
             intent: 분류된 Intent
+            pattern_hits: _match_slot_patterns 결과 (생략 시 Utterance에 메모된 결과 사용)
+            use_nlu: False면 NLU 모델 슬롯 분류 생략 (정규식/규칙/기본값만 사용)
 
         Returns:
             dict: 추출된 슬롯들 {slot_name: value}
         """
         config = self.COMMAND_HYPOTHESES[intent]
         slots = {}
+        utterance = Utterance.of(text)
+        if pattern_hits is None and isinstance(text, Utterance):
+            pattern_hits = self._match_slot_patterns(utterance)
 
         log(f"  [슬롯 추출 시작] Intent: {intent}")
 
@@ -373,13 +891,18 @@ class UniversalNluEngine:
             # 1차: 정규식 시도
             pattern = config.get("slot_patterns", {}).get(slot_name)
             if pattern:
-                value = self._extract_slot_with_regex(text, slot_name, pattern)
+                if pattern_hits is not None and pattern in pattern_hits:
+                    value = pattern_hits[pattern]
+                    if value is not None:
+                        log(f"    [정규식 성공] {slot_name} = {value}")
+                else:
+                    value = self._extract_slot_with_regex(utterance.text, slot_name, pattern)
                 if value is not None:
                     slots[slot_name] = value
                     continue
 
             # 2차: NLU 시도
-            value = self._extract_slot_with_nlu(text, slot_name, candidates)
+            value = self._extract_slot_with_nlu(utterance, slot_name, candidates, use_model=use_nlu)
             if value is not None:
                 slots[slot_name] = value
 
@@ -393,17 +916,94 @@ class UniversalNluEngine:
         log(f"  [최종 슬롯] {slots}")
         return slots
 
+    def _resolve_follow_up(self, utterance: Utterance, previous: tuple):
+        """
+        후속 발화 해석 (세션의 이전 명령 기준, 모델 호출 없음)
+
+        - 발화에 나온 Intent 키워드가 모두 이전 Intent의 슬롯 값(예: "방류", "경보국")이고
+          슬롯 값 언급이나 상대 볼륨 표현이 하나 이상 있으면 후속 발화로 봄
+        - 언급된 슬롯만 바꾸고 나머지는 이전 슬롯 유지. "더 크게" / "10 더 줄여"는 이전 볼륨에서 상대 조정
+
+        Args:
+            utterance: 정규화된 발화
+            previous: 세션의 (intent, slots)
+
+        Returns:
+            dict: 갱신된 슬롯 또는 None (후속 발화 아님 → 전체 파싱)
+        """
+        intent, previous_slots = previous
+        config = self.COMMAND_HYPOTHESES.get(intent)
+        if config is None:
+            # 설정 리로드로 이전 Intent가 사라짐
+            return None
+
+        slot_config = config.get("slots", {})
+        slot_values = {
+            str(value).lower()
+            for values in list(slot_config.values()) + [list(config.get("defaults", {}).values())]
+            for value in values if isinstance(value, str)
+        }
+
+        # 슬롯 값이 아닌 명령 키워드("방송", "점검", "데이터" 등)가 있으면 새 명령
+        for derived in self._active_config().derived.values():
+            for keyword in derived.keywords:
+                if keyword in utterance.text and keyword not in slot_values:
+                    return None
+
+        # 발화에서 직접 언급된 슬롯만 (기본값/NLU 추정 없이)
+        pattern_hits = self._match_slot_patterns(utterance)
+        mentioned = {}
+        for slot_name, candidates in slot_config.items():
+            pattern = config.get("slot_patterns", {}).get(slot_name)
+            value = pattern_hits.get(pattern) if pattern else None
+            if value is None:
+                value = self._mentioned_candidate(utterance, candidates)
+            if value is not None:
+                mentioned[slot_name] = value
+
+        # 상대 볼륨: 폭을 말했으면("10 더 올려") 상대 조정 우선, 아니면 절대값("30으로 올려")이 우선
+        relative = _RELATIVE_VOLUME.search(utterance.text) if "volume" in slot_config else None
+        if relative and (relative.group(1) or "volume" not in mentioned):
+            # 이전 볼륨은 정규식 결과(문자열)일 수도 있음
+            base = previous_slots.get("volume", config.get("defaults", {}).get("volume"))
+            if str(base).isdigit():
+                step = int(relative.group(1) or self.RELATIVE_VOLUME_STEP)
+                direction = 1 if (relative.group(2) or relative.group(3)) in _VOLUME_UP else -1
+                mentioned["volume"] = max(0, min(100, int(base) + direction * step))
+                log(f"    [상대 볼륨] {base} → {mentioned['volume']}")
+
+        if not mentioned:
+            return None
+
+        slots = dict(previous_slots)
+        slots.update(mentioned)
+        return slots
+
+    @staticmethod
+    def _mentioned_candidate(utterance: Utterance, candidates: list):
+        """발화에 그대로 나온 후보 값 (문자열은 긴 것부터, 숫자는 숫자 언급 중 후보 범위 안의 첫 값)"""
+        for candidate in sorted((c for c in candidates if isinstance(c, str)), key=len, reverse=True):
+            if candidate.lower() in utterance.text:
+                return candidate
+        numeric = [c for c in candidates if isinstance(c, int)]
+        if numeric:
+            for value, _, _ in utterance.numbers:
+                if value in numeric:
+                    return value
+        return None
+
     # 0. 잡음 처리
     def _preprocess(self, text: str) -> str:
         """잡음 제거 전처리"""
         t = text.strip().lower()
-        for n in self.NOISE:
-            t = re.sub(r'\b' + re.escape(n) + r'\b', ' ', t)
+        for n, pattern in self._noise_patterns:
+            t = pattern.sub(' ', t)
             t = t.replace(' ' + n + ' ', ' ').replace(' ' + n, ' ').replace(n + ' ', ' ')
-        return re.sub(r'\s+', ' ', t).strip()
+        return _WHITESPACE.sub(' ', t).strip()
 
-    def _extract_keywords(self, text: str, top_n: int = 5):
-        text = self._preprocess(text)
+    def _extract_keywords(self, text, top_n: int = 5):
+        # Utterance는 이미 정규화되어 있으므로 전처리를 다시 하지 않음
+        text = text.text if isinstance(text, Utterance) else self._preprocess(text)
         log(f"   잡음 제거 후 : {text}")
         keywords = self.keyword_extractor.extract_keywords(
             text,
@@ -430,47 +1030,17 @@ class UniversalNluEngine:
         log(f"[1단계: Command 분류] 입력: {text}")
         log("=" * 60)
 
-        # Tokenizer와 Model
-        tokenizer = self.classifier.tokenizer
-        model = self.classifier.model
+        # Hypothesis (description + examples) 는 설정 로드 시 미리 생성해 둠
+        derived = self._active_config().derived
+        hypotheses = {intent: d.command_hypothesis for intent, d in derived.items()}
 
-        scores = []
-
-        for cmd_type, hypothesis_data in self.COMMAND_HYPOTHESES.items():
-            # Hypothesis 생성 (description + examples)
-            hypothesis = hypothesis_data["description"]
-
-            # 예시 추가
-            examples = hypothesis_data["examples"]
-            if examples:
-                hypothesis += f" 예시: {' '.join(examples)}"
-
-            # NLI 추론
-            inputs = tokenizer(
-                text,
-                hypothesis,
-                return_tensors="pt",
-                truncation=True,
-                max_length=512,
-                padding=True
-            )
-
-            with torch.no_grad():
-                outputs = model(**inputs)
-                logits = outputs.logits[0]
-
-                # Softmax로 확률 변환
-                probs = torch.softmax(logits, dim=0)
-                entailment_prob = probs[-1].item()  # XNLI: 마지막 인덱스가 entailment
-
-            scores.append((cmd_type, entailment_prob))
+        # NLI 추론 (XNLI: 마지막 인덱스가 entailment) → 최고 점수 선택
+        best_cmd, scores = self._select_hypothesis("command", text, hypotheses, max_length=512)
+        best_score = scores[0][1]
 
+        for cmd_type, entailment_prob in scores:
             log(f"  {cmd_type:20s} → {entailment_prob:.4f}")
 
-        # 최고 점수 선택
-        scores.sort(key=lambda x: x[1], reverse=True)
-        best_cmd, best_score = scores[0]
-
         log(f"  ✅ 추론 : {best_cmd} (확신도: {best_score:.2%})")
         log("=" * 60)
 
@@ -496,32 +1066,11 @@ class UniversalNluEngine:
             "remote": "이 명령은 원격 서버나 다른 장소의 시스템에 요청하는 작업입니다."
         }
 
-        tokenizer = self.classifier.tokenizer
-        model = self.classifier.model
-
-        scores = []
+        best_scope, scores = self._select_hypothesis("scope", text, target_hypotheses)
 
-        for scope, hypothesis in target_hypotheses.items():
-            inputs = tokenizer(
-                text,                                  # premise: 사용자 원문 텍스트
-                hypothesis,                            # hypothesis: 레이블별 가설 문장
-                return_tensors="pt",                   # PyTorch 텐서로 반환
-                truncation=True,                       # 최대 길이를 초과하면 잘라낸다
-                max_length=self.MAX_LENGTH             # 문장쌍 총 길이 상한(모델 한계에 맞춤)
-            )
-
-            with torch.no_grad():                      # 추론 모드(gradient 비계산)로 메모리/속도 절약
-                outputs = model(**inputs)              # NLI 모델 전향 패스(forward) 호출
-                logits = outputs.logits[0]             # 배치 첫 항목의 로짓 벡터 취득
-                probs = torch.softmax(logits, dim=0)   # 로짓을 소프트맥스로 확률로 변환
-                entailment_prob = probs[-1].item()     # 마지막 인덱스를 함의(entailment)로 가정해 확률 추출
-
-            scores.append((scope, entailment_prob))
+        for scope, entailment_prob in scores:
             log(f"  {scope:10s} → {entailment_prob:.4f}")
 
-        scores.sort(key=lambda x: x[1], reverse=True)
-        best_scope = scores[0][0]
-
         log(f"  현장/서버 : {best_scope}\n")
 
         return best_scope
@@ -539,7 +1088,21 @@ class UniversalNluEngine:
         log("[장소 추출]")
 
         # ========================================
-        # Step 1: 패턴 기반 추출 (빠른 처리)
+        # Step 0: 가제티어 검색 (등록 시설명/별칭, 선형 스캔 1회)
+        # ========================================
+        matches = self.gazetteer.find(text)
+
+        if len(matches) == 1:
+            log(f"  ✅ 가제티어 확정: {matches[0]}")
+            return matches[0]
+
+        # 여러 시설이 언급되면 매칭된 후보끼리만 AI 분류
+        if len(matches) > 1:
+            log(f"  ⚠️ 가제티어 후보 여러 개: {matches}")
+            return self._classify_location_ai(text, matches)
+
+        # ========================================
+        # Step 1: 패턴 기반 추출 (미등록 시설명)
         # ========================================
 
         # 패턴 1: "서버에서 [장소] ..."
@@ -604,22 +1167,7 @@ class UniversalNluEngine:
 
         hypothesis = f"이 문장에서 '{candidate}'는 특정 장소나 시설을 가리킵니다."
 
-        tokenizer = self.classifier.tokenizer
-        model = self.classifier.model
-
-        inputs = tokenizer(
-            text,                                   # premise: 사용자 원문 텍스트
-            hypothesis,                             # hypothesis: 레이블별 가설 문장
-            return_tensors="pt",                    # PyTorch 텐서로 반환
-            truncation=True,                        # 최대 길이를 초과하면 잘라낸다
-            max_length=self.MAX_LENGTH              # 문장쌍 총 길이 상한(모델 한계에 맞춤)
-        )
-
-        with torch.no_grad():                       # 추론 모드(gradient 비계산)로 메모리/속도 절약
-            outputs = model(**inputs)               # NLI 모델 전향 패스(forward) 호출
-            logits = outputs.logits[0]              # 배치 첫 항목의 로짓 벡터 취득
-            probs = torch.softmax(logits, dim=0)    # 로짓을 소프트맥스로 확률로 변환
-            entailment_prob = probs[-1].item()      # 마지막 인덱스를 함의(entailment)로 가정해 확률 추출
+        entailment_prob = self._entailment_probs(text, [hypothesis])[0]
 
         log(f"    확률: {entailment_prob:.4f}")
 
@@ -644,42 +1192,19 @@ class UniversalNluEngine:
     def _classify_location_ai(self, text: str, candidates: list) -> str:
         log(f"  [AI 분류] 후보: {candidates}")
 
-        tokenizer = self.classifier.tokenizer
-        model = self.classifier.model
-
         # "장소 없음" 케이스 추가
-        candidates_with_none = candidates + ["없음"]
-
         hypotheses = {
             loc: f"이 문장은 {loc}와 관련된 명령입니다."
             for loc in candidates
         }
         hypotheses["없음"] = "이 문장에는 특정 장소가 언급되지 않았습니다."
 
-        scores = []
-
-        for loc, hypothesis in hypotheses.items():
-            # hypotheses 딕셔너리에서 (레이블코드/키, 가설문) 쌍을 한 개씩 가져온다. 예: ("ALERT", "이 문장은 경보...")
-            inputs = tokenizer(
-                text,                         # premise: 사용자 원문 텍스트
-                hypothesis,                   # hypothesis: 레이블별 가설 문장
-                return_tensors="pt",          # PyTorch 텐서로 반환
-                truncation=True,              # 최대 길이를 초과하면 잘라낸다
-                max_length=self.MAX_LENGTH    # 문장쌍 총 길이 상한(모델 한계에 맞춤)
-            )
-
-            with torch.no_grad():                      # 추론 모드(gradient 비계산)로 메모리/속도 절약
-                outputs = model(**inputs)              # NLI 모델 전향 패스(forward) 호출
-                logits = outputs.logits[0]             # 배치 첫 항목의 로짓 벡터 취득
-                probs = torch.softmax(logits, dim=0)   # 로짓을 소프트맥스로 확률로 변환
-                entailment_prob = probs[-1].item()     # 마지막 인덱스를 함의(entailment)로 가정해 확률 추출
+        # (레이블, 가설문) 쌍 전체를 한 번의 배치 순전파로 처리 (anytime 모드는 빈도순 순차 평가)
+        best_location, scores = self._select_hypothesis("location", text, hypotheses)
 
-            scores.append((loc, entailment_prob))
+        for loc, entailment_prob in scores:
             log(f"    {loc:15s} → {entailment_prob:.4f}")
 
-        scores.sort(key=lambda x: x[1], reverse=True)
-        best_location = scores[0][0]
-
         if best_location == "없음":
             log("  ✅ 추론 결과: 장소 없음")
             return None
@@ -687,17 +1212,95 @@ class UniversalNluEngine:
             log(f"  ✅ 추론 결과: {best_location}")
             return best_location
 
+    def _observe_cost(self, name: str, ms: float):
+        """단계 비용 추정치를 지수 이동 평균으로 갱신"""
+        prev = self.stage_cost_ms[name]
+        self.stage_cost_ms[name] = prev + self.COST_EWMA_ALPHA * (ms - prev)
+
+    def _plan_budget(self, text, budget_ms: float = None) -> dict:
+        """
+        시간 예산에 맞는 실행 계획
+
+        - 예산이 부족하면 정확도 손실이 작은 선택 단계부터 차례로 생략
+            1. keywords      : KeyBERT 키워드 추출 (로그용)
+            2. slot_nlu      : 슬롯 NLU 분류 → 정규식/규칙/기본값
+            3. intent_candidates : Intent 후보를 키워드 매칭 상위 N개로 축소
+            4. intent_model  : Intent NLU 분류 → 키워드 매칭 1위
+
+        Returns:
+            dict: {"keywords", "slot_nlu", "max_candidates", "intent_model", "skipped"}
+        """
+        plan = {"keywords": True, "slot_nlu": True, "max_candidates": None, "intent_model": True, "skipped": []}
+        if budget_ms is None:
+            return plan
+
+        cost = self.stage_cost_ms
+        keyword_hits = len(self._keyword_candidates(text))
+        n_candidates = keyword_hits or len(self.COMMAND_HYPOTHESES)
+        intent_ms = cost["intent_per_label"] * n_candidates
+
+        if budget_ms >= cost["keywords"] + intent_ms + cost["slot_nlu"]:
+            return plan
+
+        plan["keywords"] = False
+        plan["skipped"].append("keywords")
+        if budget_ms >= intent_ms + cost["slot_nlu"]:
+            return plan
+
+        plan["slot_nlu"] = False
+        plan["skipped"].append("slot_nlu")
+        if budget_ms >= intent_ms:
+            return plan
+
+        affordable = int(budget_ms // cost["intent_per_label"])
+        if affordable >= self.MIN_INTENT_CANDIDATES:
+            plan["max_candidates"] = affordable
+            plan["skipped"].append(f"intent_candidates({n_candidates}→{affordable})")
+            return plan
+
+        # 키워드 근거가 있으면 모델 없이 키워드 1위 Intent 사용
+        if keyword_hits:
+            plan["intent_model"] = False
+            plan["skipped"].append("intent_model")
+        else:
+            plan["max_candidates"] = self.MIN_INTENT_CANDIDATES
+            plan["skipped"].append(f"intent_candidates({n_candidates}→{self.MIN_INTENT_CANDIDATES})")
+        return plan
+
     """
                 텍스트 분석 - Intent & Slot 기반 파싱
 
                 Args:
                     text: 사용자 입력 텍스트
+                    trace: 발화 지연 추적 객체 (UtteranceTrace, 선택)
+                    budget_ms: 응답 시간 예산 (ms, 선택). 지정 시 예산에 맞게 선택 단계를 생략하고
+                               생략한 단계를 결과의 "degraded" 항목에 보고
+                    session_id: 대화 세션 키 (클라이언트 ID, 선택). 지정 시 이전 명령 문맥으로 후속 발화를 해석하고
+                                결과의 "context" 항목에 후속 발화 여부를 보고
 
                 Returns:
                     dict: 파싱 결과 {intent, slots, ...}
             """
 
-    def parse_text(self, text: str):
+    def parse_text(self, text: str, trace=None, budget_ms: float = None, session_id: str = None):
+        # 요청 시작 시점의 Intent 설정으로 고정 (처리 중 리로드와 무관하게 같은 버전 사용)
+        token = _pinned_config.set((self, self.config))
+        try:
+            result = self._parse_text(text, trace, budget_ms, session_id)
+        finally:
+            _pinned_config.reset(token)
+
+        # 성공한 명령만 세션 문맥으로 남김
+        if session_id is not None and "error" not in result:
+            self.sessions.update(session_id, result["intent"], result["slots"],
+                                 follow_up=result.get("context", {}).get("follow_up", False))
+        return result
+
+    def _parse_text(self, text: str, trace=None, budget_ms: float = None, session_id: str = None):
+        started = time.perf_counter()
+
+        if trace is not None:
+            trace.mark("nlu_start")
 
         if not text or not text.strip():
             return {"error": "입력된 텍스트가 없습니다."}
@@ -705,40 +1308,137 @@ class UniversalNluEngine:
         log(f"[감지한 텍스트] {text}")
         log("=" * 60)
 
-        # 전처리
-        text = self._preprocess(text)
-
-        # 키워드 추출 (디버깅용)
-        keywords = self._extract_keywords(text)
-        log(f"  [키워드] {keywords}")
-
-        # 1단계: Intent 분류
+        # 전처리: 요청당 한 번 정규화한 발화를 모든 단계가 공유
+        utterance = Utterance(text, self._preprocess(text))
+
+        # 후속 발화: 세션의 이전 Intent 기준으로 슬롯만 갱신 (Intent 분류 생략)
+        previous = self.sessions.get(session_id) if session_id is not None else None
+        if previous is not None:
+            follow_up_started = time.perf_counter()
+            slots = self._resolve_follow_up(utterance, previous)
+            if slots is not None:
+                return self._follow_up_result(previous, slots, started, follow_up_started, budget_ms, trace)
+
+        # 시간 예산이 있으면 예산에 맞는 실행 계획 수립
+        plan = self._plan_budget(utterance, budget_ms)
+        deadline = started + budget_ms / 1000 if budget_ms is not None else None
+
+        def run_slots(deps):
+            # Intent 분류 후 남은 시간이 슬롯 NLU 추정 비용보다 적으면 규칙/기본값만 사용
+            use_nlu = plan["slot_nlu"]
+            if use_nlu and deadline is not None:
+                remaining_ms = (deadline - time.perf_counter()) * 1000
+                if remaining_ms < self.stage_cost_ms["slot_nlu"]:
+                    use_nlu = False
+                    plan["skipped"].append("slot_nlu")
+            return self._extract_slots(utterance, deps["intent"], deps["patterns"], use_nlu=use_nlu)
+
+        # 단계 그래프: 키워드 추출(디버깅용) / Intent 분류 / 정규식 슬롯 매칭은 서로 독립이라 동시에 실행
+        #   keywords ─┐
+        #   intent ───┼─▶ slots
+        #   patterns ─┘
+        graph = StageGraph(wrap=run_stage)
+        if plan["keywords"]:
+            graph.add("keywords", lambda deps: self._extract_keywords(utterance))
+        graph.add("intent", lambda deps: self._classify_intent(
+            utterance, max_candidates=plan["max_candidates"], use_model=plan["intent_model"]))
+        graph.add("patterns", lambda deps: self._match_slot_patterns(utterance))
+        graph.add("slots", run_slots, after=["intent", "patterns"])
+
+        if trace is not None:
+            trace.mark("nlu_stages_start")
+
+        executor = self._acquire_stage_executor()
         try:
-            intent = self._classify_intent(text)
-        except Exception as e:
-            log(f"  [Intent 분류 실패] {e}")
+            stage_results, timing = graph.run(executor)
+        except StageError as e:
+            if e.stage == "slots":
+                log(f"  [Slot 추출 실패] {e.error}")
+                return {"error": "파라미터를 추출하지 못했습니다."}
+            log(f"  [Intent 분류 실패] {e.error}")
             return {"error": "명령을 인식하지 못했습니다."}
+        finally:
+            self._release_stage_executor(executor)
 
-        # 2단계: Slot 추출
-        try:
-            slots = self._extract_slots(text, intent)
-        except Exception as e:
-            log(f"  [Slot 추출 실패] {e}")
-            return {"error": "파라미터를 추출하지 못했습니다."}
+        if trace is not None:
+            trace.mark("nlu_stages_done")
+
+        if "keywords" in stage_results:
+            log(f"  [키워드] {stage_results['keywords']}")
+            self._observe_cost("keywords", timing["stages"]["keywords"]["duration_ms"])
+        intent = stage_results["intent"]
+        slots = stage_results["slots"]
+
+        log("  [단계 시간] " + ", ".join(
+            f"{name} {span['duration_ms']:.1f}ms" for name, span in timing["stages"].items()
+        ))
+        log(f"  [임계 경로] {' → '.join(timing['critical_path'])} (총 {timing['total_ms']:.1f}ms)")
 
         # 3단계: 최종 결과 구성
         result = {
             "intent": intent,
             "slots": slots,
+            "timing": timing,
         }
 
-        # 특수 처리: 방송 명령의 경우 파일 매핑
-        if intent == "alert.broadcast.start" and "scenario" in slots:
+        if budget_ms is not None:
+            result["degraded"] = {
+                "budget_ms": budget_ms,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+                "skipped": plan["skipped"],
+            }
+            if plan["skipped"]:
+                log(f"  [예산 {budget_ms:.0f}ms → 생략] {plan['skipped']}")
+
+        if session_id is not None:
+            result["context"] = {"follow_up": False, "previous_intent": previous[0] if previous else None}
+
+        self._map_file(result)
+
+        if trace is not None:
+            trace.mark("nlu_done")
+
+        log("=" * 60)
+        return result
+
+    def _follow_up_result(self, previous: tuple, slots: dict, started: float, stage_started: float,
+                          budget_ms: float = None, trace=None) -> dict:
+        """후속 발화 결과 구성 (parse_text와 같은 형식, 단계는 follow_up 하나)"""
+        intent, previous_slots = previous
+        now = time.perf_counter()
+        log(f"  [후속 발화] {intent}: {previous_slots} → {slots}")
+
+        result = {
+            "intent": intent,
+            "slots": slots,
+            "timing": {
+                "total_ms": round((now - stage_started) * 1000, 2),
+                "stages": {"follow_up": {"start_ms": 0.0, "duration_ms": round((now - stage_started) * 1000, 2)}},
+                "critical_path": ["follow_up"],
+            },
+            "context": {"follow_up": True, "previous_intent": intent, "previous_slots": previous_slots},
+        }
+        if budget_ms is not None:
+            result["degraded"] = {
+                "budget_ms": budget_ms,
+                "elapsed_ms": round((now - started) * 1000, 2),
+                "skipped": [],
+            }
+
+        self._map_file(result)
+
+        if trace is not None:
+            trace.mark("nlu_done")
+
+        log("=" * 60)
+        return result
+
+    def _map_file(self, result: dict):
+        """특수 처리: 방송 명령(alert.broadcast 계열)의 경우 시나리오 → 음원 파일 매핑 (학생 엔진과 동일 규칙)"""
+        slots = result["slots"]
+        if result["intent"].startswith("alert.broadcast") and "scenario" in slots:
             scenario = slots["scenario"]
             if scenario in self.SCENARIO_TO_FILE:
                 result["file"] = self.SCENARIO_TO_FILE[scenario]
                 log(f"  [파일 매핑] {scenario} → {result['file']}")
 
-        log("=" * 60)
-        return result
-
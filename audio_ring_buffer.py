@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import deque
+
+"""
+    사전 할당 오디오 링 버퍼
+
+    역할:
+        - 고정 크기 bytearray 하나를 미리 잡아두고 오디오 콜백이 그 안에 직접 복사
+          (블록마다 bytes 객체를 새로 만들지 않음 → 며칠 켜둬도 메모리 일정)
+        - 소비자(인식 루프)는 미리 잡아둔 출력 버퍼의 memoryview 슬라이스로 데이터를 받음
+        - 인식이 밀려 버퍼가 가득 차면 정해진 정책으로 버림
+            "drop_oldest": 가장 오래된 오디오를 덮어씀 (최신 발화 우선, 기본값)
+            "drop_newest": 새로 들어온 오디오를 버림 (이미 쌓인 발화 보존)
+        - 버림/지연 카운터 제공
+        - 마지막으로 꺼낸 데이터의 최종 수신 시각(read_until_at) 제공 (지연 추적용)
+          블록마다 (끝 위치, 수신 시각)을 기록해 두고, 꺼낸 마지막 바이트가 속한 블록의 수신 시각을 사용
+          (인식이 밀려 버퍼가 다 비지 않은 경우에도 정확)
+
+    주의:
+        - read()가 돌려준 memoryview는 다음 read() 호출 전까지만 유효 (소비자 1개 기준)
+"""
+
+
+class AudioRingBuffer:
+    """
+    Args:
+        capacity: 링 버퍼 크기 (bytes)
+        chunk_size: read() 한 번에 돌려줄 최대 크기 (bytes)
+        overflow: "drop_oldest" | "drop_newest"
+        bytes_per_second: 지연(ms) 계산용 (16kHz int16 모노 = 32000)
+        frame_size: 샘플 1개 크기 (bytes). 버릴 때 샘플 중간이 잘리지 않게 이 단위로 맞춤
+        min_block: write() 한 번의 최소 크기 (bytes, 생략 시 chunk_size). 블록 수신 시각 기록 개수 상한 계산용
+    """
+
+    def __init__(self, capacity: int, chunk_size: int, overflow: str = "drop_oldest",
+                 bytes_per_second: int = 32000, frame_size: int = 2, min_block: int = None):
+        if overflow not in ("drop_oldest", "drop_newest"):
+            raise ValueError(f"지원하지 않는 오버플로 정책: {overflow}")
+
+        self.frame_size = frame_size
+        self.capacity = capacity - capacity % frame_size
+        chunk_size -= chunk_size % frame_size
+        self.overflow = overflow
+        self.bytes_per_second = bytes_per_second
+
+        self._buf = bytearray(self.capacity)
+        self._view = memoryview(self._buf)
+        self._out = bytearray(chunk_size)
+        self._out_view = memoryview(self._out)
+
+        # 누적 바이트 위치 (capacity로 나눈 나머지가 실제 인덱스)
+        self._head = 0   # 다음에 쓸 위치
+        self._tail = 0   # 다음에 읽을 위치
+        self._cond = threading.Condition()
+
+        self.dropped_bytes = 0
+        self.overflows = 0
+        self.max_lag_bytes = 0
+
+        # 마지막 write 시각 / 마지막 read가 포함한 오디오의 최종 수신 시각 (time.monotonic)
+        self.last_write_at = 0.0
+        self.read_until_at = 0.0
+        # 아직 다 읽지 않은 블록의 (누적 끝 위치, 수신 시각)
+        #   버퍼에 남을 수 있는 블록 수로 상한 → 읽는 쪽이 없어도 메모리 일정
+        #   (min_block보다 작은 write가 이어지면 가장 오래된 기록부터 밀려남)
+        self._blocks = deque(maxlen=self.capacity // max(1, min_block or chunk_size) + 1)
+
+    def write(self, data):
+        """오디오 콜백에서 호출: data(버퍼 프로토콜 객체)를 링에 복사"""
+        src = memoryview(data).cast("B")
+        n = len(src)
+
+        with self._cond:
+            free = self.capacity - (self._head - self._tail)
+            if n > free:
+                self.overflows += 1
+                if self.overflow == "drop_oldest":
+                    if n > self.capacity:
+                        src = src[n - self.capacity:]
+                        self.dropped_bytes += n - self.capacity
+                        n = self.capacity
+                    overrun = n - (self.capacity - (self._head - self._tail))
+                    overrun += -overrun % self.frame_size
+                    if overrun > 0:
+                        self._tail += overrun
+                        self.dropped_bytes += overrun
+                        self._drop_blocks()
+                else:
+                    free -= free % self.frame_size
+                    self.dropped_bytes += n - free
+                    src = src[:free]
+                    n = free
+
+            if n:
+                start = self._head % self.capacity
+                first = min(n, self.capacity - start)
+                self._view[start:start + first] = src[:first]
+                if first < n:
+                    self._view[:n - first] = src[first:]
+                self._head += n
+                self.last_write_at = time.monotonic()
+                self._blocks.append((self._head, self.last_write_at))
+
+            lag = self._head - self._tail
+            if lag > self.max_lag_bytes:
+                self.max_lag_bytes = lag
+            self._cond.notify()
+
+    def read(self, timeout: float = None):
+        """
+        쌓인 오디오를 최대 chunk_size 만큼 꺼냄
+
+        Returns:
+            memoryview (데이터 없이 timeout 경과 시 None)
+        """
+        with self._cond:
+            if self._head == self._tail:
+                self._cond.wait(timeout)
+                if self._head == self._tail:
+                    return None
+
+            n = min(self._head - self._tail, len(self._out))
+            start = self._tail % self.capacity
+            first = min(n, self.capacity - start)
+            self._out_view[:first] = self._view[start:start + first]
+            if first < n:
+                self._out_view[first:n] = self._view[:n - first]
+            self._tail += n
+
+            # 꺼낸 마지막 바이트(위치 tail - 1)가 속한 블록 = 끝 위치가 tail 이상인 첫 블록
+            while self._blocks and self._blocks[0][0] < self._tail:
+                self._blocks.popleft()
+            if self._blocks:
+                self.read_until_at = self._blocks[0][1]
+
+        return self._out_view[:n]
+
+    def clear(self):
+        """쌓인 오디오 폐기 (카운터는 유지)"""
+        with self._cond:
+            self._tail = self._head
+            self._blocks.clear()
+
+    def _drop_blocks(self):
+        """버려진(tail 앞에서 끝나는) 블록의 수신 시각 기록 제거"""
+        while self._blocks and self._blocks[0][0] <= self._tail:
+            self._blocks.popleft()
+
+    def stats(self) -> dict:
+        with self._cond:
+            lag = self._head - self._tail
+            return {
+                "capacity": self.capacity,
+                "buffered_bytes": lag,
+                "lag_ms": round(lag * 1000 / self.bytes_per_second, 1),
+                "max_lag_ms": round(self.max_lag_bytes * 1000 / self.bytes_per_second, 1),
+                "dropped_bytes": self.dropped_bytes,
+                "dropped_ms": round(self.dropped_bytes * 1000 / self.bytes_per_second, 1),
+                "overflows": self.overflows,
+            }
@@ -0,0 +1,185 @@
+import statistics
+import time
+import torch
+from utils import log
+
+"""
+    컴파일된 NLI 실행기 (고정 shape 버킷)
+
+    역할:
+        - 입력을 (배치 크기, 시퀀스 길이) 버킷으로 패딩해 항상 정해진 shape으로만 모델 실행
+        - 버킷별로 TorchScript trace(mode="trace") 또는 torch.compile(mode="compile") 그래프 준비
+        - 시작 시 모든 버킷을 미리 실행(warm-up)해 첫 요청이 컴파일 비용을 내지 않게 함
+        - eager 모드 대비 버킷별 정상 상태(steady-state) 순전파 지연 보고
+
+    참고:
+        - 버킷보다 긴 배치는 최대 배치 버킷 단위로 나눠 실행
+        - 빈 배치 슬롯은 첫 행을 복제해 채우고 결과에서 버림
+        - compile 모드는 버킷마다 같은 forward를 다시 컴파일하므로 dynamo 재컴파일 한도(기본 8)를
+          버킷 수 이상으로 올림. 그래도 컴파일되지 않은(eager로 돌아간) 버킷은 fallback_buckets에 기록
+        - benchmark()는 버킷마다 eager/컴파일 순전파를 반복 실행해 오래 걸리므로 명시적으로 호출할 때만 실행
+"""
+
+# dynamo 재컴파일 한도 설정 이름 (torch 버전에 따라 다름)
+_RECOMPILE_LIMIT = "recompile_limit" if hasattr(torch._dynamo.config, "recompile_limit") else "cache_size_limit"
+
+
+class _LogitsOnly(torch.nn.Module):
+    """trace/compile 용으로 (input_ids, attention_mask) → logits 만 노출"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask, return_dict=False)[0]
+
+
+class CompiledNliRunner:
+    LENGTH_BUCKETS = (32, 64, 128, 256, 512)
+    BATCH_BUCKETS = (1, 4, 8)
+
+    def __init__(self, tokenizer, model, mode: str = "trace",
+                 length_buckets: tuple = LENGTH_BUCKETS, batch_buckets: tuple = BATCH_BUCKETS):
+        if mode not in ("trace", "compile"):
+            raise ValueError(f"지원하지 않는 컴파일 모드: {mode}")
+
+        self.tokenizer = tokenizer
+        self.model = model.eval()
+        self.mode = mode
+        self.length_buckets = tuple(sorted(length_buckets))
+        self.batch_buckets = tuple(sorted(batch_buckets))
+        self._wrapper = _LogitsOnly(self.model).eval()
+        self._graphs = {}
+        self.fallback_buckets = []
+        self._compiled = None
+        if mode == "compile":
+            # 버킷 shape마다 그래프 하나씩 → 한도에 걸리면 남은 버킷은 조용히 eager로 실행됨
+            n_buckets = len(self.length_buckets) * len(self.batch_buckets)
+            if getattr(torch._dynamo.config, _RECOMPILE_LIMIT) < n_buckets:
+                setattr(torch._dynamo.config, _RECOMPILE_LIMIT, n_buckets)
+            self._compiled = torch.compile(self._wrapper, dynamic=False)
+
+    def _dummy(self, batch: int, length: int):
+        input_ids = torch.full((batch, length), self.tokenizer.pad_token_id or 0, dtype=torch.long)
+        input_ids[:, 0] = self.tokenizer.cls_token_id or 0
+        # 마지막 위치를 패딩으로 둬서 trace가 "마스크 없음" 분기로 고정되지 않게 함
+        attention_mask = torch.ones((batch, length), dtype=torch.long)
+        attention_mask[:, -1] = 0
+        return input_ids, attention_mask
+
+    def _graph(self, batch: int, length: int):
+        key = (batch, length)
+        graph = self._graphs.get(key)
+        if graph is None:
+            if self.mode == "trace":
+                with torch.no_grad():
+                    graph = torch.jit.trace(self._wrapper, self._dummy(batch, length), check_trace=False)
+                    graph = torch.jit.optimize_for_inference(torch.jit.freeze(graph))
+            else:
+                graph = self._compiled
+            self._graphs[key] = graph
+        return graph
+
+    def warmup(self, repeats: int = 2):
+        """
+        모든 (배치, 길이) 버킷을 미리 컴파일/실행
+
+        - compile 모드: 첫 실행에서 새 그래프가 만들어지지 않은 버킷은 eager로 돌아간 것이므로 fallback_buckets에 기록
+        """
+        from torch._dynamo.utils import counters
+
+        start = time.perf_counter()
+        self.fallback_buckets = []
+        with torch.no_grad():
+            for length in self.length_buckets:
+                for batch in self.batch_buckets:
+                    graph = self._graph(batch, length)
+                    graphs_before = counters["stats"]["unique_graphs"]
+                    for _ in range(repeats):
+                        graph(*self._dummy(batch, length))
+                    if self.mode == "compile" and counters["stats"]["unique_graphs"] == graphs_before:
+                        self.fallback_buckets.append(f"b{batch}x{length}")
+
+        log(f"🔥 NLI 그래프 워밍업 완료 ({self.mode}, 버킷 {len(self._graphs)}개, "
+            f"{time.perf_counter() - start:.1f}s)")
+        if self.fallback_buckets:
+            log(f"⚠️ 컴파일되지 않고 eager로 실행되는 버킷: {self.fallback_buckets}")
+
+    def _bucket(self, buckets: tuple, size: int) -> int:
+        for bucket in buckets:
+            if size <= bucket:
+                return bucket
+        return buckets[-1]
+
+    def logits(self, pairs: list, max_length: int) -> list:
+        """
+        (premise, hypothesis) 쌍 목록의 NLI 로짓 (nli_forward 와 같은 결과 형식)
+        """
+        max_length = min(max_length, self.length_buckets[-1])
+        encoded = self.tokenizer(
+            [premise for premise, _ in pairs],
+            [hypothesis for _, hypothesis in pairs],
+            truncation=True,
+            max_length=max_length,
+        )
+
+        results = []
+        step = self.batch_buckets[-1]
+        for i in range(0, len(pairs), step):
+            ids = encoded["input_ids"][i:i + step]
+            batch = self._bucket(self.batch_buckets, len(ids))
+            length = self._bucket(self.length_buckets, max(len(x) for x in ids))
+
+            # 버킷 shape으로 패딩 (빈 배치 슬롯은 첫 행 복제)
+            rows = ids + [ids[0]] * (batch - len(ids))
+            input_ids = torch.full((batch, length), self.tokenizer.pad_token_id or 0, dtype=torch.long)
+            attention_mask = torch.zeros((batch, length), dtype=torch.long)
+            for r, row in enumerate(rows):
+                input_ids[r, :len(row)] = torch.tensor(row)
+                attention_mask[r, :len(row)] = 1
+
+            with torch.no_grad():
+                logits = self._graph(batch, length)(input_ids, attention_mask)
+            results.extend(logits[:len(ids)].tolist())
+
+        return results
+
+    def benchmark(self, repeats: int = 10) -> dict:
+        """
+        버킷별 eager vs 컴파일 순전파 지연 (중앙값, ms)
+
+        - 버킷마다 eager / 컴파일 순전파를 repeats번씩 실행하므로 큰 모델에서는 오래 걸림 (시작 시 자동 실행하지 않음)
+
+        Returns:
+            {"b4x128": {"eager_ms", "compiled_ms", "speedup", "compiled"}, ...}
+            compiled: False면 해당 버킷은 컴파일되지 않아 eager와 같은 경로로 측정됨
+        """
+        report = {}
+        with torch.no_grad():
+            for length in self.length_buckets:
+                for batch in self.batch_buckets:
+                    inputs = self._dummy(batch, length)
+                    eager = self._time(lambda: self._wrapper(*inputs), repeats)
+                    compiled = self._time(lambda: self._graph(batch, length)(*inputs), repeats)
+                    report[f"b{batch}x{length}"] = {
+                        "eager_ms": round(eager, 2),
+                        "compiled_ms": round(compiled, 2),
+                        "speedup": round(eager / compiled, 2) if compiled else None,
+                        "compiled": f"b{batch}x{length}" not in self.fallback_buckets,
+                    }
+
+        log(f"📊 NLI 순전파 지연 (eager → {self.mode}, 중앙값)")
+        for bucket, row in report.items():
+            log(f"  {bucket:8s} {row['eager_ms']:8.2f}ms → {row['compiled_ms']:8.2f}ms  (x{row['speedup']})")
+        return report
+
+    @staticmethod
+    def _time(fn, repeats: int) -> float:
+        fn()
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
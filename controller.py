@@ -1,18 +1,47 @@
 from stt_engine import SpeechToTextEngine
 from ai_nlu_engine import UniversalNluEngine
+from latency_tracer import UtteranceTrace, LatencyTracker
 from utils import log
 
 class VoiceController:
-    def __init__(self, model_path: str, max_port: int = 8):
+    def __init__(self, model_path: str, max_port: int = 8, wake_gate: bool = False, wake_model_path: str = None,
+                 latency_log: str = None, persistent_stream: bool = True):
         """
         음성 제어 컨트롤러 초기화
         @param model_path: Vosk 모델 경로
         @param max_port:   최대 포트 번호 (기본 8)
+        @param wake_gate:  True면 국 이름(경보국/수위국 등)이 들릴 때만 전체 음성 인식 수행
+        @param wake_model_path: 웨이크 게이트용 소형 Vosk 모델 경로 (생략 시 model_path)
+        @param latency_log: 발화별 지연 trace를 기록할 JSONL 경로 (선택)
+        @param persistent_stream: True면 마이크 스트림을 한 번 열어 close() 전까지 유지
+                                  (명령마다 장치를 다시 열지 않고, 명령 사이 오디오도 버리지 않음)
         """
-        # STT 엔진
-        self.stt_engine = SpeechToTextEngine(model_path)
+        self.persistent_stream = persistent_stream
+
+        # 음성 → 명령 종단 간 지연 집계
+        self.latency = LatencyTracker(export_path=latency_log)
+
         # NLU 엔진 (what–how–action)
-        self.nlu_engine = UniversalNluEngine(max_port=max_port)
+        self.nlu_engine = UniversalNluEngine()
+
+        # STT 엔진 (웨이크 게이트 트리거 단어는 NLU Intent 정의의 국 이름에서 가져옴)
+        wake_words = self._wake_words(self.nlu_engine.COMMAND_HYPOTHESES) if wake_gate else None
+        self.stt_engine = SpeechToTextEngine(model_path, wake_words=wake_words, wake_model_path=wake_model_path)
+
+    @staticmethod
+    def _wake_words(hypotheses: dict) -> list:
+        """
+        Intent 정의에서 국(station) 이름 수집
+        @return: ["경보국", "수위국", ...]
+        """
+        words = []
+        for config in hypotheses.values():
+            stations = list(config.get("slots", {}).get("station", []))
+            stations.append(config.get("defaults", {}).get("station"))
+            for station in stations:
+                if station and station not in words:
+                    words.append(station)
+        return words
 
     def start_command_recognition(self):
         """
@@ -23,21 +52,79 @@ class VoiceController:
         log("🎙️  음성 제어 시스템 시작")
         log("=" * 50)
 
+        if self.persistent_stream:
+            self.stt_engine.open_stream()
+
         while True:
-            text = self.stt_engine.listen_and_transcribe()
+            trace = UtteranceTrace()
+            text = self.stt_engine.listen_and_transcribe(trace)
             if not text:
                 log("⚠️  인식 실패. 다시 말씀해주세요.\n")
                 continue
 
-            log(f"\n📝 인식된 텍스트: '{text}'")
-            command = self.nlu_engine.parse_text(text)
+            command = self._handle_utterance(text, trace)
+            if command is not None:
+                return command
 
-            if "error" in command:
-                log(f"❌ {command['error']}")
-                log("💡 예시: '디오 1번 꺼줘', '시스템 재부팅해', '지난 10분 로그 가져와'\n")
-                continue
+    def listen_forever(self, on_command=None, stop_event=None):
+        """
+        연속 명령 처리 (스트림/인식기를 유지한 채 발화가 끝날 때마다 바로 다음 발화 인식)
+        @param on_command: 명령 생성 시 호출할 함수 on_command(command) (생략 시 로그만 출력)
+        @param stop_event: threading.Event (set 되면 종료)
+        """
+        log("=" * 50)
+        log("🎙️  음성 제어 시스템 시작 (연속 모드)")
+        log("=" * 50)
+
+        try:
+            for text, trace in self.stt_engine.utterances(stop_event):
+                command = self._handle_utterance(text, trace)
+                if command is not None and on_command is not None:
+                    on_command(command)
+        except KeyboardInterrupt:
+            log("\n⚠️ 사용자가 중단했습니다.")
+
+    def _handle_utterance(self, text: str, trace: UtteranceTrace):
+        """
+        인식된 발화 1건 → 명령
+        @return dict: 명령 (에러면 None)
+        """
+        log(f"\n📝 인식된 텍스트: '{text}'")
+        command = self.nlu_engine.parse_text(text, trace)
+        trace.mark("command_emitted")
+        self.latency.record(trace)
+
+        if "error" in command:
+            log(f"❌ {command['error']}")
+            log("💡 예시: '디오 1번 꺼줘', '시스템 재부팅해', '지난 10분 로그 가져와'\n")
+            return None
+
+        log("\n" + "=" * 50)
+        log("✅ 명령어 생성 완료!")
+        log("=" * 50)
+        return command
+
+    def close(self):
+        """유지 중인 마이크 스트림 닫기"""
+        self.stt_engine.close_stream()
+
+    def replay(self, wav_paths: list, repeats: int = 1, realtime: bool = True) -> dict:
+        """
+        녹음 파일 재생으로 음성 → 명령 지연 측정 재현
+        @param wav_paths: 16kHz/16bit/모노 WAV 파일 목록
+        @param repeats:   파일 목록 반복 횟수
+        @param realtime:  True면 마이크와 같은 속도로 오디오 전달
+        @return dict: 구간별 백분위 {구간: {count, p50, p90, p99}}
+        """
+        for _ in range(repeats):
+            for path in wav_paths:
+                trace = UtteranceTrace(source=path)
+                text = self.stt_engine.transcribe_file(path, trace, realtime=realtime)
+                command = self.nlu_engine.parse_text(text, trace)
+                trace.mark("command_emitted")
+                trace.attrs["text"] = text
+                trace.attrs["intent"] = command.get("intent")
+                self.latency.record(trace)
 
-            log("\n" + "=" * 50)
-            log("✅ 명령어 생성 완료!")
-            log("=" * 50)
-            return command
+        self.latency.report()
+        return self.latency.percentiles()
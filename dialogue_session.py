@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+
+"""
+    클라이언트별 대화 세션 (후속 명령 문맥)
+
+    역할:
+        - 클라이언트(client_id)마다 마지막 Intent와 슬롯을 보관
+        - 마지막 사용 후 ttl초가 지나면 만료, 세션 수가 max_sessions를 넘으면 가장 오래 안 쓴 세션부터 제거
+        - 엔진은 짧은 후속 발화("볼륨 더 크게", "이번엔 방류로")를 이전 Intent 기준으로 해석해
+          Intent 분류를 건너뜀
+"""
+
+
+class DialogueSession:
+    __slots__ = ("client_id", "intent", "slots", "updated_at", "turns")
+
+    def __init__(self, client_id: str):
+        self.client_id = client_id
+        self.intent = None
+        self.slots = {}
+        self.updated_at = 0.0
+        self.turns = 0
+
+
+class SessionStore:
+    """
+    Args:
+        ttl: 세션 유지 시간 (초, 마지막 명령 기준)
+        max_sessions: 최대 세션 수
+    """
+
+    def __init__(self, ttl: float = 120.0, max_sessions: int = 1000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"follow_ups": 0, "full_parses": 0, "expired": 0, "evicted": 0}
+
+    def _expire(self, now: float):
+        # 가장 오래 안 쓴 세션이 앞쪽에 있으므로 만료되지 않은 세션을 만나면 중단
+        while self._sessions:
+            client_id, session = next(iter(self._sessions.items()))
+            if now - session.updated_at <= self.ttl:
+                break
+            del self._sessions[client_id]
+            self.stats["expired"] += 1
+
+    def get(self, client_id: str):
+        """
+        살아 있는 세션의 (intent, slots) 스냅샷
+
+        Returns:
+            (intent, dict) 또는 None (세션 없음/만료)
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            session = self._sessions.get(client_id)
+            if session is None or session.intent is None:
+                return None
+            return session.intent, dict(session.slots)
+
+    def update(self, client_id: str, intent: str, slots: dict, follow_up: bool = False):
+        """명령 처리 결과로 세션 갱신"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.pop(client_id, None) or DialogueSession(client_id)
+            session.intent = intent
+            session.slots = dict(slots)
+            session.updated_at = now
+            session.turns += 1
+            self._sessions[client_id] = session
+
+            self.stats["follow_ups" if follow_up else "full_parses"] += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.stats["evicted"] += 1
+
+    def clear(self, client_id: str):
+        with self._lock:
+            self._sessions.pop(client_id, None)
+
+    def report(self) -> dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            total = self.stats["follow_ups"] + self.stats["full_parses"]
+            return {
+                "active": len(self._sessions),
+                "ttl": self.ttl,
+                **self.stats,
+                "follow_up_rate": round(self.stats["follow_ups"] / total, 4) if total else 0.0,
+            }
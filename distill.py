@@ -0,0 +1,235 @@
+import argparse
+import json
+import random
+import re
+import time
+from collections import Counter
+from utils import log
+from student_nlu import FEATURE_DIM, SoftmaxClassifier, StudentNluEngine, featurize
+
+"""
+    교사 → 학생 NLU 증류 파이프라인
+
+    역할:
+        - 발화 수집: COMMAND_HYPOTHESES examples + 운영 로그 발화(.txt 한 줄 1개 / .jsonl "text" 필드)
+          + examples 변형 (슬롯 후보값 치환, 숫자 치환, 잡음 단어 삽입)
+        - 교사 레이블링: UniversalNluEngine.parse_text 결과(intent, slots)를 정답으로 사용
+        - 학생 학습: Intent 분류기 + 슬롯별 값 분류기 (student_nlu.StudentNluEngine)
+        - 평가: 보류(held-out) 발화에서 교사 대비 Intent/슬롯 일치율, 교사/학생 지연 p50/p95
+
+    사용법:
+        python distill.py --logs traffic.jsonl --out student_nlu.npz --report distill_report.json
+        NLU_STUDENT_MODEL=student_nlu.npz python raspberry_server.py   # 학생 엔진으로 서버 실행
+"""
+
+FILLERS = ["음", "좀", "빨리", "그", "저"]
+
+
+def load_utterances(paths: list) -> list:
+    """운영 로그 발화 읽기 (.jsonl은 "text" 필드, 그 외는 한 줄에 발화 1개)"""
+    texts = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if path.endswith(".jsonl"):
+                    text = json.loads(line).get("text")
+                    if text:
+                        texts.append(text)
+                else:
+                    texts.append(line)
+    return texts
+
+
+def augment(command_hypotheses: dict, per_example: int = 6, seed: int = 0) -> list:
+    """examples 변형: 슬롯 후보 문자열 치환 / 숫자 치환 / 잡음 단어 삽입"""
+    rng = random.Random(seed)
+    variants = []
+
+    for config in command_hypotheses.values():
+        choices = [
+            [c for c in candidates if isinstance(c, str)]
+            for candidates in config.get("slots", {}).values()
+        ]
+        choices = [c for c in choices if len(c) > 1]
+
+        for example in config.get("examples", []):
+            for _ in range(per_example):
+                text = example
+                for candidates in choices:
+                    present = [c for c in candidates if c in text]
+                    if present:
+                        text = text.replace(present[0], rng.choice(candidates), 1)
+                text = re.sub(r'\d+', lambda m: str(rng.randint(0, 100)), text)
+                if rng.random() < 0.3:
+                    words = text.split()
+                    words.insert(rng.randint(0, len(words)), rng.choice(FILLERS))
+                    text = " ".join(words)
+                variants.append(text)
+
+    return variants
+
+
+def label_with_teacher(teacher, texts: list) -> list:
+    """교사 레이블링 → [{"text", "intent", "slots", "teacher_ms"}] (에러 결과는 제외)"""
+    labeled = []
+    for i, text in enumerate(texts, 1):
+        start = time.perf_counter()
+        result = teacher.parse_text(text)
+        elapsed = (time.perf_counter() - start) * 1000
+        if "error" in result:
+            continue
+        labeled.append({"text": text, "intent": result["intent"], "slots": result["slots"], "teacher_ms": elapsed})
+        if i % 20 == 0:
+            log(f"🧑‍🏫 교사 레이블링 {i}/{len(texts)}")
+    return labeled
+
+
+def train_student(teacher, labeled: list, epochs: int = 40) -> StudentNluEngine:
+    """교사 레이블로 학생 엔진 학습"""
+    command_hypotheses = teacher.COMMAND_HYPOTHESES
+    normalize = teacher._preprocess
+    features = [featurize(normalize(row["text"])) for row in labeled]
+
+    intents = sorted({row["intent"] for row in labeled})
+    models = {"intent": SoftmaxClassifier(intents).fit(features, [row["intent"] for row in labeled], epochs=epochs)}
+
+    meta = {
+        "feature_dim": FEATURE_DIM,
+        "noise": list(teacher.NOISE),
+        "scenario_to_file": dict(teacher.SCENARIO_TO_FILE),
+        "slot_patterns": {intent: command_hypotheses[intent].get("slot_patterns", {}) for intent in intents},
+        "slots": {},
+        "models": {},
+    }
+
+    for intent in intents:
+        rows = [(f, row) for f, row in zip(features, labeled) if row["intent"] == intent]
+        config = command_hypotheses[intent]
+        patterns = {slot: re.compile(p, re.IGNORECASE) for slot, p in config.get("slot_patterns", {}).items()}
+        slot_names = sorted({name for _, row in rows for name in row["slots"]})
+        meta["slots"][intent] = {}
+
+        for slot_name in slot_names:
+            spec = {}
+            candidates = config.get("slots", {}).get(slot_name, [])
+            if candidates and all(isinstance(c, int) for c in candidates):
+                spec["numeric"] = [min(candidates), max(candidates)]
+
+            # 정규식이 못 잡는 발화에 대해서만 값 분류기 학습 (정규식으로 잡히면 실행 시에도 정규식 사용)
+            samples, targets = [], []
+            for f, row in rows:
+                if slot_name not in row["slots"]:
+                    continue
+                compiled = patterns.get(slot_name)
+                if compiled is not None and compiled.search(normalize(row["text"])):
+                    continue
+                samples.append(f)
+                targets.append(json.dumps(row["slots"][slot_name], ensure_ascii=False))
+
+            values = Counter(targets)
+            if len(values) > 1:
+                name = f"slot:{intent}:{slot_name}"
+                models[name] = SoftmaxClassifier(sorted(values)).fit(samples, targets, epochs=epochs)
+            elif values:
+                spec["value"] = json.loads(next(iter(values)))
+            meta["slots"][intent][slot_name] = spec
+
+    meta["models"] = {name: model.labels for name, model in models.items()}
+    return StudentNluEngine(meta, models)
+
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * q))], 3) if values else 0.0
+
+
+def evaluate(student: StudentNluEngine, labeled: list, repeats: int = 20) -> dict:
+    """교사 레이블 대비 학생 정확도 + 교사/학생 지연 비교"""
+    intent_hits = exact_hits = 0
+    slot_hits, slot_total = Counter(), Counter()
+    student_ms = []
+
+    for row in labeled:
+        result = student.parse_text(row["text"])
+        for _ in range(repeats):
+            start = time.perf_counter()
+            student.parse_text(row["text"])
+            student_ms.append((time.perf_counter() - start) * 1000)
+
+        intent_hits += result["intent"] == row["intent"]
+        exact_hits += result["intent"] == row["intent"] and result["slots"] == row["slots"]
+        if result["intent"] == row["intent"]:
+            for name, value in row["slots"].items():
+                slot_total[name] += 1
+                slot_hits[name] += result["slots"].get(name) == value
+
+    n = len(labeled) or 1
+    teacher_ms = [row["teacher_ms"] for row in labeled]
+    return {
+        "samples": len(labeled),
+        "intent_agreement": round(intent_hits / n, 4),
+        "exact_agreement": round(exact_hits / n, 4),
+        "slot_agreement": {name: round(slot_hits[name] / slot_total[name], 4) for name in sorted(slot_total)},
+        "latency_ms": {
+            "teacher": {"p50": _percentile(teacher_ms, 0.5), "p95": _percentile(teacher_ms, 0.95)},
+            "student": {"p50": _percentile(student_ms, 0.5), "p95": _percentile(student_ms, 0.95)},
+        },
+    }
+
+
+def distill(teacher, log_paths: list = (), per_example: int = 6, holdout: float = 0.2,
+            epochs: int = 40, seed: int = 0) -> tuple:
+    """
+    증류 전체 실행
+
+    Returns:
+        (student, report)
+    """
+    texts = load_utterances(list(log_paths))
+    for config in teacher.COMMAND_HYPOTHESES.values():
+        texts.extend(config.get("examples", []))
+    texts.extend(augment(teacher.COMMAND_HYPOTHESES, per_example, seed))
+    texts = list(dict.fromkeys(texts))
+    log(f"📚 증류 발화 {len(texts)}개 (로그 파일 {len(log_paths)}개)")
+
+    labeled = label_with_teacher(teacher, texts)
+    random.Random(seed).shuffle(labeled)
+    n_eval = max(1, int(len(labeled) * holdout))
+    train, held_out = labeled[n_eval:], labeled[:n_eval]
+
+    student = train_student(teacher, train, epochs)
+    report = {
+        "train": len(train),
+        "intents": dict(Counter(row["intent"] for row in labeled)),
+        "held_out": evaluate(student, held_out),
+        "train_fit": evaluate(student, train, repeats=1),
+    }
+    log(f"📊 증류 결과: {json.dumps(report['held_out'], ensure_ascii=False)}")
+    return student, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UniversalNluEngine → 경량 학생 모델 증류")
+    parser.add_argument("--logs", nargs="*", default=[], help="운영 발화 로그 (.txt / .jsonl)")
+    parser.add_argument("--out", default="student_nlu.npz", help="학생 모델 저장 경로")
+    parser.add_argument("--report", default="distill_report.json", help="비교 리포트 저장 경로")
+    parser.add_argument("--per-example", type=int, default=6, help="예문당 변형 수")
+    parser.add_argument("--holdout", type=float, default=0.2, help="평가용 보류 비율")
+    parser.add_argument("--epochs", type=int, default=40)
+    args = parser.parse_args()
+
+    from ai_nlu_engine import UniversalNluEngine
+    teacher = UniversalNluEngine()
+
+    student, report = distill(teacher, args.logs, args.per_example, args.holdout, args.epochs)
+    student.save(args.out)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    log(f"💾 학생 모델: {args.out} / 리포트: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
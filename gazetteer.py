@@ -0,0 +1,135 @@
+import json
+import os
+import re
+from collections import deque
+from utils import log
+
+"""
+    시설(댐/교/국) 가제티어
+
+    역할:
+        - 데이터 파일(stations.json)의 시설명 + 별칭을 Aho-Corasick 자동자로 색인
+        - 입력 문장을 한 번 선형 스캔해 등록된 시설명을 모두 찾음 (후보 수와 무관)
+        - 대소문자, 연속 공백, 시설명 안의 띄어쓰기 차이는 무시 ("부천 수위국" == "부천수위국")
+        - 매칭은 어절 경계에서 시작하고 어절 경계(또는 조사 "에서", "의" 등)에서 끝나야 함
+          → 어절을 걸치는 오탐 방지 ("통신 실패" ≠ 통신실, "수위 국가" ≠ 수위국, "경보 소리" ≠ 경보소)
+
+    데이터 형식:
+        {"stations": [{"name": "소양강댐", "aliases": ["소양댐"]}, ...]}
+"""
+
+DEFAULT_GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stations.json")
+
+
+_WHITESPACE = re.compile(r'\s+')
+
+# 시설명 뒤에 붙어도 어절 경계로 보는 조사 (조합 가능: "에서는", "까지만")
+_PARTICLES = re.compile(r'(?:에서|에게|한테|으로|까지|부터|이랑|하고|처럼|보다|로|랑|에|의|은|는|이|가|을|를|와|과|도|만)+')
+
+
+def _normalize(text: str) -> str:
+    """소문자 + 연속 공백을 공백 하나로 (공백은 어절 경계 판단에 필요하므로 남김)"""
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def _is_boundary(ch: str) -> bool:
+    return not ch.isalnum()
+
+
+class Gazetteer:
+    def __init__(self, stations: list = ()):
+        # 자동자: 상태별 전이(goto), 실패 링크(fail), 출력(out: (길이, 정식 명칭) 목록)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self.names = []
+
+        for station in stations:
+            self.add(station["name"], station.get("aliases", []))
+        self._build()
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_GAZETTEER_PATH):
+        """데이터 파일에서 로드 (파일이 없으면 빈 가제티어)"""
+        if not os.path.exists(path):
+            log(f"⚠️ 가제티어 파일 없음: {path}")
+            return cls()
+
+        with open(path, encoding="utf-8") as f:
+            stations = json.load(f)["stations"]
+
+        gazetteer = cls(stations)
+        log(f"🗺️ 가제티어 로드: 시설 {len(gazetteer.names)}개")
+        return gazetteer
+
+    def add(self, name: str, aliases: list = ()):
+        """시설명과 별칭을 트라이에 추가 (추가 후 _build 필요)"""
+        self.names.append(name)
+        keys = []
+        for key in [name, *aliases]:
+            key = _normalize(key)
+            # 띄어 쓴 형태와 붙여 쓴 형태를 모두 색인
+            for form in (key, key.replace(" ", "")):
+                if form and form not in keys:
+                    keys.append(form)
+
+        for key in keys:
+            state = 0
+            for ch in key:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][ch] = nxt
+                state = nxt
+            self._out[state].append((len(key), name))
+
+    def _build(self):
+        """BFS로 실패 링크 계산"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> list:
+        """
+        문장에 등장하는 시설의 정식 명칭 목록 (등장 순서, 중복 제거)
+
+        - 어절 중간에서 시작하거나 끝나는 매칭은 버림 (끝 뒤에 조사만 붙은 경우는 허용)
+        - 다른 매칭에 완전히 포함되는 짧은 매칭은 버림 ("울산 경보국" 안의 "경보국")
+        """
+        text = _normalize(text)
+        spans = []
+        state = 0
+        for end, ch in enumerate(text, 1):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for length, name in self._out[state]:
+                if self._on_boundaries(text, end - length, end):
+                    spans.append((end - length, end, name))
+
+        names = []
+        for start, end, name in sorted(spans, key=lambda s: (s[0], -s[1])):
+            contained = any(s <= start and end <= e and (s, e) != (start, end) for s, e, _ in spans)
+            if not contained and name not in names:
+                names.append(name)
+        return names
+
+    @staticmethod
+    def _on_boundaries(text: str, start: int, end: int) -> bool:
+        """매칭 [start, end)가 어절 경계에서 시작하고, 어절 경계 또는 조사 앞에서 끝나는지"""
+        if start > 0 and not _is_boundary(text[start - 1]):
+            return False
+        rest = end
+        while rest < len(text) and not _is_boundary(text[rest]):
+            rest += 1
+        return rest == end or _PARTICLES.fullmatch(text, end, rest) is not None
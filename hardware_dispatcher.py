@@ -0,0 +1,394 @@
+import json
+import os
+import select
+import socket
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future
+from utils import log
+
+try:
+    import serial  # pyserial (실제 RS-232/485 포트 사용 시에만 필요)
+except ImportError:
+    serial = None
+
+"""
+    하드웨어 명령 디스패처
+
+    역할:
+        - NLU가 만든 {intent, slots} 명령을 백그라운드 큐로 넘겨 Flask 워커를 블로킹하지 않음
+        - 국(station)별 RTU 엔드포인트에 영속 연결 유지 (TCP / 시리얼 / pty)
+        - 엔드포인트별 FIFO를 송신 스레드 하나가 처리 → 같은 국의 명령은 제출 순서대로 도착
+        - 한 번에 여러 명령을 연속 송신 후 응답을 순서대로 수신 (파이프라이닝)
+        - 연속으로 들어온 동일 명령은 한 번만 송신 (중복 병합)
+        - 명령별 완료 지연시간(latency) 집계
+
+    엔드포인트 형식:
+        - "tcp://192.168.0.10:7000"  : TCP 소켓 (RTU 게이트웨이 / 테스트용 소켓 스탠드인)
+        - "pty:///dev/pts/3"         : 의사 터미널 (테스트용, pyserial 불필요)
+        - "/dev/ttyUSB0", "socket://..." 등 : pyserial serial_for_url 로 연결
+
+    프레임 형식:
+        - 요청/응답 모두 UTF-8 JSON 한 줄 (개행 문자로 구분)
+"""
+
+
+class RtuConnection:
+    """
+    RTU 엔드포인트 하나에 대한 영속 연결
+
+    Args:
+        endpoint: 엔드포인트 문자열 (위 형식 참고)
+        timeout: 송수신 타임아웃 (초)
+        baudrate: 시리얼 포트 속도
+    """
+
+    def __init__(self, endpoint: str, timeout: float = 2.0, baudrate: int = 9600):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.baudrate = baudrate
+        self._sock = None
+        self._serial = None
+        self._fd = None
+        self._rbuf = bytearray()
+
+    def open(self):
+        if self.endpoint.startswith("tcp://"):
+            host, port = self.endpoint[len("tcp://"):].rsplit(":", 1)
+            self._sock = socket.create_connection((host, int(port)), timeout=self.timeout)
+            # 짧은 명령 프레임이 Nagle 알고리즘에 묶여 지연되지 않도록
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        elif self.endpoint.startswith("pty://"):
+            self._fd = os.open(self.endpoint[len("pty://"):], os.O_RDWR | os.O_NOCTTY)
+        else:
+            if serial is None:
+                raise RuntimeError(f"pyserial이 설치되지 않아 '{self.endpoint}'에 연결할 수 없습니다.")
+            self._serial = serial.serial_for_url(self.endpoint, baudrate=self.baudrate, timeout=self.timeout)
+        log(f"🔌 RTU 연결: {self.endpoint}")
+        return self
+
+    def write(self, data: bytes):
+        if self._sock is not None:
+            self._sock.sendall(data)
+        elif self._fd is not None:
+            view = memoryview(data)
+            while view:
+                written = os.write(self._fd, view)
+                view = view[written:]
+        else:
+            self._serial.write(data)
+            self._serial.flush()
+
+    def _recv(self) -> bytes:
+        if self._serial is not None:
+            return self._serial.read(self._serial.in_waiting or 1)
+
+        handle = self._sock if self._sock is not None else self._fd
+        ready, _, _ = select.select([handle], [], [], self.timeout)
+        if not ready:
+            raise TimeoutError(f"RTU 응답 시간 초과: {self.endpoint}")
+        if self._sock is not None:
+            return self._sock.recv(4096)
+        return os.read(self._fd, 4096)
+
+    def read_line(self) -> bytes:
+        """개행 문자까지 한 프레임 수신"""
+        deadline = time.monotonic() + self.timeout
+        while b"\n" not in self._rbuf:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"RTU 응답 시간 초과: {self.endpoint}")
+            chunk = self._recv()
+            if not chunk and self._serial is None:
+                raise ConnectionError(f"RTU 연결 종료: {self.endpoint}")
+            self._rbuf += chunk
+
+        idx = self._rbuf.index(b"\n")
+        line = bytes(self._rbuf[:idx])
+        del self._rbuf[:idx + 1]
+        return line.rstrip(b"\r")
+
+    def close(self):
+        try:
+            if self._sock is not None:
+                self._sock.close()
+            elif self._fd is not None:
+                os.close(self._fd)
+            elif self._serial is not None:
+                self._serial.close()
+        except OSError:
+            pass
+        self._sock = self._serial = self._fd = None
+        self._rbuf.clear()
+
+
+class _PendingCommand:
+    __slots__ = ("endpoint", "frame", "futures", "submitted_at")
+
+    def __init__(self, endpoint: str, frame: bytes, future: Future):
+        self.endpoint = endpoint
+        self.frame = frame
+        self.futures = [future]
+        self.submitted_at = time.monotonic()
+
+
+class _EndpointLane:
+    """
+    RTU 연결 하나 + FIFO 대기열 + 전담 송신 스레드
+
+    - 대기열에 쌓인 명령을 도착 순서대로 pipeline_depth개까지 꺼내 연속 송신 후 응답을 순서대로 수신
+    - 송신 스레드가 하나뿐이라 같은 레인의 명령은 항상 제출 순서대로 RTU에 도착
+    - 오류가 난 연결은 닫고 다음 배치에서 다시 연다 (응답이 늦게 도착해 다음 명령과 어긋나지 않도록)
+    """
+
+    def __init__(self, dispatcher, endpoint: str, index: int, timeout: float, baudrate: int):
+        self.dispatcher = dispatcher
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.baudrate = baudrate
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._conn = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"rtu-io[{endpoint}#{index}]", daemon=True)
+        self._thread.start()
+
+    def put(self, cmd: _PendingCommand):
+        with self._cond:
+            self._pending.append(cmd)
+            self._cond.notify()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._pending:
+                    break
+                batch = []
+                while self._pending and len(batch) < self.dispatcher.pipeline_depth:
+                    batch.append(self._pending.popleft())
+
+            self._send_pipelined(self.dispatcher._merge_duplicates(batch))
+
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _send_pipelined(self, commands: list):
+        if self._conn is None:
+            try:
+                self._conn = RtuConnection(self.endpoint, self.timeout, self.baudrate).open()
+            except Exception as e:
+                log(f"❌ RTU 연결 실패 ({self.endpoint}): {e}")
+                for cmd in commands:
+                    self.dispatcher._complete(cmd, "error", str(e))
+                return
+
+        try:
+            # 1. 모든 명령을 연속 송신
+            self._conn.write(b"".join(cmd.frame for cmd in commands))
+            self.dispatcher._count("sent", len(commands))
+
+            # 2. 응답을 송신 순서대로 수신
+            for cmd in commands:
+                line = self._conn.read_line().decode("utf-8", errors="replace")
+                try:
+                    response = json.loads(line)
+                except ValueError:
+                    response = line
+                self.dispatcher._complete(cmd, "ok", response)
+        except Exception as e:
+            log(f"❌ RTU 통신 오류 ({self.endpoint}): {e}")
+            self._conn.close()
+            self._conn = None
+            for cmd in commands:
+                if not cmd.futures[0].done():
+                    self.dispatcher._complete(cmd, "error", str(e))
+
+    def stop(self, wait: bool = True):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if wait:
+            self._thread.join()
+
+
+class HardwareDispatcher:
+    """
+    비동기 하드웨어 명령 디스패처
+
+    Args:
+        endpoints: {station: endpoint} 매핑. "default" 키는 매핑이 없는 국에 사용
+        pool_size: TCP 엔드포인트별 최대 연결 수 (여러 세션을 받는 게이트웨이만 2 이상).
+                   시리얼 / pty는 포트를 두 번 열면 응답이 섞이므로 항상 연결 1개
+        pipeline_depth: 한 번에 연속 송신할 최대 명령 수
+        timeout: RTU 응답 타임아웃 (초)
+        baudrate: 시리얼 포트 속도
+
+    순서 보장:
+        - 엔드포인트마다 레인(연결 + FIFO + 송신 스레드)을 pool_size개 두고, 국(station)별로 항상 같은 레인 사용
+        - 같은 국의 명령은 제출 순서대로 송신 ("시작" 뒤의 "정지"가 먼저 도착하지 않음)
+        - 연결이 1개인 엔드포인트는 모든 명령이 제출 순서대로 송신
+    """
+
+    LATENCY_WINDOW = 500
+
+    def __init__(self, endpoints: dict, pool_size: int = 1, pipeline_depth: int = 8,
+                 timeout: float = 2.0, baudrate: int = 9600):
+        self.endpoints = dict(endpoints)
+        self.pipeline_depth = pipeline_depth
+
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self._counts = {"submitted": 0, "sent": 0, "merged": 0, "completed": 0, "errors": 0, "unrouted": 0}
+
+        self._lanes = {}
+        for endpoint in sorted(set(self.endpoints.values())):
+            size = max(1, pool_size) if endpoint.startswith("tcp://") else 1
+            self._lanes[endpoint] = [
+                _EndpointLane(self, endpoint, i, timeout, baudrate)
+                for i in range(size)
+            ]
+
+    @classmethod
+    def from_env(cls):
+        """
+        환경 변수로 디스패처 생성
+
+        - HARDWARE_ENDPOINTS: '{"경보국": "tcp://10.0.0.5:7000", "default": "/dev/ttyUSB0"}'
+        - HARDWARE_POOL_SIZE: TCP 게이트웨이별 연결 수 (기본 1)
+        """
+        endpoints = json.loads(os.getenv("HARDWARE_ENDPOINTS", "{}"))
+        return cls(
+            endpoints,
+            pool_size=int(os.getenv("HARDWARE_POOL_SIZE", "1")),
+            timeout=float(os.getenv("HARDWARE_TIMEOUT", "2.0")),
+        )
+
+    def _route(self, command: dict):
+        station = command.get("slots", {}).get("station")
+        return self.endpoints.get(station) or self.endpoints.get("default")
+
+    def submit(self, command: dict) -> Future:
+        """
+        명령을 엔드포인트 대기열에 넣고 즉시 반환
+
+        Args:
+            command: parse_text 결과 {"intent": ..., "slots": {...}}
+
+        Returns:
+            Future: {"status", "response", "latency_ms"} 로 완료됨
+        """
+        future = Future()
+        endpoint = self._route(command)
+
+        with self._stats_lock:
+            self._counts["submitted"] += 1
+            if endpoint is None:
+                self._counts["unrouted"] += 1
+
+        if endpoint is None:
+            log(f"⚠️ 하드웨어 엔드포인트 없음: {command.get('slots', {}).get('station')}")
+            future.set_result({"status": "unrouted", "response": None, "latency_ms": 0.0})
+            return future
+
+        payload = {"intent": command.get("intent"), "slots": command.get("slots", {})}
+        frame = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8") + b"\n"
+
+        # 같은 국은 항상 같은 레인 → 국별 송신 순서 유지
+        lanes = self._lanes[endpoint]
+        station = str(payload["slots"].get("station", ""))
+        lanes[zlib.crc32(station.encode("utf-8")) % len(lanes)].put(_PendingCommand(endpoint, frame, future))
+        return future
+
+    def _merge_duplicates(self, batch: list) -> list:
+        """바로 앞 명령과 같은 명령은 병합 (한 번만 송신하고 응답을 공유)"""
+        commands = []
+        for cmd in batch:
+            if commands and commands[-1].frame == cmd.frame:
+                commands[-1].futures.extend(cmd.futures)
+                self._count("merged")
+                continue
+            commands.append(cmd)
+        return commands
+
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self._counts[key] += n
+
+    def _complete(self, cmd: _PendingCommand, status: str, response):
+        latency_ms = (time.monotonic() - cmd.submitted_at) * 1000
+        with self._stats_lock:
+            self._counts["completed" if status == "ok" else "errors"] += 1
+            self._latencies.append(latency_ms)
+
+        result = {"status": status, "response": response, "latency_ms": round(latency_ms, 2)}
+        for future in cmd.futures:
+            future.set_result(result)
+        log(f"📟 RTU 명령 완료 [{status}] {cmd.endpoint} ({latency_ms:.1f}ms)")
+
+    def stats(self) -> dict:
+        """누적 카운터와 최근 명령 완료 지연시간 백분위"""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            stats = dict(self._counts)
+
+        stats["queued"] = sum(len(lane) for lanes in self._lanes.values() for lane in lanes)
+        if latencies:
+            stats["latency_ms"] = {
+                "p50": round(latencies[len(latencies) // 2], 2),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+                "max": round(latencies[-1], 2),
+            }
+        return stats
+
+    def shutdown(self, wait: bool = True):
+        """대기 중인 명령까지 송신한 뒤 레인 종료"""
+        for lanes in self._lanes.values():
+            for lane in lanes:
+                lane.stop(wait=wait)
+
+
+def _serve_echo_rtu(host: str = "127.0.0.1", port: int = 0):
+    """
+    테스트용 RTU 스탠드인 (TCP)
+
+    - 수신한 명령 한 줄마다 {"ack": true, "intent": ...} 한 줄로 응답
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen()
+
+    def handle(client):
+        with client, client.makefile("rb") as reader:
+            for line in reader:
+                request = json.loads(line)
+                reply = {"ack": True, "intent": request.get("intent")}
+                client.sendall(json.dumps(reply).encode("utf-8") + b"\n")
+
+    def accept_loop():
+        while True:
+            client, _ = server.accept()
+            threading.Thread(target=handle, args=(client,), daemon=True).start()
+
+    threading.Thread(target=accept_loop, daemon=True).start()
+    return server.getsockname()
+
+
+if __name__ == "__main__":
+    host, port = _serve_echo_rtu()
+    dispatcher = HardwareDispatcher({"default": f"tcp://{host}:{port}"})
+
+    command = {"intent": "alert.broadcast", "slots": {"station": "경보국", "scenario": "시험", "volume": 10}}
+    futures = [dispatcher.submit(command) for _ in range(5)]
+    for f in futures:
+        print(f.result(timeout=5))
+
+    print(json.dumps(dispatcher.stats(), indent=2, ensure_ascii=False))
+    dispatcher.shutdown()
@@ -0,0 +1,98 @@
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from remote_inference import rule_nli_logits
+from utils import log
+
+"""
+    NLI 추론 서버 (원격 오프로드용 / 로컬 테스트 스탠드인)
+
+    역할:
+        - RemoteNliClient 가 보내는 POST /nli 배치 요청을 처리
+        - --model-dir 지정 시 XLM-R XNLI 모델로 추론 (공용 추론 서버)
+        - 미지정 시 규칙 기반 점수로 응답 (엣지 장비 없이 클라이언트/폴백 동작 테스트용)
+        - --delay 로 인위적 지연을 넣어 타임아웃 → 로컬 폴백 경로 확인 가능
+
+    실행:
+        python inference_server.py --port 8500 --model-dir D:\\models\\xlmR_xnli
+        python inference_server.py --port 8500              # 스탠드인
+"""
+
+
+def make_scorer(model_dir: str = None):
+    """(pairs, max_length) → 로짓 목록 함수 생성"""
+    if not model_dir:
+        log("🧪 규칙 기반 스탠드인 모드")
+        return lambda pairs, max_length: [rule_nli_logits(p, h) for p, h in pairs]
+
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    from ai_nlu_engine import nli_forward
+
+    log(f"🤖 NLI 모델 로딩 중... {model_dir}")
+    tokenizer = AutoTokenizer.from_pretrained(model_dir, local_files_only=True, use_fast=True)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir, local_files_only=True).eval()
+    log("✅ NLI 모델 로딩 완료!")
+    return lambda pairs, max_length: nli_forward(tokenizer, model, pairs, max_length)
+
+
+class NliRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive (클라이언트 연결 풀 재사용)
+    scorer = None
+    delay = 0.0
+
+    def _reply(self, status: int, body: dict):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"status": "ok"})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/nli":
+            self._reply(404, {"error": "not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            pairs = [tuple(p) for p in request["pairs"]]
+            max_length = int(request.get("max_length", 128))
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {"error": str(e)})
+            return
+
+        if self.delay:
+            time.sleep(self.delay)
+
+        self._reply(200, {"logits": self.scorer(pairs, max_length)})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host: str = "127.0.0.1", port: int = 8500, model_dir: str = None, delay: float = 0.0):
+    NliRequestHandler.scorer = staticmethod(make_scorer(model_dir))
+    NliRequestHandler.delay = delay
+    server = ThreadingHTTPServer((host, port), NliRequestHandler)
+    server.daemon_threads = True
+    log(f"📡 NLI 추론 서버 시작: http://{host}:{server.server_address[1]}")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NLI 추론 서버")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8500)
+    parser.add_argument("--model-dir", default=None, help="XNLI 모델 경로 (생략 시 규칙 기반 스탠드인)")
+    parser.add_argument("--delay", type=float, default=0.0, help="응답 지연 (초, 타임아웃 테스트용)")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.model_dir, args.delay).serve_forever()
@@ -0,0 +1,180 @@
+import hashlib
+import itertools
+import json
+import re
+from intent_tree import build_intent_tree
+from utils import log
+
+"""
+    Intent 설정 스냅샷 (핫 리로드용)
+
+    역할:
+        - COMMAND_HYPOTHESES / SCENARIO_TO_FILE 과 그로부터 파생된 상태를 하나의 불변 객체로 묶음
+            · 소문자 키워드 목록 (키워드 후보 필터)
+            · 컴파일된 슬롯 정규식
+            · Command 분류용 가설 문장 (description + examples)
+            · 계층형 Intent 트리 (domain_hypotheses = 도메인 노드 가설 문장)
+        - 새 설정으로 교체할 때 이전 스냅샷과 Intent별 지문(fingerprint)을 비교해
+          바뀐 Intent의 파생 상태만 다시 만듦
+        - 엔진은 참조 하나만 바꿔 끼우므로 교체는 원자적이고,
+          진행 중인 요청은 시작할 때 잡은 스냅샷으로 끝까지 처리됨
+
+    파일 형식 (JSON):
+        {"command_hypotheses": {intent: {...}}, "scenario_to_file": {"시험": "A.wav", ...},
+         "domain_hypotheses": {"alert": "이 명령은 경보 방송과 관련됩니다.", ...}}
+"""
+
+_versions = itertools.count(1)
+
+
+def _fingerprint(config: dict) -> str:
+    return hashlib.sha1(json.dumps(config, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class IntentDerived:
+    """Intent 하나의 파생 상태"""
+    __slots__ = ("fingerprint", "keywords", "patterns", "command_hypothesis")
+
+    def __init__(self, config: dict, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.keywords = [kw.lower() for kw in config["keywords"]]
+        self.patterns = {
+            slot_name: re.compile(pattern, re.IGNORECASE)
+            for slot_name, pattern in config.get("slot_patterns", {}).items()
+        }
+
+        hypothesis = config["description"]
+        if config.get("examples"):
+            hypothesis += f" 예시: {' '.join(config['examples'])}"
+        self.command_hypothesis = hypothesis
+
+
+def _check_type(value, expected, name: str):
+    if not isinstance(value, expected):
+        names = "/".join(t.__name__ for t in (expected if isinstance(expected, tuple) else (expected,)))
+        raise ValueError(f"{name}: {names} 형식이어야 합니다 (받은 값: {type(value).__name__})")
+
+
+def _check_str_list(value, name: str):
+    _check_type(value, list, name)
+    for item in value:
+        _check_type(item, str, f"{name} 항목")
+
+
+def _check_str_map(value, name: str):
+    _check_type(value, dict, name)
+    for key, item in value.items():
+        _check_type(item, str, f"{name}['{key}']")
+
+
+class IntentConfig:
+    REQUIRED_KEYS = ("description", "keywords")
+
+    def __init__(self, command_hypotheses: dict, scenario_to_file: dict, previous=None,
+                 domain_hypotheses: dict = None):
+        """
+        Args:
+            command_hypotheses: {intent: {description, examples, keywords, slots, slot_patterns, defaults}}
+            scenario_to_file: {scenario: 음원 파일}
+            domain_hypotheses: {도메인: 가설 문장} (계층형 분류용, 없으면 자동 생성)
+            previous: 이전 스냅샷 (있으면 바뀌지 않은 Intent의 파생 상태 재사용)
+
+        Raises:
+            ValueError: 필수 항목 누락 / 항목 형식 오류 / 잘못된 정규식
+        """
+        _check_type(command_hypotheses, dict, "command_hypotheses")
+        _check_str_map(scenario_to_file, "scenario_to_file")
+        if domain_hypotheses is not None:
+            _check_str_map(domain_hypotheses, "domain_hypotheses")
+
+        self.version = next(_versions)
+        self.command_hypotheses = command_hypotheses
+        self.scenario_to_file = scenario_to_file
+        self.domain_hypotheses = domain_hypotheses or {}
+
+        self.derived = {}
+        self.rebuilt = []
+        for intent, config in command_hypotheses.items():
+            self._validate_intent(intent, config)
+
+            fingerprint = _fingerprint(config)
+            cached = previous.derived.get(intent) if previous is not None else None
+            if cached is not None and cached.fingerprint == fingerprint:
+                self.derived[intent] = cached
+                continue
+
+            try:
+                self.derived[intent] = IntentDerived(config, fingerprint)
+            except re.error as e:
+                raise ValueError(f"Intent '{intent}' 슬롯 정규식 오류: {e}") from e
+            self.rebuilt.append(intent)
+
+        self.removed = [intent for intent in (previous.derived if previous else {}) if intent not in self.derived]
+
+        # 모든 Intent의 슬롯 정규식 (중복 제거, 원문 패턴 → 컴파일 패턴)
+        self.slot_patterns = {}
+        for intent, derived in self.derived.items():
+            for slot_name, compiled in derived.patterns.items():
+                self.slot_patterns.setdefault(command_hypotheses[intent]["slot_patterns"][slot_name], compiled)
+
+        # 계층형 Intent 트리 (구조만 만들므로 매번 새로 구성해도 비용이 작음)
+        self.intent_tree = build_intent_tree(command_hypotheses, self.domain_hypotheses)
+
+    @classmethod
+    def _validate_intent(cls, intent: str, config: dict):
+        """Intent 하나의 항목 형식 검사 (문자열 keywords 가 글자 단위로 풀리는 등의 조용한 오동작 방지)"""
+        _check_type(config, dict, f"Intent '{intent}'")
+        missing = [key for key in cls.REQUIRED_KEYS if key not in config]
+        if missing:
+            raise ValueError(f"Intent '{intent}' 필수 항목 누락: {missing}")
+
+        _check_type(config["description"], str, f"Intent '{intent}' description")
+        _check_str_list(config["keywords"], f"Intent '{intent}' keywords")
+        if "examples" in config:
+            _check_str_list(config["examples"], f"Intent '{intent}' examples")
+        if "slots" in config:
+            _check_type(config["slots"], dict, f"Intent '{intent}' slots")
+            for slot_name, candidates in config["slots"].items():
+                _check_type(candidates, list, f"Intent '{intent}' slots['{slot_name}']")
+        if "slot_patterns" in config:
+            _check_str_map(config["slot_patterns"], f"Intent '{intent}' slot_patterns")
+        if "defaults" in config:
+            _check_type(config["defaults"], dict, f"Intent '{intent}' defaults")
+
+    @classmethod
+    def from_dict(cls, data: dict, previous=None):
+        """
+        빠진 섹션(scenario_to_file / domain_hypotheses)은 이전 스냅샷 값을 그대로 이어받음
+        (command_hypotheses 만 보내는 부분 리로드가 방송 매핑·트리 계층을 지우지 않도록)
+        """
+        _check_type(data, dict, "Intent 설정")
+        if "command_hypotheses" not in data:
+            raise ValueError("Intent 설정 필수 섹션 누락: 'command_hypotheses'")
+
+        if "scenario_to_file" in data:
+            scenario_to_file = data["scenario_to_file"]
+        else:
+            scenario_to_file = previous.scenario_to_file if previous is not None else {}
+        if "domain_hypotheses" in data:
+            domain_hypotheses = data["domain_hypotheses"]
+        else:
+            domain_hypotheses = previous.domain_hypotheses if previous is not None else None
+        return cls(data["command_hypotheses"], scenario_to_file, previous, domain_hypotheses)
+
+    @classmethod
+    def load(cls, path: str, previous=None):
+        with open(path, encoding="utf-8") as f:
+            config = cls.from_dict(json.load(f), previous)
+        log(f"📄 Intent 설정 로드: {path} (v{config.version}, Intent {len(config.command_hypotheses)}개)")
+        return config
+
+    def to_dict(self) -> dict:
+        return {
+            "command_hypotheses": self.command_hypotheses,
+            "scenario_to_file": self.scenario_to_file,
+            "domain_hypotheses": self.domain_hypotheses,
+        }
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,119 @@
+"""
+    계층형 Intent 트리
+
+    역할:
+        - 점(.)으로 구분된 Intent 이름을 도메인 계층으로 구성
+          (예: alert / data / device → alert.broadcast, data.fetch.level ...)
+        - 노드마다 가설 문장을 두고 루트부터 빔 탐색으로 내려가며 분류
+          → 모델 호출 수가 Intent 수가 아니라 (트리 깊이 × 빔 폭 × 분기 수)에 비례
+        - 자식이 하나뿐인 노드는 점수 계산 없이 통과
+
+    가설 문장:
+        - 말단(Intent): Intent description
+        - 도메인: domain_hypotheses[도메인] (없으면 하위 Intent 설명을 묶어 자동 생성)
+"""
+
+
+class IntentNode:
+    __slots__ = ("name", "hypothesis", "children", "intent", "intents")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hypothesis = None
+        self.children = {}
+        self.intent = None      # 이 노드 자체가 Intent이면 이름
+        self.intents = set()    # 하위 트리의 모든 Intent
+
+
+def build_intent_tree(command_hypotheses: dict, domain_hypotheses: dict = None) -> IntentNode:
+    domain_hypotheses = domain_hypotheses or {}
+    root = IntentNode("")
+
+    for intent, config in command_hypotheses.items():
+        parts = intent.split(".")
+        node = root
+        node.intents.add(intent)
+        for depth in range(1, len(parts) + 1):
+            name = ".".join(parts[:depth])
+            child = node.children.get(name)
+            if child is None:
+                child = node.children[name] = IntentNode(name)
+            child.intents.add(intent)
+            node = child
+        node.intent = intent
+        node.hypothesis = config["description"]
+
+    def fill(node: IntentNode):
+        for child in node.children.values():
+            fill(child)
+        if node.hypothesis is None and node.name:
+            node.hypothesis = domain_hypotheses.get(node.name) or _summarize(node, command_hypotheses)
+
+    fill(root)
+    return root
+
+
+def _summarize(node: IntentNode, command_hypotheses: dict, limit: int = 3) -> str:
+    """도메인 가설 자동 생성: 하위 Intent 설명의 첫 구절 몇 개를 묶음"""
+    phrases = [command_hypotheses[i]["description"].split(".")[0] for i in sorted(node.intents)[:limit]]
+    return f"이 명령은 다음 작업 중 하나입니다: {', '.join(phrases)}."
+
+
+def descend(root: IntentNode, score_fn, beam_width: int = 2, allowed: set = None) -> tuple:
+    """
+    빔 탐색으로 Intent 분류
+
+    Args:
+        root: build_intent_tree 결과
+        score_fn: 가설 문장 목록 → 함의 확률 목록 (한 번의 배치 호출)
+        beam_width: 단계별로 남길 노드 수
+        allowed: 후보 Intent 집합 (키워드 필터 결과 등, None이면 전체)
+
+    Returns:
+        (intent, score, scored_hypotheses)
+        - scored_hypotheses: 모델에 넘긴 가설 수 (= NLI 순전파 행 수)
+    """
+    def viable(node):
+        return [c for c in node.children.values() if allowed is None or c.intents & allowed]
+
+    frontier = [(1.0, root)]
+    finished = []
+    scored = 0
+
+    while frontier:
+        next_frontier = []
+        to_score = []
+
+        for score, node in frontier:
+            if node.intent is not None and (allowed is None or node.intent in allowed):
+                finished.append((score, node.intent))
+
+            children = viable(node)
+            if len(children) == 1:
+                # 분기가 없으면 점수 계산 없이 통과
+                next_frontier.append((score, children[0]))
+            elif children:
+                to_score.append((score, children))
+
+        if to_score:
+            hypotheses = [child.hypothesis for _, children in to_score for child in children]
+            probs = score_fn(hypotheses)
+            scored += len(hypotheses)
+
+            i = 0
+            for score, children in to_score:
+                group = probs[i:i + len(children)]
+                i += len(children)
+                # 형제끼리 정규화해 경로 점수(부모 점수 × 자식 비율)를 깊이와 무관하게 비교
+                total = sum(group) or 1.0
+                for child, p in zip(children, group):
+                    next_frontier.append((score * p / total, child))
+
+        next_frontier.sort(key=lambda x: x[0], reverse=True)
+        frontier = next_frontier[:beam_width]
+
+    if not finished:
+        return None, 0.0, scored
+
+    score, intent = max(finished, key=lambda x: x[0])
+    return intent, score, scored
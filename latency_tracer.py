@@ -0,0 +1,105 @@
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from utils import log
+
+"""
+    음성 → 명령 종단 간 지연 추적
+
+    역할:
+        - 발화 1건마다 UtteranceTrace를 만들어 STT → NLU → 명령 출력까지 들고 다님
+        - 각 경계에서 monotonic 타임스탬프 기록 (mark)
+        - 인접한 경계 사이 구간(span) 지연과 발화 전체 지연 계산
+        - LatencyTracker로 최근 N건의 구간별 백분위(p50/p90/p99) 집계 및 JSONL 내보내기
+
+    기록 지점 (순서대로):
+        last_audio_frame → vosk_final → nlu_start → nlu_stages_start → nlu_stages_done
+        → nlu_done → command_emitted
+"""
+
+_ids = itertools.count(1)
+
+
+class UtteranceTrace:
+    def __init__(self, source: str = "mic"):
+        self.id = next(_ids)
+        self.source = source
+        self.marks = []
+        self.attrs = {}
+
+    def mark(self, name: str, at: float = None):
+        """경계 통과 시각 기록 (같은 이름은 처음 한 번만)"""
+        if any(n == name for n, _ in self.marks):
+            return
+        self.marks.append((name, time.monotonic() if at is None else at))
+
+    def spans(self) -> list:
+        """인접 경계 사이 구간 [(이름, ms), ...]"""
+        ordered = sorted(self.marks, key=lambda m: m[1])
+        return [
+            (f"{a}→{b}", (tb - ta) * 1000)
+            for (a, ta), (b, tb) in zip(ordered, ordered[1:])
+        ]
+
+    def total_ms(self) -> float:
+        if len(self.marks) < 2:
+            return 0.0
+        times = [t for _, t in self.marks]
+        return (max(times) - min(times)) * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "source": self.source,
+            "total_ms": round(self.total_ms(), 2),
+            "spans": {name: round(ms, 2) for name, ms in self.spans()},
+            **self.attrs,
+        }
+
+
+class LatencyTracker:
+    """
+    Args:
+        window: 백분위 계산에 쓸 최근 발화 수
+        export_path: 지정 시 발화별 trace를 JSONL로 추가 기록
+    """
+
+    def __init__(self, window: int = 500, export_path: str = None):
+        self.window = window
+        self.export_path = export_path
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, trace: UtteranceTrace):
+        data = trace.to_dict()
+        with self._lock:
+            for name, ms in list(data["spans"].items()) + [("total", data["total_ms"])]:
+                self._samples.setdefault(name, deque(maxlen=self.window)).append(ms)
+
+            if self.export_path:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(data, ensure_ascii=False) + "\n")
+
+        log(f"⏱️ 발화 #{trace.id} 총 {data['total_ms']:.1f}ms | " +
+            ", ".join(f"{name} {ms:.1f}ms" for name, ms in data["spans"].items()))
+
+    def percentiles(self) -> dict:
+        """{구간: {"count", "p50", "p90", "p99"}}"""
+        with self._lock:
+            snapshot = {name: sorted(values) for name, values in self._samples.items()}
+
+        def pick(values, q):
+            return round(values[min(len(values) - 1, int(len(values) * q))], 2)
+
+        return {
+            name: {"count": len(values), "p50": pick(values, 0.5), "p90": pick(values, 0.9), "p99": pick(values, 0.99)}
+            for name, values in snapshot.items() if values
+        }
+
+    def report(self):
+        log("📊 구간별 지연 (최근 {}건)".format(self.window))
+        for name, row in self.percentiles().items():
+            log(f"  {name:40s} n={row['count']:<4d} p50 {row['p50']:8.1f}ms  "
+                f"p90 {row['p90']:8.1f}ms  p99 {row['p99']:8.1f}ms")
@@ -1,5 +1,6 @@
 import json
 import re
+import sys
 
 from controller import VoiceController
 from ai_nlu_engine import UniversalNluEngine  # 텍스트 모드 직사용
@@ -71,10 +72,16 @@ def voice_mode():
         print("=" * 60)
 
         controller = VoiceController(MODEL_PATH, max_port=8)
-        command = controller.start_command_recognition()
 
-        print("\n🎯 최종 명령어:")
-        print(json.dumps(command, indent=2, ensure_ascii=False))
+        def on_command(command):
+            print("\n🎯 최종 명령어:")
+            print(json.dumps(command, indent=2, ensure_ascii=False))
+
+        # 스트림을 한 번만 열고 명령을 연달아 처리 (Ctrl+C로 종료)
+        try:
+            controller.listen_forever(on_command)
+        finally:
+            controller.close()
 
     except FileNotFoundError:
         print("\n❌ 'model' 폴더 없음. Vosk 한국어 모델을 넣어주세요.")
@@ -83,7 +90,26 @@ def voice_mode():
         print(f"\n❌ 예외: {e}")
 
 
+def replay_mode(wav_paths: list):
+    """
+    녹음 재생 모드 (음성 → 명령 지연 측정 재현)
+    """
+    MODEL_PATH = "model"
+    print("\n" + "=" * 60)
+    print("⏱️  녹음 재생 지연 측정 모드")
+    print("=" * 60)
+
+    controller = VoiceController(MODEL_PATH, max_port=8, latency_log="latency_traces.jsonl")
+    report = controller.replay(wav_paths)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
 def main():
+    # python main.py replay a.wav b.wav ...
+    if len(sys.argv) > 2 and sys.argv[1] == "replay":
+        replay_mode(sys.argv[2:])
+        return
+
     print("=" * 60)
     print("🤖 대화형 RTU NLU 데모 (what–how–action)")
     print("=" * 60)
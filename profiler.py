@@ -0,0 +1,408 @@
+import contextvars
+import cProfile
+import io
+import itertools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from utils import log
+
+"""
+    실행 중인 서버 온디맨드 프로파일링
+
+    역할:
+        - 다음 N건의 요청 또는 T초 동안만 프로파일 수집 (캡처가 없으면 요청당 None 비교 1번뿐)
+        - 수집 방식 (modes)
+            "cpu":    요청 스레드 + StageGraph 단계 스레드마다 cProfile → 합쳐서 pstats
+            "sample": 전 스레드 스택 샘플링 → folded stacks (flamegraph.pl / speedscope 입력)
+            "memory": tracemalloc 시작/종료 스냅샷 비교 → 할당 상위 목록 + 스냅샷 파일
+            "torch":  NLI 호출마다 torch.profiler → 연산자별 시간 합산 표 + JSON (torch 설치 시)
+        - 결과는 캡처별 디렉터리에 파일로 저장해 다운로드
+
+    사용 예:
+        profiler = Profiler("profiles")
+        profiler.start(requests=20, seconds=30, modes=["cpu", "sample"])
+
+        with profiler.track():          # 요청 처리부
+            ...
+        graph = StageGraph(wrap=run_stage)   # 단계 스레드도 cProfile 대상
+        profile_torch(nli_forward, ...)      # NLI 호출 연산자 시간
+
+    주의:
+        - Python 3.12+의 cProfile은 프로세스 전역 sys.monitoring을 쓰므로 동시에 하나만 켤 수 있음
+          → 3.12+에서는 캡처 하나에 프로세스 전역 cProfile 하나 (캡처 기간 중 다른 요청의 실행도 포함됨).
+          다른 도구가 이미 프로파일 중이면 cpu 수집은 건너뜀
+        - torch.profiler 세션은 프로세스에 하나만, 시작한 스레드에서만 연산이 잡히므로
+          torch 모드에서는 NLI 호출을 한 번에 하나씩 프로파일 (캡처 중에는 NLI 호출이 직렬화됨)
+"""
+
+MODES = ("cpu", "sample", "memory", "torch")
+
+# 현재 요청이 속한 캡처 (StageGraph가 컨텍스트를 복사하므로 단계 스레드에서도 보임)
+_current_capture = contextvars.ContextVar("profile_capture", default=None)
+
+_ids = itertools.count(1)
+
+# 3.12+: cProfile이 프로세스 전역 sys.monitoring 기반 (스레드별 프로파일 불가)
+_GLOBAL_CPROFILE = sys.version_info >= (3, 12)
+
+
+def _enable_profile():
+    """cProfile 시작 (다른 프로파일러가 이미 켜져 있어 시작할 수 없으면 None)"""
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError as e:
+        log(f"⚠️ cProfile 시작 불가 (cpu 수집 생략): {e}")
+        return None
+    return profile
+
+
+def run_stage(fn, deps):
+    """StageGraph 단계 실행 래퍼: 캡처 중인 요청의 단계면 해당 스레드에서도 cProfile (3.12 미만)"""
+    capture = _current_capture.get()
+    if capture is None or "cpu" not in capture.modes or _GLOBAL_CPROFILE:
+        return fn(deps)
+
+    profile = _enable_profile()
+    if profile is None:
+        return fn(deps)
+    try:
+        return fn(deps)
+    finally:
+        profile.disable()
+        capture.add_profile(profile)
+
+
+def profile_torch(fn, *args, **kwargs):
+    """NLI 호출 래퍼: 캡처 중인 요청이면 torch.profiler로 감싸 연산자별 시간을 캡처에 누적"""
+    capture = _current_capture.get()
+    if capture is None or "torch" not in capture.modes:
+        return fn(*args, **kwargs)
+
+    import torch
+    with capture.torch_lock:
+        with torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True) as prof:
+            result = fn(*args, **kwargs)
+        capture.add_torch_events(prof.key_averages())
+    return result
+
+
+class _Sampler(threading.Thread):
+    """sys._current_frames()로 전 스레드 스택을 주기적으로 수집 (folded stacks)"""
+
+    def __init__(self, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileCapture:
+    """
+    Args:
+        directory: 결과 파일 저장 디렉터리
+        requests: 프로파일할 요청 수 (None이면 제한 없음)
+        seconds: 최대 수집 시간 (None이면 제한 없음)
+        modes: MODES 중 일부
+        sample_interval: 스택 샘플링 주기 (초)
+    """
+
+    def __init__(self, directory: str, requests: int = None, seconds: float = None,
+                 modes=("cpu", "sample"), sample_interval: float = 0.005):
+        unknown = [m for m in modes if m not in MODES]
+        if unknown:
+            raise ValueError(f"지원하지 않는 프로파일 방식: {unknown}")
+        if not requests and not seconds:
+            raise ValueError("requests 또는 seconds 중 하나는 지정해야 합니다")
+
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{next(_ids)}"
+        self.directory = os.path.join(directory, self.id)
+        self.requests = requests
+        self.seconds = seconds
+        self.modes = tuple(modes)
+        self.sample_interval = sample_interval
+
+        self.started = 0       # 캡처 대상으로 시작한 요청 수
+        self.completed = 0     # 캡처 대상으로 끝난 요청 수
+        self.finished = False
+        self.artifacts = []
+        self.summary = {}
+
+        self._lock = threading.Lock()
+        self._profiles = []
+        self._sampler = None
+        self._torch_ops = {}
+        self.torch_lock = threading.Lock()
+        self.torch_calls = 0
+        self._memory_start = None
+        self._stop_tracemalloc = False
+        self._global_profile = None
+        self._started_at = None
+
+    def begin(self):
+        self._started_at = time.monotonic()
+
+        if "cpu" in self.modes and _GLOBAL_CPROFILE:
+            self._global_profile = _enable_profile()
+
+        if "memory" in self.modes:
+            self._stop_tracemalloc = not tracemalloc.is_tracing()
+            if self._stop_tracemalloc:
+                tracemalloc.start(16)
+            self._memory_start = tracemalloc.take_snapshot()
+
+        if "sample" in self.modes:
+            self._sampler = _Sampler(self.sample_interval)
+            self._sampler.start()
+
+    def admit(self) -> bool:
+        """새 요청을 캡처 대상으로 받을지 결정 (요청 수 제한)"""
+        with self._lock:
+            if self.finished or (self.requests and self.started >= self.requests):
+                return False
+            self.started += 1
+            return True
+
+    def add_profile(self, profile: cProfile.Profile):
+        with self._lock:
+            if not self.finished:
+                self._profiles.append(profile)
+
+    def add_torch_events(self, events):
+        """torch.profiler key_averages() 결과 누적 (시간 단위: us)"""
+        with self._lock:
+            if self.finished:
+                return
+            self.torch_calls += 1
+            for event in events:
+                op = self._torch_ops.setdefault(event.key, {"count": 0, "cpu_time_us": 0.0, "self_cpu_time_us": 0.0})
+                op["count"] += event.count
+                op["cpu_time_us"] += event.cpu_time_total
+                op["self_cpu_time_us"] += event.self_cpu_time_total
+
+    def request_done(self) -> bool:
+        """요청 1건 종료. 요청 수 제한에 도달하면 True"""
+        with self._lock:
+            self.completed += 1
+            return bool(self.requests) and self.completed >= self.requests
+
+    def finish(self):
+        """수집 종료 및 결과 파일 작성"""
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+            profiles = list(self._profiles)
+
+        if self._global_profile is not None:
+            self._global_profile.disable()
+            profiles.append(self._global_profile)
+
+        os.makedirs(self.directory, exist_ok=True)
+        elapsed = time.monotonic() - self._started_at
+        self.summary = {
+            "id": self.id,
+            "modes": list(self.modes),
+            "requests": self.completed,
+            "elapsed_s": round(elapsed, 3),
+        }
+
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._write("sample.folded", self._sampler.folded())
+            self.summary["samples"] = self._sampler.samples
+
+        if "cpu" in self.modes and profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(self._path("cpu.pstats"))
+            self.artifacts.append("cpu.pstats")
+
+            text = io.StringIO()
+            pstats.Stats(self._path("cpu.pstats"), stream=text).sort_stats("cumulative").print_stats(60)
+            self._write("cpu.txt", text.getvalue())
+
+        if self._torch_ops:
+            ops = sorted(self._torch_ops.items(), key=lambda item: item[1]["self_cpu_time_us"], reverse=True)
+            self._write("torch_ops.json", json.dumps(dict(ops), ensure_ascii=False, indent=2))
+
+            lines = [f"NLI 호출 {self.torch_calls}회", f"{'연산자':50s} {'호출':>8s} {'self CPU(ms)':>14s} {'CPU 합계(ms)':>14s}"]
+            for name, op in ops[:40]:
+                lines.append(f"{name[:50]:50s} {op['count']:8d} {op['self_cpu_time_us'] / 1000:14.2f} "
+                             f"{op['cpu_time_us'] / 1000:14.2f}")
+            self._write("torch.txt", "\n".join(lines) + "\n")
+            self.summary["torch_calls"] = self.torch_calls
+
+        if self._memory_start is not None:
+            snapshot = tracemalloc.take_snapshot()
+            if self._stop_tracemalloc:
+                tracemalloc.stop()
+            snapshot.dump(self._path("memory.tracemalloc"))
+            self.artifacts.append("memory.tracemalloc")
+
+            diff = snapshot.compare_to(self._memory_start, "lineno")
+            self._write("memory.txt", "\n".join(str(stat) for stat in diff[:40]) + "\n")
+            self.summary["memory_growth_kb"] = round(sum(s.size_diff for s in diff) / 1024, 1)
+
+        self._write("summary.json", json.dumps(self.summary, ensure_ascii=False, indent=2))
+        log(f"🔬 프로파일 캡처 완료: {self.directory} ({self.completed}건, {elapsed:.1f}s)")
+
+    def status(self) -> dict:
+        return {
+            "id": self.id,
+            "modes": list(self.modes),
+            "requests": self.requests,
+            "seconds": self.seconds,
+            "completed": self.completed,
+            "finished": self.finished,
+            "artifacts": list(self.artifacts),
+        }
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _write(self, name: str, content: str):
+        with open(self._path(name), "w", encoding="utf-8") as f:
+            f.write(content)
+        self.artifacts.append(name)
+
+
+class _RequestScope:
+    """캡처 대상 요청 1건: 요청 스레드 cProfile + 단계 스레드로 캡처 전달"""
+
+    def __init__(self, profiler, capture: ProfileCapture):
+        self.profiler = profiler
+        self.capture = capture
+        self.profile = None
+        self.token = None
+
+    def __enter__(self):
+        self.token = _current_capture.set(self.capture)
+        if "cpu" in self.capture.modes and not _GLOBAL_CPROFILE:
+            self.profile = _enable_profile()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile is not None:
+            self.profile.disable()
+            self.capture.add_profile(self.profile)
+        _current_capture.reset(self.token)
+        if self.capture.request_done():
+            self.profiler.stop(self.capture)
+        return False
+
+
+class _NullScope:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SCOPE = _NullScope()
+
+
+class Profiler:
+    """
+    Args:
+        directory: 캡처 결과 루트 디렉터리
+    """
+
+    def __init__(self, directory: str = "profiles"):
+        self.directory = directory
+        self.active = None
+        self.last = None
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def start(self, requests: int = None, seconds: float = None, modes=("cpu", "sample"),
+              sample_interval: float = 0.005) -> ProfileCapture:
+        """
+        캡처 시작
+
+        Raises:
+            ValueError: 잘못된 인자
+            RuntimeError: 이미 진행 중인 캡처가 있음
+        """
+        capture = ProfileCapture(self.directory, requests, seconds, modes, sample_interval)
+        with self._lock:
+            if self.active is not None:
+                raise RuntimeError(f"이미 진행 중인 프로파일 캡처가 있습니다: {self.active.id}")
+            capture.begin()
+            self.active = capture
+
+        if seconds:
+            self._timer = threading.Timer(seconds, self.stop, args=(capture,))
+            self._timer.daemon = True
+            self._timer.start()
+
+        log(f"🔬 프로파일 캡처 시작: {capture.id} (요청 {requests or '-'}건 / {seconds or '-'}초, {', '.join(capture.modes)})")
+        return capture
+
+    def stop(self, capture: ProfileCapture = None):
+        """캡처 종료 (capture 지정 시 그 캡처가 진행 중일 때만)"""
+        with self._lock:
+            if self.active is None or (capture is not None and capture is not self.active):
+                return None
+            capture, self.active, self.last = self.active, None, self.active
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        capture.finish()
+        return capture
+
+    def track(self):
+        """요청 처리부를 감싸는 컨텍스트 매니저 (캡처가 없으면 아무것도 하지 않음)"""
+        capture = self.active
+        if capture is None or not capture.admit():
+            return _NULL_SCOPE
+        return _RequestScope(self, capture)
+
+    def status(self) -> dict:
+        return {
+            "active": self.active.status() if self.active else None,
+            "last": self.last.status() if self.last else None,
+        }
+
+    def artifact_dir(self, capture_id: str):
+        """캡처 결과 디렉터리 (없으면 None)"""
+        for capture in (self.active, self.last):
+            if capture is not None and capture.id == capture_id:
+                return capture.directory
+        path = os.path.join(self.directory, os.path.basename(capture_id))
+        return path if os.path.isdir(path) else None
@@ -1,23 +1,115 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_from_directory
 from ai_nlu_engine import UniversalNluEngine
+from student_nlu import StudentNluEngine
+from hardware_dispatcher import HardwareDispatcher
+from single_flight import SingleFlight
+from profiler import Profiler
+from traffic_capture import TrafficRecorder
+import hmac
 import json
+import os
+import threading
+import time
 
 app = Flask(__name__)
 
-# NLU 엔진 초기화 (한 번만)
+# NLU 엔진 초기화 (한 번만) - NLU_STUDENT_MODEL 지정 시 증류된 경량 엔진 사용 (distill.py)
 print("🤖 AI 엔진 로딩 중...")
-nlu_engine = UniversalNluEngine()
+STUDENT_MODEL = os.getenv("NLU_STUDENT_MODEL")
+nlu_engine = StudentNluEngine.load(STUDENT_MODEL) if STUDENT_MODEL else UniversalNluEngine()
 print("✅ AI 엔진 준비 완료!")
 
+# 하드웨어 명령 디스패처 (백그라운드 큐 + RTU 연결 풀)
+hardware_dispatcher = HardwareDispatcher.from_env()
+
+# 동시에 parse_text를 실행할 요청 수 상한 (스레드 프로파일의 request_workers, 없으면 제한 없음)
+#   Flask 요청 스레드가 torch 스레드와 코어를 두고 경쟁하지 않도록 나머지 요청은 대기
+REQUEST_WORKERS = getattr(nlu_engine, "thread_profile", {}).get("request_workers")
+parse_slots = threading.BoundedSemaphore(REQUEST_WORKERS) if REQUEST_WORKERS else None
+
+
+def parse_text_limited(text: str, budget_ms: float = None, session_id: str = None):
+    if parse_slots is None:
+        return nlu_engine.parse_text(text, budget_ms=budget_ms, session_id=session_id)
+    with parse_slots:
+        return nlu_engine.parse_text(text, budget_ms=budget_ms, session_id=session_id)
+
+
+# 동일 텍스트 동시 요청 병합 (Android 재시도 / 여러 운영자의 같은 명령)
+parse_flight = SingleFlight()
+
+# 온디맨드 프로파일러 (캡처가 없을 때는 요청 처리에 관여하지 않음)
+profiler = Profiler(os.getenv("PROFILE_DIR", "profiles"))
+
+# 트래픽 캡처 (TRAFFIC_CAPTURE_PATH 지정 시에만, replay_traffic.py로 재생)
+TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH")
+traffic_recorder = TrafficRecorder(
+    TRAFFIC_CAPTURE_PATH,
+    max_bytes=int(os.getenv("TRAFFIC_CAPTURE_MAX_BYTES", str(16 * 1024 * 1024))),
+    backups=int(os.getenv("TRAFFIC_CAPTURE_BACKUPS", "5")),
+) if TRAFFIC_CAPTURE_PATH else None
+
+# 과부하 보호: 동시 처리 요청이 임계값을 넘으면 선택 단계를 생략하는 시간 예산 적용
+OVERLOAD_THRESHOLD = int(os.getenv("OVERLOAD_THRESHOLD", "4"))
+OVERLOAD_BUDGET_MS = float(os.getenv("OVERLOAD_BUDGET_MS", "1500"))
+active_lock = threading.Lock()
+active_requests = 0
+shed_requests = 0
+
+
+def request_budget(data: dict):
+    """
+    요청 시간 예산 결정
+
+    @param data: 요청 JSON ("budget_ms" 선택)
+    @return: 예산 (ms) 또는 None (예산 없음 = 가장 정확한 경로)
+    """
+    global shed_requests
+    budget = data.get('budget_ms')
+    budget = float(budget) if budget is not None else None
+
+    with active_lock:
+        overloaded = active_requests > OVERLOAD_THRESHOLD
+        if overloaded:
+            shed_requests += 1
+
+    if overloaded:
+        print(f"⚠️ 과부하 ({active_requests}건 처리 중) → 예산 {OVERLOAD_BUDGET_MS:.0f}ms 적용")
+        return min(budget, OVERLOAD_BUDGET_MS) if budget is not None else OVERLOAD_BUDGET_MS
+    return budget
+
 
 @app.route('/process', methods=['POST'])
 def process_voice_command():
     """
     Android에서 받은 음성 텍스트 처리
 
-    요청: {"text": "디지털 출력 1번 켜"}
+    요청: {"text": "디지털 출력 1번 켜", "budget_ms": 500, "client_id": "tablet-3"}
+          (budget_ms 선택: 응답 시간 예산 / client_id 선택: 대화 세션 키 → "볼륨 더 크게" 같은 후속 명령 해석)
     응답: {"response": "디지털 출력 1번을 켰습니다", "command": {...}}
     """
+    with profiler.track():
+        if traffic_recorder is None:
+            return _process_voice_command()
+
+        arrived_at = time.time()
+        start = time.perf_counter()
+        result = _process_voice_command()
+        response, status = result if isinstance(result, tuple) else (result, 200)
+
+        data = request.get_json(silent=True) or {}
+        traffic_recorder.record(
+            arrived_at, data.get('text', ''), data.get('budget_ms'), status,
+            (time.perf_counter() - start) * 1000, (response.get_json() or {}).get('command') or {},
+            client_id=data.get('client_id'),
+        )
+        return result
+
+
+def _process_voice_command():
+    global active_requests
+    with active_lock:
+        active_requests += 1
     try:
         # 1. 텍스트 수신
         data = request.json
@@ -33,8 +125,15 @@ def process_voice_command():
         print(f"📱 Android로부터 수신: {text}")
         print(f"{'=' * 60}")
 
-        # 2. NLU: 텍스트 → JSON 명령
-        command = nlu_engine.parse_text(text)
+        # 2. NLU: 텍스트 → JSON 명령 (진행 중인 동일 요청이 있으면 결과 공유)
+        #    시간 예산이 다르면 결과도 달라질 수 있으므로 병합 키에 예산 포함
+        #    세션이 있으면 같은 문장도 클라이언트마다 해석이 다르므로(후속 명령) 병합 키에 client_id 포함
+        budget_ms = request_budget(data)
+        client_id = data.get('client_id')
+        command, shared = parse_flight.do(
+            f"{SingleFlight.normalize(text)}|{budget_ms}|{client_id}",
+            parse_text_limited, text, budget_ms=budget_ms, session_id=client_id
+        )
 
         if "error" in command:
             print(f"❌ 에러: {command['error']}")
@@ -52,8 +151,10 @@ def process_voice_command():
         print(f"📣 응답: {response_text}")
         print(f"{'=' * 60}\n")
 
-        # 4. 하드웨어 제어 (시리얼 통신 등)
-        # execute_hardware_command(command)  # 나중에 구현
+        # 4. 하드웨어 제어 (시리얼 통신 등) - 큐에 넣고 바로 응답
+        #    병합된 요청은 leader가 이미 송신했으므로 중복 송신하지 않음
+        if not shared:
+            hardware_dispatcher.submit(command)
 
         return jsonify({
             "response": response_text,
@@ -71,6 +172,10 @@ def process_voice_command():
             "response": "명령을 처리할 수 없습니다"
         }), 500
 
+    finally:
+        with active_lock:
+            active_requests -= 1
+
 
 def generate_response(command: dict) -> str:
     """
@@ -141,6 +246,132 @@ def health_check():
     return jsonify({"status": "ok", "message": "라즈베리파이 서버 정상 작동 중"})
 
 
+def is_admin() -> bool:
+    """관리자 토큰 확인 (ADMIN_TOKEN 미설정 시 관리자 엔드포인트 비활성화)"""
+    token = os.getenv("ADMIN_TOKEN")
+    provided = request.headers.get("X-Admin-Token", "")
+    return bool(token) and hmac.compare_digest(provided.encode("utf-8"), token.encode("utf-8"))
+
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_intents():
+    """
+    Intent 설정 핫 리로드 (모델 재로딩 없음)
+
+    요청: 본문 없음 → INTENT_CONFIG_PATH 파일 다시 읽기
+          {"command_hypotheses": {...}, "scenario_to_file": {...}} → 본문 설정으로 교체
+    응답: {"version": 2, "rebuilt": ["alert.broadcast"], "removed": []}
+    """
+    if not is_admin():
+        return jsonify({"error": "권한이 없습니다"}), 403
+
+    try:
+        data = request.get_json(silent=True)
+        return jsonify(nlu_engine.reload_config(data=data or None))
+    except (ValueError, KeyError, OSError) as e:
+        print(f"❌ Intent 설정 리로드 실패: {e}")
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route('/admin/intent-tree/evaluate', methods=['POST'])
+def evaluate_intent_tree():
+    """
+    계층형 Intent 분류 vs 운영 평면 분류 정확도/비용 리포트 (요청 수만큼 모델 호출, 운영 중 실행 주의)
+
+    요청: 본문 없음 → Intent 설정의 examples로 평가
+          {"samples": [["경보국 시험 방송 시작", "alert.broadcast"], ...], "beam_width": 2}
+    응답: {"samples": 12, "flat": {"accuracy", "avg_hypotheses"}, "tree": {...}, "agreement"}
+    """
+    if not is_admin():
+        return jsonify({"error": "권한이 없습니다"}), 403
+
+    data = request.get_json(silent=True) or {}
+    try:
+        samples = [tuple(sample) for sample in data['samples']] if data.get('samples') else None
+        return jsonify(nlu_engine.evaluate_intent_tree(samples, data.get('beam_width')))
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route('/admin/profile', methods=['POST'])
+def start_profile():
+    """
+    프로파일 캡처 시작 (다음 N건의 /process 요청 또는 T초 동안)
+
+    요청: {"requests": 20, "seconds": 30, "modes": ["cpu", "sample", "memory", "torch"]}
+          (requests / seconds 중 하나 이상, modes 생략 시 ["cpu", "sample"])
+    응답: {"id": "20250101-120000-1", ...}
+    """
+    if not is_admin():
+        return jsonify({"error": "권한이 없습니다"}), 403
+
+    data = request.get_json(silent=True) or {}
+    try:
+        capture = profiler.start(
+            requests=data.get('requests'),
+            seconds=data.get('seconds'),
+            modes=data.get('modes', ("cpu", "sample")),
+            sample_interval=float(data.get('sample_interval', 0.005)),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(capture.status()), 202
+
+
+@app.route('/admin/profile', methods=['GET'])
+def profile_status():
+    """진행 중 / 마지막 캡처 상태와 결과 파일 목록"""
+    if not is_admin():
+        return jsonify({"error": "권한이 없습니다"}), 403
+    return jsonify(profiler.status())
+
+
+@app.route('/admin/profile/stop', methods=['POST'])
+def stop_profile():
+    """진행 중인 캡처를 즉시 종료하고 결과 파일 작성"""
+    if not is_admin():
+        return jsonify({"error": "권한이 없습니다"}), 403
+    capture = profiler.stop()
+    if capture is None:
+        return jsonify({"error": "진행 중인 캡처가 없습니다"}), 404
+    return jsonify(capture.status())
+
+
+@app.route('/admin/profile/<capture_id>/<artifact>', methods=['GET'])
+def download_profile(capture_id, artifact):
+    """
+    캡처 결과 파일 다운로드
+
+    - cpu.pstats: python -m pstats / snakeviz
+    - sample.folded: flamegraph.pl / speedscope
+    - memory.tracemalloc: tracemalloc.Snapshot.load
+    - torch.txt / torch_ops.json: NLI 호출 연산자별 시간
+    """
+    if not is_admin():
+        return jsonify({"error": "권한이 없습니다"}), 403
+    directory = profiler.artifact_dir(capture_id)
+    if directory is None:
+        return jsonify({"error": "캡처를 찾을 수 없습니다"}), 404
+    return send_from_directory(os.path.abspath(directory), artifact, as_attachment=True)
+
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """서버 내부 통계 (하드웨어 명령 처리량/지연시간 등)"""
+    return jsonify({
+        "hardware": hardware_dispatcher.stats(),
+        "single_flight": parse_flight.stats(),
+        "load": {"active_requests": active_requests, "shed_requests": shed_requests},
+        "intent_config_version": nlu_engine.config.version if nlu_engine.config else None,
+        "remote_inference": nlu_engine.remote.stats if nlu_engine.remote else None,
+        "anytime": nlu_engine.anytime_report() if nlu_engine.anytime else None,
+        "sessions": nlu_engine.sessions.report() if hasattr(nlu_engine, "sessions") else None,
+        "traffic_capture": {"path": traffic_recorder.path, "records": traffic_recorder.records} if traffic_recorder else None,
+    })
+
+
 if __name__ == '__main__':
     print("\n" + "=" * 60)
     print("🍓 라즈베리파이 음성 제어 서버")
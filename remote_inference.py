@@ -0,0 +1,134 @@
+import http.client
+import json
+import queue
+import threading
+import time
+from urllib.parse import urlsplit
+from utils import log
+
+"""
+    원격 NLI 추론 클라이언트
+
+    역할:
+        - 무거운 XLM-R NLI 추론을 공용 추론 서버(inference_server.py)로 넘김
+        - keep-alive HTTP 연결을 풀로 유지해 요청마다 TCP 연결 비용을 내지 않음
+        - (premise, hypothesis) 쌍들을 한 요청에 묶어 전송 (배치)
+        - 타임아웃/연결 실패 시 RemoteInferenceError → 엔진이 로컬 경로로 폴백
+        - 실패 직후에는 일정 시간 원격을 건너뛰어 매 요청이 타임아웃을 기다리지 않게 함
+
+    프로토콜:
+        POST /nli  {"pairs": [[premise, hypothesis], ...], "max_length": 128}
+               →  {"logits": [[contradiction, neutral, entailment], ...]}
+"""
+
+
+class RemoteInferenceError(Exception):
+    pass
+
+
+class RemoteNliClient:
+    """
+    Args:
+        url: 추론 서버 주소 (예: "http://10.0.0.20:8500")
+        timeout: 요청 타임아웃 (초)
+        pool_size: 유지할 최대 keep-alive 연결 수
+        max_batch: 한 요청에 담을 최대 쌍 개수
+        retry_after: 실패 후 원격을 다시 시도하기까지 대기 (초)
+    """
+
+    def __init__(self, url: str, timeout: float = 1.0, pool_size: int = 4,
+                 max_batch: int = 32, retry_after: float = 10.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.max_batch = max_batch
+        self.retry_after = retry_after
+
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+        self.stats = {"requests": 0, "pairs": 0, "failures": 0, "skipped": 0}
+
+    def _acquire(self) -> http.client.HTTPConnection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, conn: http.client.HTTPConnection):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _post(self, body: dict) -> dict:
+        conn = self._acquire()
+        try:
+            conn.request("POST", "/nli", body=json.dumps(body, ensure_ascii=False).encode("utf-8"),
+                         headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            payload = response.read()
+            if response.status != 200:
+                raise RemoteInferenceError(f"HTTP {response.status}: {payload[:200]!r}")
+        except Exception:
+            conn.close()
+            raise
+        self._release(conn)
+        return json.loads(payload)
+
+    def logits(self, pairs: list, max_length: int) -> list:
+        """
+        (premise, hypothesis) 쌍 목록의 NLI 로짓
+
+        Raises:
+            RemoteInferenceError: 서버가 느리거나 응답하지 않을 때
+        """
+        with self._lock:
+            if time.monotonic() < self._down_until:
+                self.stats["skipped"] += 1
+                raise RemoteInferenceError("원격 추론 서버 일시 중지 중")
+
+        logits = []
+        try:
+            for i in range(0, len(pairs), self.max_batch):
+                chunk = pairs[i:i + self.max_batch]
+                result = self._post({"pairs": [list(p) for p in chunk], "max_length": max_length})
+                logits.extend(result["logits"])
+        except Exception as e:
+            with self._lock:
+                self.stats["failures"] += 1
+                self._down_until = time.monotonic() + self.retry_after
+            raise RemoteInferenceError(str(e)) from e
+
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["pairs"] += len(pairs)
+        return logits
+
+
+def rule_nli_logits(premise: str, hypothesis: str) -> list:
+    """
+    규칙 기반 NLI 근사 (모델 없이 동작하는 최후 폴백)
+
+    - 가설 문장의 어절/문자 bigram이 원문에 얼마나 나타나는지로 함의 정도를 추정
+    - 반환 형식은 모델과 같은 [contradiction, neutral, entailment] 로짓
+    """
+    premise = "".join(premise.lower().split())
+    words = [w for w in hypothesis.lower().split() if len(w) > 1]
+
+    word_hits = sum(1 for w in words if w.strip(".,'\"") in premise)
+    bigrams = {premise[i:i + 2] for i in range(len(premise) - 1)}
+    hyp = "".join(words)
+    hyp_bigrams = {hyp[i:i + 2] for i in range(len(hyp) - 1)}
+    overlap = len(bigrams & hyp_bigrams) / len(hyp_bigrams) if hyp_bigrams else 0.0
+
+    score = 4.0 * overlap + (2.0 * word_hits / len(words) if words else 0.0)
+    return [-score, 0.0, score - 1.0]
+
+
+if __name__ == "__main__":
+    client = RemoteNliClient("http://127.0.0.1:8500")
+    start = time.perf_counter()
+    print(client.logits([("경보국 시험 방송 시작", "이 명령은 경보 방송입니다.")], 128))
+    log(f"왕복 {(time.perf_counter() - start) * 1000:.1f}ms")
@@ -0,0 +1,177 @@
+import argparse
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from utils import log
+from traffic_capture import compact_result, load_capture
+
+"""
+    캡처 트래픽 재생 부하 생성기
+
+    역할:
+        - traffic_capture.py로 기록한 요청을 원래 도착 간격(또는 배속)대로 /process에 다시 전송
+        - 동시 전송 수(concurrency) 제한 (스레드별 keep-alive 연결)
+        - 처리량 / 지연 백분위 / 오류율 / 기록된 결과와의 차이(intent, slots, file) 보고
+        - 지연은 요청의 예정 도착 시각부터 응답까지 (동시 전송 한도 때문에 대기한 시간 포함,
+          --speed 0이면 예정 시각이 없으므로 전송 시작부터)
+        - 외부 의존성 없이 로컬 서버 대상 오프라인 실행
+
+    사용법:
+        python replay_traffic.py traffic.jsonl --url http://127.0.0.1:5000 --speed 2 --concurrency 8
+        (--speed 0: 간격 무시하고 최대 속도)
+"""
+
+
+class _Sender:
+    """스레드별 keep-alive 연결로 /process 전송"""
+
+    def __init__(self, url: str, timeout: float):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def post(self, body: dict) -> tuple:
+        """Returns: (status, 응답 JSON 또는 None)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request("POST", "/process", body=json.dumps(body, ensure_ascii=False).encode("utf-8"),
+                         headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            payload = response.read()
+        except Exception:
+            conn.close()
+            self._local.conn = None
+            raise
+        try:
+            return response.status, json.loads(payload)
+        except ValueError:
+            return response.status, None
+
+
+def _percentile(values: list, q: float) -> float:
+    return round(values[min(len(values) - 1, int(len(values) * q))], 2) if values else 0.0
+
+
+def replay(records: list, url: str, speed: float = 1.0, concurrency: int = 4, timeout: float = 30.0,
+           max_diffs: int = 20) -> dict:
+    """
+    캡처 재생
+
+    Args:
+        records: load_capture() 결과
+        url: 대상 서버 주소
+        speed: 배속 (2.0 = 2배 빠르게, 0 = 간격 무시)
+        concurrency: 최대 동시 요청 수
+        timeout: 요청 타임아웃 (초)
+        max_diffs: 리포트에 담을 결과 차이 예시 수
+
+    Returns:
+        dict: 처리량 / 지연 / 오류 / 결과 차이 리포트
+    """
+    sender = _Sender(url, timeout)
+    lock = threading.Lock()
+    latencies, diffs = [], []
+    counts = {"sent": 0, "errors": 0, "http_errors": 0, "status_changed": 0, "result_diffs": 0}
+
+    def send(record, scheduled):
+        body = {"text": record["text"]}
+        if record.get("budget_ms") is not None:
+            body["budget_ms"] = record["budget_ms"]
+        if record.get("client_id") is not None:
+            body["client_id"] = record["client_id"]
+
+        # 지연은 예정 도착 시각부터 측정 (동시 전송 한도로 큐에서 기다린 시간 포함 → coordinated omission 방지)
+        # 최대 속도 재생(예정 시각 없음)은 전송 시작부터
+        if scheduled is None:
+            scheduled = time.perf_counter()
+        try:
+            status, payload = sender.post(body)
+        except Exception as e:
+            with lock:
+                counts["sent"] += 1
+                counts["errors"] += 1
+            log(f"❌ 전송 실패: {record['text']} ({e})")
+            return
+        elapsed = (time.perf_counter() - scheduled) * 1000
+
+        expected = record.get("result", {})
+        actual = compact_result((payload or {}).get("command") or {})
+        with lock:
+            counts["sent"] += 1
+            latencies.append(elapsed)
+            if status >= 500:
+                counts["http_errors"] += 1
+            if status != record.get("status", 200):
+                counts["status_changed"] += 1
+            if actual != expected:
+                counts["result_diffs"] += 1
+                if len(diffs) < max_diffs:
+                    diffs.append({"text": record["text"], "expected": expected, "actual": actual})
+
+    if not records:
+        return {"requests": 0}
+
+    log(f"▶️ 재생 시작: {len(records)}건 → {url} (배속 {speed or '최대'}, 동시 {concurrency})")
+    t0 = records[0]["t"]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for record in records:
+            scheduled = None
+            if speed > 0:
+                scheduled = started + (record["t"] - t0) / speed
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            executor.submit(send, record, scheduled)
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    n = counts["sent"] or 1
+    report = {
+        "requests": counts["sent"],
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(counts["sent"] / wall, 2) if wall else None,
+        "recorded_span_s": round(records[-1]["t"] - t0, 3),
+        "latency_ms": {
+            "p50": _percentile(latencies, 0.5),
+            "p90": _percentile(latencies, 0.9),
+            "p99": _percentile(latencies, 0.99),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+        "error_rate": round((counts["errors"] + counts["http_errors"]) / n, 4),
+        "status_changed": counts["status_changed"],
+        "result_diff_rate": round(counts["result_diffs"] / n, 4),
+        "diffs": diffs,
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/process 트래픽 캡처 재생")
+    parser.add_argument("capture", help="캡처 파일 경로 (회전 파일 path.N 자동 포함)")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--speed", type=float, default=1.0, help="배속 (0 = 최대 속도)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--limit", type=int, default=None, help="앞에서부터 N건만 재생")
+    parser.add_argument("--report", default=None, help="리포트 JSON 저장 경로")
+    args = parser.parse_args()
+
+    records = load_capture(args.capture)[:args.limit]
+    report = replay(records, args.url, args.speed, args.concurrency, args.timeout)
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
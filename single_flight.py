@@ -0,0 +1,76 @@
+import threading
+from utils import log
+
+"""
+    In-flight 요청 병합 (single-flight)
+
+    역할:
+        - 같은 키로 동시에 들어온 요청은 첫 요청(leader)의 계산 하나만 수행
+        - 나머지 요청(follower)은 leader의 결과(또는 예외)를 그대로 공유
+        - 계산이 끝나면 키를 제거하므로 결과를 캐싱하지는 않음
+"""
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """공백/대소문자 차이만 있는 요청을 같은 키로 취급"""
+        return " ".join(text.split()).lower()
+
+    def do(self, key: str, fn, *args, **kwargs):
+        """
+        key로 진행 중인 계산이 있으면 그 결과를 기다리고, 없으면 직접 계산
+
+        Args:
+            key: 병합 기준 키 (정규화된 텍스트)
+            fn: 실제 계산 함수
+
+        Returns:
+            (result, shared): shared=True 이면 다른 요청의 계산 결과를 공유한 것
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            log(f"🔗 진행 중인 동일 요청에 합류: {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"coalesced": self.coalesced, "in_flight": len(self._calls)}
@@ -0,0 +1,123 @@
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+"""
+    스테이지 의존성 그래프 실행기
+
+    역할:
+        - 파이프라인 단계를 (이름, 함수, 선행 단계) 로 등록
+        - 선행 단계가 모두 끝난 단계부터 스레드 풀에 제출해 독립 단계끼리 겹쳐 실행
+          (torch 연산은 GIL을 놓기 때문에 모델 호출끼리도 실제로 병렬 실행됨)
+        - 단계별 시작/소요 시간과 전체 지연을 결정한 임계 경로(critical path) 보고
+        - 호출 스레드의 contextvars 컨텍스트를 각 단계에 복사해 전달
+        - wrap 지정 시 각 단계를 wrap(fn, deps)로 실행 (프로파일러 등)
+
+    사용 예:
+        graph = StageGraph()
+        graph.add("a", lambda deps: 1)
+        graph.add("b", lambda deps: deps["a"] + 1, after=["a"])
+        results, timing = graph.run(executor)
+"""
+
+
+class StageError(Exception):
+    """특정 단계 실행 중 발생한 예외 (원인 예외는 __cause__ / error)"""
+
+    def __init__(self, stage: str, error: Exception):
+        super().__init__(f"{stage}: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class StageGraph:
+    def __init__(self, wrap=None):
+        """
+        Args:
+            wrap: wrap(fn, deps) 형태의 단계 실행 래퍼 (None이면 fn(deps) 직접 호출)
+        """
+        self._stages = {}
+        self._wrap = wrap
+
+    def add(self, name: str, fn, after: list = ()):
+        """
+        단계 등록
+
+        Args:
+            name: 단계 이름
+            fn: fn(deps) 형태. deps = {선행 단계 이름: 결과}
+            after: 선행 단계 이름 목록 (먼저 등록되어 있어야 함)
+        """
+        for dep in after:
+            if dep not in self._stages:
+                raise ValueError(f"등록되지 않은 선행 단계: {dep}")
+        self._stages[name] = (fn, tuple(after))
+        return self
+
+    def run(self, executor) -> tuple:
+        """
+        그래프 실행
+
+        Args:
+            executor: concurrent.futures 실행기 (요청 간 공유)
+
+        Returns:
+            (results, timing)
+            - results: {단계 이름: 결과}
+            - timing: {"total_ms", "stages": {이름: {"start_ms", "duration_ms"}}, "critical_path": [...]}
+        """
+        t0 = time.perf_counter()
+        results, spans = {}, {}
+        pending = dict(self._stages)
+        running = {}
+        wrap = self._wrap
+
+        def timed(name, fn, deps):
+            start = time.perf_counter()
+            try:
+                return wrap(fn, deps) if wrap is not None else fn(deps)
+            finally:
+                spans[name] = (start - t0, time.perf_counter() - t0)
+
+        try:
+            while pending or running:
+                # 선행 단계가 모두 끝난 단계 제출
+                for name, (fn, after) in list(pending.items()):
+                    if all(dep in results for dep in after):
+                        deps = {dep: results[dep] for dep in after}
+                        ctx = contextvars.copy_context()
+                        running[executor.submit(ctx.run, timed, name, fn, deps)] = name
+                        del pending[name]
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        raise StageError(name, e) from e
+        finally:
+            for future in running:
+                future.cancel()
+
+        return results, self._timing(spans, time.perf_counter() - t0)
+
+    def _timing(self, spans: dict, total: float) -> dict:
+        stages = {
+            name: {"start_ms": round(start * 1000, 2), "duration_ms": round((end - start) * 1000, 2)}
+            for name, (start, end) in spans.items()
+        }
+
+        # 가장 늦게 끝난 단계에서 시작해, 가장 늦게 끝난 선행 단계를 따라 거슬러 올라감
+        path = []
+        current = max(spans, key=lambda n: spans[n][1]) if spans else None
+        while current is not None:
+            path.append(current)
+            after = [dep for dep in self._stages[current][1] if dep in spans]
+            current = max(after, key=lambda n: spans[n][1]) if after else None
+
+        return {
+            "total_ms": round(total * 1000, 2),
+            "stages": stages,
+            "critical_path": list(reversed(path)),
+        }
@@ -1,26 +1,118 @@
 import json
-import queue
+import time
+import wave
+from contextlib import contextmanager
 import sounddevice as sd
+import vosk
 from vosk import Model, KaldiRecognizer
+from audio_ring_buffer import AudioRingBuffer
+from latency_tracer import UtteranceTrace
 from utils import log
 
 class SpeechToTextEngine:
-    def __init__(self, model_path: str):
+    SAMPLE_RATE = 16000
+    BLOCK_SIZE = 8000           # 한 번에 처리할 샘플 개수
+    BYTES_PER_SAMPLE = 2        # int16
+
+    def __init__(self, model_path: str, buffer_seconds: float = 10.0, overflow: str = "drop_oldest",
+                 wake_words: list = None, wake_model_path: str = None, command_timeout: float = 8.0):
         """
         음성 인식 엔진 초기화
 
         Args:
             model_path (str): Vosk 모델이 저장된 폴더 경로
+            buffer_seconds (float): 오디오 링 버퍼 길이 (초). 인식이 이보다 밀리면 overflow 정책대로 버림
+            overflow (str): "drop_oldest" (최신 발화 우선) | "drop_newest" (쌓인 발화 보존)
+            wake_words (list): 웨이크 게이트 트리거 단어 (예: ["경보국", "수위국"]). 지정 시 트리거 전까지
+                               문법 제한 소형 인식기만 실행하고, 트리거 후에만 전체 인식 수행
+            wake_model_path (str): 웨이크 게이트용 소형 Vosk 모델 경로 (문법 모드는 소형 모델만 지원,
+                                   생략 시 model_path 모델 사용)
+            command_timeout (float): 트리거 후 명령이 인식되지 않으면 대기 모드로 돌아가는 시간 (초)
         """
         # Vosk 모델 로드
         self.model = Model(model_path)
 
         # 16kHz 샘플레이트로 인식기 생성
         # 16000 = 음성 인식에 적합한 표준 주파수
-        self.recognizer = KaldiRecognizer(self.model, 16000)
+        self.recognizer = KaldiRecognizer(self.model, self.SAMPLE_RATE)
+
+        # 오디오 데이터를 임시 저장할 고정 크기 링 버퍼 (미리 할당, 메모리 증가 없음)
+        bytes_per_second = self.SAMPLE_RATE * self.BYTES_PER_SAMPLE
+        self.audio_buffer = AudioRingBuffer(
+            capacity=int(buffer_seconds * bytes_per_second),
+            chunk_size=self.BLOCK_SIZE * self.BYTES_PER_SAMPLE,
+            overflow=overflow,
+            bytes_per_second=bytes_per_second,
+        )
+
+        # 기본 Vosk 바인딩의 AcceptWaveform은 cffi char* 인자라 bytes만 받음 (memoryview는 TypeError)
+        # → 바인딩 내부의 ffi / C 함수가 보이면 ffi.from_buffer로 링 버퍼를 복사 없이 전달, 아니면 bytes 복사
+        self._zero_copy = all(hasattr(vosk, name) for name in ("_ffi", "_c")) and hasattr(self.recognizer, "_handle")
+        if not self._zero_copy:
+            log("⚠️ Vosk 바인딩 내부에 접근할 수 없어 오디오 블록을 bytes로 복사해 전달합니다.")
+
+        # 웨이크 게이트: 트리거 단어만 아는 문법 제한 인식기 (탐색 그래프가 작아 상시 실행해도 CPU 사용이 낮음)
+        self.wake_words = list(wake_words or [])
+        self.wake_recognizer = None
+        self.command_timeout = command_timeout
+        if self.wake_words:
+            wake_model = Model(wake_model_path) if wake_model_path else self.model
+            grammar = json.dumps(self.wake_words + ["[unk]"], ensure_ascii=False)
+            self.wake_recognizer = KaldiRecognizer(wake_model, self.SAMPLE_RATE, grammar)
+            log(f"👂 웨이크 게이트 사용: {self.wake_words}")
+
+        # 트리거 직전 블록 (트리거 단어 앞부분이 이전 블록에 걸친 경우를 위해 전체 인식기에 함께 전달)
+        self._preroll = bytearray(self.BLOCK_SIZE * self.BYTES_PER_SAMPLE)
+        self._preroll_len = 0
 
-        # 오디오 데이터를 임시 저장할 큐 (queue = 대기열)
-        self.audio_queue = queue.Queue()
+        # 상시 마이크 스트림 (open_stream ~ close_stream 사이에는 발화 사이 오디오도 링 버퍼에 계속 쌓임)
+        self._stream = None
+
+    def open_stream(self):
+        """
+        마이크 스트림을 열어 유지 (이미 열려 있으면 아무것도 하지 않음)
+
+        - 열려 있는 동안 listen_and_transcribe / utterances 는 장치를 다시 열지 않음
+        - 명령 처리 중에 들어온 오디오도 버리지 않고 다음 인식에서 이어서 처리
+        """
+        if self._stream is not None:
+            return
+
+        start = time.monotonic()
+        self.audio_buffer.clear()
+        # samplerate=16000: 초당 16000번 샘플링 (음성 인식 표준)
+        # blocksize=8000: 한 번에 처리할 샘플 개수
+        # channels=1: 모노 (스테레오는 2)
+        stream = sd.RawInputStream(
+            samplerate=self.SAMPLE_RATE,
+            blocksize=self.BLOCK_SIZE,
+            dtype='int16',
+            channels=1,
+            callback=self._audio_callback
+        )
+        stream.start()
+        self._stream = stream
+        log(f"🎙️ 마이크 스트림 열림 ({(time.monotonic() - start) * 1000:.0f}ms)")
+
+    def close_stream(self):
+        """마이크 스트림 닫기"""
+        if self._stream is None:
+            return
+        self._stream.stop()
+        self._stream.close()
+        self._stream = None
+        log("🎙️ 마이크 스트림 닫힘")
+
+    @contextmanager
+    def session(self):
+        """스트림 유지 구간 (이 안에서 연 스트림만 나갈 때 닫음)"""
+        opened = self._stream is None
+        self.open_stream()
+        try:
+            yield self
+        finally:
+            if opened:
+                self.close_stream()
 
     def _audio_callback(self, indata, frames, time, status):
         """
@@ -35,54 +127,198 @@ class SpeechToTextEngine:
         if status:
             log(f"[오디오 에러] {status}")
 
-        # 들어온 오디오 데이터를 큐에 저장
-        self.audio_queue.put(bytes(indata))
+        # 들어온 오디오 데이터를 링 버퍼에 복사 (새 객체 할당 없음)
+        self.audio_buffer.write(indata)
+
+    def _accept_waveform(self, data, recognizer=None) -> bool:
+        """
+        Vosk 인식기에 오디오 전달
+
+        Args:
+            data: 링 버퍼에서 꺼낸 memoryview
+            recognizer: 대상 인식기 (생략 시 전체 인식기)
+        """
+        recognizer = recognizer or self.recognizer
+        if not self._zero_copy:
+            return recognizer.AcceptWaveform(bytes(data))
+
+        # KaldiRecognizer.AcceptWaveform과 같은 호출을 버퍼 포인터로 (ffi.from_buffer는 복사하지 않음)
+        result = vosk._c.vosk_recognizer_accept_waveform(recognizer._handle, vosk._ffi.from_buffer(data), len(data))
+        if result < 0:
+            raise Exception("Failed to process waveform")
+        return result
+
+    def _detect_wake_word(self, data) -> bool:
+        """
+        웨이크 게이트 인식기로 트리거 단어 검사
+
+        Returns:
+            bool: 트리거 단어가 들렸으면 True
+        """
+        if self._accept_waveform(data, self.wake_recognizer):
+            text = json.loads(self.wake_recognizer.Result()).get('text', '')
+        else:
+            text = json.loads(self.wake_recognizer.PartialResult()).get('partial', '')
+
+        for word in self.wake_words:
+            if word in text:
+                log(f"👂 트리거 감지: {word}")
+                self.wake_recognizer.Reset()
+                return True
+
+        # 트리거가 아니면 다음 검사를 위해 현재 블록을 pre-roll로 보관
+        n = len(data)
+        self._preroll[:n] = data
+        self._preroll_len = n
+        return False
+
+    def _recognize_chunk(self, data, trace: UtteranceTrace = None, frame_at: float = None) -> str:
+        """
+        전체 인식기에 오디오 블록 하나를 전달
+
+        Args:
+            data: 오디오 블록 (memoryview / bytes)
+            trace: 발화 지연 추적 객체
+            frame_at: 이 블록 마지막 프레임의 수신 시각 (time.monotonic)
+
+        Returns:
+            str: 문장이 완성되면 인식된 텍스트, 아니면 None
+        """
+        # Vosk 인식기에 데이터 전달
+        if self._accept_waveform(data):
+            # 문장이 완성되었을 때
+            result = json.loads(self.recognizer.Result())
+            text = result.get('text', '')
+
+            if text:
+                if trace is not None:
+                    trace.mark("last_audio_frame", frame_at)
+                    trace.mark("vosk_final")
+                log(f"✅ 인식됨: {text}")
+                return text
+        else:
+            # 중간 인식 결과 (partial result)
+            partial = json.loads(self.recognizer.PartialResult())
+            partial_text = partial.get('partial', '')
+
+            if partial_text:
+                log(f"🔄 인식 중: {partial_text}")
+
+        return None
 
-    def listen_and_transcribe(self):
+    def _listen_once(self, trace: UtteranceTrace = None, stop_event=None) -> str:
+        """
+        열린 스트림의 링 버퍼에서 발화 하나가 완성될 때까지 인식
+
+        Returns:
+            str: 인식된 텍스트 (stop_event로 중단되면 빈 문자열)
+        """
+        awake = self.wake_recognizer is None
+        woke_at = None
+
+        while stop_event is None or not stop_event.is_set():
+            # 링 버퍼에서 오디오 데이터 가져오기
+            data = self.audio_buffer.read(timeout=1.0)
+            if data is None:
+                continue
+
+            # 웨이크 게이트: 트리거 단어가 들릴 때까지 전체 인식기는 쉬게 둠
+            if not awake:
+                if not self._detect_wake_word(data):
+                    continue
+                awake, woke_at = True, time.monotonic()
+                self.recognizer.Reset()
+                self._accept_waveform(memoryview(self._preroll)[:self._preroll_len])
+                self._preroll_len = 0
+            elif woke_at is not None and time.monotonic() - woke_at > self.command_timeout:
+                log("💤 명령이 없어 대기 모드로 돌아갑니다.")
+                awake, woke_at = False, None
+                continue
+
+            text = self._recognize_chunk(data, trace, self.audio_buffer.read_until_at)
+            if text:
+                stats = self.audio_buffer.stats()
+                if stats["overflows"]:
+                    log(f"⚠️ 오디오 지연 {stats['lag_ms']}ms, 누적 버림 {stats['dropped_ms']}ms")
+                return text
+
+        return ""
+
+    def utterances(self, stop_event=None):
+        """
+        연속 발화 인식 (스트림과 인식기를 계속 유지하며 발화 단위로 분할)
+
+        Args:
+            stop_event: threading.Event (set 되면 종료)
+
+        Yields:
+            (text, trace): 인식된 텍스트와 그 발화의 지연 추적 객체
+        """
+        with self.session():
+            log("\n🎤 연속 인식 시작... 말씀하세요!")
+            while stop_event is None or not stop_event.is_set():
+                trace = UtteranceTrace()
+                text = self._listen_once(trace, stop_event)
+                if text:
+                    yield text, trace
+
+    def listen_and_transcribe(self, trace: UtteranceTrace = None):
         """
         마이크로 음성을 듣고 텍스트로 변환
 
+        - 스트림이 열려 있으면(open_stream) 그대로 사용, 아니면 이 호출 동안만 열고 닫음
+
+        Args:
+            trace: 발화 지연 추적 객체 (last_audio_frame / vosk_final 기록)
+
         Returns:
             str: 인식된 텍스트 (실패 시 빈 문자열)
         """
         log("\n🎤 듣고 있습니다... 말씀하세요!")
 
         try:
-            # 마이크 스트림 시작
-            # samplerate=16000: 초당 16000번 샘플링 (음성 인식 표준)
-            # blocksize=8000: 한 번에 처리할 샘플 개수
-            # channels=1: 모노 (스테레오는 2)
-            with sd.RawInputStream(
-                    samplerate=16000,
-                    blocksize=8000,
-                    dtype='int16',
-                    channels=1,
-                    callback=self._audio_callback
-            ):
-                while True:
-                    # 큐에서 오디오 데이터 가져오기
-                    data = self.audio_queue.get()
-
-                    # Vosk 인식기에 데이터 전달
-                    if self.recognizer.AcceptWaveform(data):
-                        # 문장이 완성되었을 때
-                        result = json.loads(self.recognizer.Result())
-                        text = result.get('text', '')
-
-                        if text:
-                            log(f"✅ 인식됨: {text}")
-                            return text
-                    else:
-                        # 중간 인식 결과 (partial result)
-                        partial = json.loads(self.recognizer.PartialResult())
-                        partial_text = partial.get('partial', '')
-
-                        if partial_text:
-                            log(f"🔄 인식 중: {partial_text}", end='\r')
+            with self.session():
+                return self._listen_once(trace)
 
         except KeyboardInterrupt:
             log("\n⚠️ 사용자가 중단했습니다.")
             return ""
         except Exception as e:
             log(f"\n❌ 에러 발생: {e}")
-            return ""
\ No newline at end of file
+            return ""
+
+    def transcribe_file(self, path: str, trace: UtteranceTrace = None, realtime: bool = True):
+        """
+        녹음 파일 재생 모드 (지연 측정 재현용)
+
+        Args:
+            path: 16kHz / 16bit / 모노 WAV 파일
+            trace: 발화 지연 추적 객체
+            realtime: True면 블록 길이만큼 기다리며 마이크처럼 실시간 속도로 전달
+
+        Returns:
+            str: 인식된 텍스트 (실패 시 빈 문자열)
+        """
+        with wave.open(path, "rb") as wav:
+            if (wav.getframerate(), wav.getsampwidth(), wav.getnchannels()) != (self.SAMPLE_RATE, self.BYTES_PER_SAMPLE, 1):
+                raise ValueError(f"16kHz/16bit/모노 WAV만 지원합니다: {path}")
+
+            self.recognizer.Reset()
+            block_seconds = self.BLOCK_SIZE / self.SAMPLE_RATE
+            while True:
+                data = wav.readframes(self.BLOCK_SIZE)
+                if not data:
+                    break
+                if realtime:
+                    time.sleep(block_seconds * len(data) / (self.BLOCK_SIZE * self.BYTES_PER_SAMPLE))
+
+                text = self._recognize_chunk(data, trace, time.monotonic())
+                if text:
+                    return text
+
+        # 파일 끝: 남은 오디오로 문장 확정
+        text = json.loads(self.recognizer.FinalResult()).get('text', '')
+        if text and trace is not None:
+            trace.mark("last_audio_frame")
+            trace.mark("vosk_final")
+        return text
@@ -0,0 +1,224 @@
+import json
+import re
+import time
+import zlib
+import numpy as np
+from utils import log
+
+"""
+    경량 학생(student) NLU 엔진
+
+    역할:
+        - distill.py가 UniversalNluEngine(교사)의 출력으로 학습한 소형 모델 실행
+        - 교사와 같은 parse_text 인터페이스 / 결과 형식 ({"intent", "slots", "timing", ...})
+        - numpy만 사용 (torch / transformers / KeyBERT 불필요, CPU 1ms 내외)
+
+    모델 구성:
+        - 특징: 단어 + 문자 n-gram(1~3)을 crc32로 해싱한 희소 벡터
+        - Intent 분류: 다항 로지스틱 회귀
+        - 슬롯: 정규식(교사와 같은 slot_patterns) → 숫자 복사(숫자 슬롯) → 슬롯별 값 분류기 → 최빈값
+
+    파일 형식 (.npz):
+        meta: JSON 문자열 (레이블, 슬롯 구성, 잡음 단어, 파일 매핑 등)
+        {모델 이름}.W / {모델 이름}.b: 가중치
+"""
+
+FEATURE_DIM = 1 << 14
+
+
+def featurize(text: str, dim: int = FEATURE_DIM) -> np.ndarray:
+    """단어 + 문자 n-gram(1~3) 해시 인덱스 (중복 허용 = 빈도)"""
+    grams = []
+    for word in text.split():
+        grams.append("w:" + word)
+        padded = f"<{word}>"
+        for n in (1, 2, 3):
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) % dim for g in grams), dtype=np.int64, count=len(grams))
+
+
+class SoftmaxClassifier:
+    """해시 특징 다항 로지스틱 회귀"""
+
+    def __init__(self, labels: list, dim: int = FEATURE_DIM, W: np.ndarray = None, b: np.ndarray = None):
+        self.labels = list(labels)
+        self.dim = dim
+        self.W = W if W is not None else np.zeros((dim, len(self.labels)), dtype=np.float32)
+        self.b = b if b is not None else np.zeros(len(self.labels), dtype=np.float32)
+
+    def _logits(self, features: np.ndarray) -> np.ndarray:
+        if len(features) == 0:
+            return self.b
+        return self.W[features].sum(axis=0) / np.sqrt(len(features)) + self.b
+
+    def predict(self, features: np.ndarray) -> tuple:
+        """Returns: (label, 확률)"""
+        logits = self._logits(features)
+        probs = np.exp(logits - logits.max())
+        probs /= probs.sum()
+        best = int(probs.argmax())
+        return self.labels[best], float(probs[best])
+
+    def fit(self, samples: list, targets: list, epochs: int = 40, lr: float = 0.5, l2: float = 1e-4,
+            batch_size: int = 64, seed: int = 0):
+        """
+        미니배치 경사하강 학습
+
+        Args:
+            samples: featurize() 결과 목록
+            targets: 레이블 목록
+        """
+        rng = np.random.default_rng(seed)
+        index = {label: i for i, label in enumerate(self.labels)}
+        y = np.array([index[t] for t in targets])
+        order = np.arange(len(samples))
+
+        for _ in range(epochs):
+            rng.shuffle(order)
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                X = np.zeros((len(batch), self.dim), dtype=np.float32)
+                for row, i in enumerate(batch):
+                    if len(samples[i]):
+                        np.add.at(X[row], samples[i], 1.0 / np.sqrt(len(samples[i])))
+
+                logits = X @ self.W + self.b
+                logits -= logits.max(axis=1, keepdims=True)
+                probs = np.exp(logits)
+                probs /= probs.sum(axis=1, keepdims=True)
+                probs[np.arange(len(batch)), y[batch]] -= 1.0
+
+                self.W -= lr * (X.T @ probs / len(batch) + l2 * self.W)
+                self.b -= lr * probs.mean(axis=0)
+        return self
+
+
+class StudentNluEngine:
+    """
+    Args:
+        meta: 모델 메타데이터 (distill.py가 생성)
+        models: {모델 이름: SoftmaxClassifier}
+    """
+
+    def __init__(self, meta: dict, models: dict):
+        self.meta = meta
+        self.models = models
+        self.noise = meta["noise"]
+        self.scenario_to_file = meta.get("scenario_to_file", {})
+        self.slot_patterns = {
+            intent: {slot: re.compile(pattern, re.IGNORECASE) for slot, pattern in patterns.items()}
+            for intent, patterns in meta["slot_patterns"].items()
+        }
+
+        # 교사 엔진과 같은 속성 (서버 /stats, /admin/reload 호환)
+        self.config = None
+        self.remote = None
+        self.anytime = False
+
+    @classmethod
+    def load(cls, path: str):
+        data = np.load(path, allow_pickle=False)
+        meta = json.loads(str(data["meta"]))
+        models = {
+            name: SoftmaxClassifier(labels, meta["feature_dim"], data[f"{name}.W"], data[f"{name}.b"])
+            for name, labels in meta["models"].items()
+        }
+        log(f"🎓 학생 NLU 모델 로드: {path} (Intent {len(models['intent'].labels)}개, 분류기 {len(models)}개)")
+        return cls(meta, models)
+
+    def save(self, path: str):
+        arrays = {"meta": np.array(json.dumps(self.meta, ensure_ascii=False))}
+        for name, model in self.models.items():
+            arrays[f"{name}.W"] = model.W.astype(np.float32)
+            arrays[f"{name}.b"] = model.b.astype(np.float32)
+        np.savez_compressed(path, **arrays)
+
+    def reload_config(self, path: str = None, data: dict = None):
+        raise ValueError("학생 모델은 Intent 설정 리로드를 지원하지 않습니다 (다시 증류하세요)")
+
+    def evaluate_intent_tree(self, samples: list = None, beam_width: int = None):
+        raise ValueError("학생 모델은 계층형 Intent 분류를 지원하지 않습니다")
+
+    def _preprocess(self, text: str) -> str:
+        """잡음 제거 전처리 (교사 엔진과 동일)"""
+        t = text.strip().lower()
+        for n in self.noise:
+            t = re.sub(r'\b' + re.escape(n) + r'\b', ' ', t)
+            t = t.replace(' ' + n + ' ', ' ').replace(' ' + n, ' ').replace(n + ' ', ' ')
+        return re.sub(r'\s+', ' ', t).strip()
+
+    def _extract_slots(self, text: str, intent: str, features: np.ndarray) -> dict:
+        slots = {}
+        for slot_name, spec in self.meta["slots"].get(intent, {}).items():
+            compiled = self.slot_patterns.get(intent, {}).get(slot_name)
+            if compiled is not None:
+                match = compiled.search(text)
+                if match:
+                    slots[slot_name] = match.group(1) if match.groups() else match.group(0)
+                    continue
+
+            if spec.get("numeric"):
+                numbers = [int(n) for n in re.findall(r'\d+', text)]
+                low, high = spec["numeric"]
+                if numbers and low <= numbers[0] <= high:
+                    slots[slot_name] = numbers[0]
+                    continue
+
+            model = self.models.get(f"slot:{intent}:{slot_name}")
+            if model is not None:
+                slots[slot_name] = json.loads(model.predict(features)[0])
+            elif "value" in spec:
+                slots[slot_name] = spec["value"]
+        return slots
+
+    def parse_text(self, text: str, trace=None, budget_ms: float = None, session_id: str = None):
+        """
+        텍스트 → 명령 (UniversalNluEngine.parse_text와 같은 결과 형식)
+
+        - budget_ms는 호환용 (학생 모델은 항상 예산 안에서 끝남)
+        - session_id도 호환용 (대화 세션 문맥 미지원, 모든 발화를 새 명령으로 처리)
+        """
+        started = time.perf_counter()
+        if trace is not None:
+            trace.mark("nlu_start")
+
+        if not text or not text.strip():
+            return {"error": "입력된 텍스트가 없습니다."}
+
+        text = self._preprocess(text)
+        features = featurize(text, self.meta["feature_dim"])
+
+        if trace is not None:
+            trace.mark("nlu_stages_start")
+
+        t0 = time.perf_counter()
+        intent, confidence = self.models["intent"].predict(features)
+        t1 = time.perf_counter()
+        slots = self._extract_slots(text, intent, features)
+        t2 = time.perf_counter()
+
+        if trace is not None:
+            trace.mark("nlu_stages_done")
+
+        result = {
+            "intent": intent,
+            "slots": slots,
+            "confidence": round(confidence, 4),
+            "timing": {
+                "total_ms": round((t2 - started) * 1000, 3),
+                "stages": {
+                    "intent": {"start_ms": round((t0 - started) * 1000, 3), "duration_ms": round((t1 - t0) * 1000, 3)},
+                    "slots": {"start_ms": round((t1 - started) * 1000, 3), "duration_ms": round((t2 - t1) * 1000, 3)},
+                },
+                "critical_path": ["intent", "slots"],
+            },
+        }
+
+        if intent.startswith("alert.broadcast") and slots.get("scenario") in self.scenario_to_file:
+            result["file"] = self.scenario_to_file[slots["scenario"]]
+
+        if trace is not None:
+            trace.mark("nlu_done")
+
+        log(f"[학생 NLU] {text} → {intent} ({confidence:.2f}) {slots} [{result['timing']['total_ms']:.2f}ms]")
+        return result
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from audio_ring_buffer import AudioRingBuffer
+
+"""
+    AudioRingBuffer 테스트
+"""
+
+
+@pytest.mark.parametrize("overflow", ["drop_oldest", "drop_newest"])
+def test_block_timestamps_stay_bounded_without_reader(overflow):
+    ring = AudioRingBuffer(capacity=16000, chunk_size=3200, overflow=overflow)
+    block = bytes(320)
+    for _ in range(100000):
+        ring.write(block)
+
+    # 버퍼에 남을 수 있는 블록 수(16000 / 320 = 50) 이내
+    assert len(ring._blocks) <= 16000 // 320 + 1
+    assert len(ring._blocks) <= ring._blocks.maxlen
+
+
+def test_clear_drops_block_timestamps():
+    ring = AudioRingBuffer(capacity=16000, chunk_size=3200)
+    for _ in range(10):
+        ring.write(bytes(320))
+    ring.clear()
+    assert len(ring._blocks) == 0
+    assert ring.read(timeout=0.01) is None
+
+
+def test_read_until_at_is_arrival_of_last_byte_read():
+    ring = AudioRingBuffer(capacity=1000, chunk_size=100)
+    arrivals = []
+    for _ in range(5):
+        ring.write(bytes(60))
+        arrivals.append(ring.last_write_at)
+        time.sleep(0.002)
+
+    # 60바이트 블록 5개 → 100바이트씩 읽으면 마지막 바이트는 2, 4, 5번째 블록
+    ring.read()
+    assert ring.read_until_at == arrivals[1]
+    ring.read()
+    assert ring.read_until_at == arrivals[3]
+    ring.read()
+    assert ring.read_until_at == arrivals[4]
+
+
+def test_read_until_at_after_drop_oldest_overflow():
+    ring = AudioRingBuffer(capacity=200, chunk_size=100)
+    arrivals = []
+    for _ in range(5):
+        ring.write(bytes(60))
+        arrivals.append(ring.last_write_at)
+
+    # 300바이트 중 앞 100바이트는 버려짐 → 다음 100바이트의 마지막 바이트(199)는 4번째 블록
+    assert len(ring.read()) == 100
+    assert ring.read_until_at == arrivals[3]
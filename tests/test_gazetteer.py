@@ -0,0 +1,51 @@
+import pytest
+
+from gazetteer import Gazetteer
+
+"""
+    Gazetteer 테스트 (어절 경계 매칭)
+"""
+
+STATIONS = [
+    {"name": "소양강댐", "aliases": ["소양댐", "소양강 다목적댐"]},
+    {"name": "부천 수위국", "aliases": ["부천 수위관측소"]},
+    {"name": "울산 경보국", "aliases": ["울산 경보소"]},
+    {"name": "수위국", "aliases": ["수위관측소"]},
+    {"name": "우량국", "aliases": ["우량관측소"]},
+    {"name": "경보국", "aliases": ["경보소"]},
+    {"name": "통신실", "aliases": []},
+]
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    return Gazetteer(STATIONS)
+
+
+@pytest.mark.parametrize("text", [
+    "통신 실패 로그",
+    "수위 국가 기준",
+    "우량 국지성 호우",
+    "경보 소리 울려줘",
+])
+def test_no_match_across_word_boundaries(gazetteer, text):
+    assert gazetteer.find(text) == []
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("소양강댐에서 데이터 호출", ["소양강댐"]),
+    ("소양강  다목적댐 방류", ["소양강댐"]),
+    ("부천수위국 데이터", ["부천 수위국"]),
+    ("부천 수위국의 수위", ["부천 수위국"]),
+    ("울산경보소 점검", ["울산 경보국"]),
+    ("울산 경보국 장비 점검", ["울산 경보국"]),
+    ("경보국, 시험 방송", ["경보국"]),
+    ("통신실 상태 확인", ["통신실"]),
+    ("수위국 그리고 우량국", ["수위국", "우량국"]),
+])
+def test_matches_on_word_boundaries(gazetteer, text, expected):
+    assert gazetteer.find(text) == expected
+
+
+def test_rejects_match_starting_inside_a_word(gazetteer):
+    assert gazetteer.find("동해경보국 점검") == []
@@ -0,0 +1,218 @@
+import json
+import os
+import socket
+import threading
+import time
+import tty
+
+import pytest
+
+from hardware_dispatcher import HardwareDispatcher
+
+"""
+    HardwareDispatcher 테스트 (TCP 소켓 / pty 스탠드인 RTU)
+"""
+
+
+class _SocketRtu:
+    """
+    TCP RTU 스탠드인
+
+    - 수신한 명령 한 줄마다 {"ack": true, "seq": ...} 한 줄로 응답
+    - received: 연결 번호별 수신 명령 목록
+    - reply_delay: 응답 전 대기 (초)
+    - drop_first: 첫 연결은 첫 명령을 받자마자 응답 없이 끊음
+    - silent: 응답하지 않음 (타임아웃 확인용)
+    """
+
+    def __init__(self, reply_delay: float = 0.0, drop_first: bool = False, silent: bool = False):
+        self.reply_delay = reply_delay
+        self.drop_first = drop_first
+        self.silent = silent
+        self.received = []
+        self._lock = threading.Lock()
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen()
+        self.endpoint = "tcp://127.0.0.1:%d" % self._server.getsockname()[1]
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return
+            with self._lock:
+                index = len(self.received)
+                self.received.append([])
+            threading.Thread(target=self._handle, args=(client, index), daemon=True).start()
+
+    def _handle(self, client, index):
+        with client, client.makefile("rb") as reader:
+            for line in reader:
+                request = json.loads(line)
+                with self._lock:
+                    self.received[index].append(request)
+                if self.drop_first and index == 0:
+                    return
+                if self.silent:
+                    continue
+                time.sleep(self.reply_delay)
+                reply = {"ack": True, "seq": request["slots"].get("seq")}
+                client.sendall(json.dumps(reply).encode("utf-8") + b"\n")
+
+    def all_received(self) -> list:
+        with self._lock:
+            return [request for requests in self.received for request in requests]
+
+    def close(self):
+        self._server.close()
+
+
+class _PtyRtu:
+    """pty RTU 스탠드인 (마스터 쪽에서 명령을 읽고 응답)"""
+
+    def __init__(self):
+        self.master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.endpoint = "pty://" + os.ttyname(self._slave)
+        self.received = []
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        buf = b""
+        while True:
+            try:
+                chunk = os.read(self.master, 4096)
+            except OSError:
+                return
+            buf += chunk
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                request = json.loads(line)
+                self.received.append(request)
+                reply = {"ack": True, "seq": request["slots"].get("seq")}
+                os.write(self.master, json.dumps(reply).encode("utf-8") + b"\n")
+
+    def close(self):
+        os.close(self._slave)
+        os.close(self.master)
+
+
+def _command(action: str, seq: int, station: str = "경보국") -> dict:
+    return {"intent": "alert.broadcast", "slots": {"station": station, "action": action, "seq": seq}}
+
+
+@pytest.fixture
+def rtu():
+    stand_ins = []
+
+    def make(kind="socket", **kwargs):
+        stand_in = _PtyRtu() if kind == "pty" else _SocketRtu(**kwargs)
+        stand_ins.append(stand_in)
+        return stand_in
+
+    yield make
+    for stand_in in stand_ins:
+        stand_in.close()
+
+
+@pytest.mark.parametrize("kind,pool_size", [("socket", 1), ("socket", 3), ("pty", 3)])
+def test_pipelined_commands_arrive_in_submission_order(rtu, kind, pool_size):
+    stand_in = rtu(kind)
+    dispatcher = HardwareDispatcher({"default": stand_in.endpoint}, pool_size=pool_size, pipeline_depth=4)
+    try:
+        futures = [dispatcher.submit(_command("시작" if i % 2 == 0 else "정지", i)) for i in range(40)]
+        results = [f.result(timeout=5) for f in futures]
+    finally:
+        dispatcher.shutdown()
+
+    # 응답이 자기 명령과 짝지어지고, RTU에는 제출 순서대로 도착
+    assert [r["status"] for r in results] == ["ok"] * 40
+    assert [r["response"]["seq"] for r in results] == list(range(40))
+    received = stand_in.received if kind == "pty" else stand_in.all_received()
+    assert [request["slots"]["seq"] for request in received] == list(range(40))
+
+
+def test_per_station_order_with_several_tcp_sessions(rtu):
+    stand_in = rtu(reply_delay=0.001)
+    dispatcher = HardwareDispatcher({"default": stand_in.endpoint}, pool_size=3, pipeline_depth=4)
+    stations = ["경보국", "수위국", "우량국", "부천", "울산"]
+    try:
+        futures = [dispatcher.submit(_command("시작", i, stations[i % len(stations)])) for i in range(50)]
+        for f in futures:
+            assert f.result(timeout=5)["status"] == "ok"
+    finally:
+        dispatcher.shutdown()
+
+    for station in stations:
+        seqs = [r["slots"]["seq"] for r in stand_in.all_received() if r["slots"]["station"] == station]
+        assert seqs == sorted(seqs)
+    # 국마다 연결 하나만 사용, 연결 수는 pool_size 이내
+    for station in stations:
+        used = [i for i, requests in enumerate(stand_in.received)
+                if any(r["slots"]["station"] == station for r in requests)]
+        assert len(used) == 1
+    assert len(stand_in.received) <= 3
+
+
+def test_consecutive_duplicates_are_sent_once(rtu):
+    stand_in = rtu(reply_delay=0.2)
+    dispatcher = HardwareDispatcher({"default": stand_in.endpoint})
+    try:
+        first = dispatcher.submit(_command("시작", 0))
+        time.sleep(0.05)   # 첫 명령이 응답을 기다리는 동안 같은 명령 3건이 대기열에 쌓임
+        duplicates = [dispatcher.submit(_command("정지", 1)) for _ in range(3)]
+        results = [f.result(timeout=5) for f in [first] + duplicates]
+        stats = dispatcher.stats()
+    finally:
+        dispatcher.shutdown()
+
+    assert [r["status"] for r in results] == ["ok"] * 4
+    assert [r["response"]["seq"] for r in results] == [0, 1, 1, 1]
+    assert [r["slots"]["seq"] for r in stand_in.all_received()] == [0, 1]
+    assert stats["sent"] == 2
+    assert stats["merged"] == 2
+
+
+def test_reconnects_after_broken_connection(rtu):
+    stand_in = rtu(drop_first=True)
+    dispatcher = HardwareDispatcher({"default": stand_in.endpoint})
+    try:
+        broken = dispatcher.submit(_command("시작", 0)).result(timeout=5)
+        recovered = dispatcher.submit(_command("시작", 1)).result(timeout=5)
+        stats = dispatcher.stats()
+    finally:
+        dispatcher.shutdown()
+
+    assert broken["status"] == "error"
+    assert recovered["status"] == "ok"
+    assert recovered["response"]["seq"] == 1
+    assert len(stand_in.received) == 2
+    assert stats["errors"] == 1 and stats["completed"] == 1
+
+
+def test_timeout_fails_pending_commands(rtu):
+    stand_in = rtu(silent=True)
+    dispatcher = HardwareDispatcher({"default": stand_in.endpoint}, timeout=0.2)
+    try:
+        futures = [dispatcher.submit(_command("시작", i)) for i in range(2)]
+        results = [f.result(timeout=5) for f in futures]
+    finally:
+        dispatcher.shutdown()
+
+    for result in results:
+        assert result["status"] == "error"
+        assert "시간 초과" in result["response"]
+        assert result["latency_ms"] >= 200
+
+
+def test_unrouted_station_completes_immediately():
+    dispatcher = HardwareDispatcher({"경보국": "tcp://127.0.0.1:9"})
+    try:
+        result = dispatcher.submit(_command("시작", 0, station="수위국")).result(timeout=1)
+    finally:
+        dispatcher.shutdown()
+    assert result["status"] == "unrouted"
@@ -0,0 +1,70 @@
+import pytest
+
+from intent_config import IntentConfig
+
+"""
+    IntentConfig 테스트 (형식 검사 / 부분 리로드)
+"""
+
+
+def _intent(**overrides):
+    config = {
+        "description": "경보국 방송 수행",
+        "examples": ["경보국 시험 방송 시작"],
+        "keywords": ["경보", "방송"],
+        "slots": {"scenario": ["시험", "방류"]},
+        "slot_patterns": {"scenario": r"(시험|방류)"},
+        "defaults": {"station": "경보국"},
+    }
+    config.update(overrides)
+    return config
+
+
+@pytest.fixture
+def base():
+    return IntentConfig.from_dict({
+        "command_hypotheses": {"alert.broadcast": _intent()},
+        "scenario_to_file": {"시험": "A.wav"},
+        "domain_hypotheses": {"alert": "이 명령은 경보 방송 작업입니다."},
+    })
+
+
+@pytest.mark.parametrize("data,fragment", [
+    ({"command_hypotheses": {"alert.broadcast": _intent(keywords="abc")}}, "alert.broadcast"),
+    ({"command_hypotheses": {"alert.broadcast": _intent(keywords=["경보", 1])}}, "keywords"),
+    ({"command_hypotheses": {"alert.broadcast": _intent(description=["경보"])}}, "description"),
+    ({"command_hypotheses": {"alert.broadcast": _intent(slot_patterns=["(시험)"])}}, "slot_patterns"),
+    ({"command_hypotheses": {"alert.broadcast": _intent(slots={"scenario": "시험"})}}, "slots['scenario']"),
+    ({"command_hypotheses": {"alert.broadcast": "경보"}}, "alert.broadcast"),
+    ({"command_hypotheses": ["alert.broadcast"]}, "command_hypotheses"),
+    ({"command_hypotheses": {}, "scenario_to_file": {"시험": 1}}, "scenario_to_file['시험']"),
+    ({"command_hypotheses": {}, "domain_hypotheses": ["alert"]}, "domain_hypotheses"),
+    ({"scenario_to_file": {}}, "command_hypotheses"),
+    (["command_hypotheses"], "Intent 설정"),
+])
+def test_rejects_malformed_config(base, data, fragment):
+    with pytest.raises(ValueError, match=fragment.replace("[", r"\[").replace("]", r"\]")):
+        IntentConfig.from_dict(data, previous=base)
+
+
+def test_partial_reload_keeps_previous_sections(base):
+    config = IntentConfig.from_dict({
+        "command_hypotheses": {"alert.broadcast": _intent(keywords=["경보", "방송", "송출"])},
+    }, previous=base)
+
+    assert config.scenario_to_file == {"시험": "A.wav"}
+    assert config.domain_hypotheses == base.domain_hypotheses
+    assert config.rebuilt == ["alert.broadcast"]
+    assert "송출" in config.derived["alert.broadcast"].keywords
+
+
+def test_explicit_sections_replace_previous(base):
+    config = IntentConfig.from_dict({
+        "command_hypotheses": {"alert.broadcast": _intent()},
+        "scenario_to_file": {},
+        "domain_hypotheses": {},
+    }, previous=base)
+
+    assert config.scenario_to_file == {}
+    assert config.domain_hypotheses == {}
+    assert config.rebuilt == []
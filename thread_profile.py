@@ -0,0 +1,81 @@
+import json
+import os
+from utils import log
+
+"""
+    CPU 스레드 프로파일
+
+    역할:
+        - tune_threads.py가 이 장비에서 고른 스레드/워커/배치 설정을 JSON으로 저장
+        - 엔진과 서버가 시작할 때 읽어 적용 (파일이 없으면 기존 기본값 그대로)
+
+    항목:
+        torch_threads:          torch 연산자 내부(intra-op) 스레드 수
+        torch_interop_threads:  torch inter-op 스레드 수 (프로세스에서 첫 병렬 연산 전에만 설정 가능)
+        tokenizers_parallelism: HF tokenizers 내부 병렬화 (요청 스레드가 여럿이면 보통 끔)
+        stage_workers:          parse_text 단계 실행 스레드 수
+        request_workers:        동시에 parse_text를 실행할 최대 요청 수 (서버 동시성 상한)
+        nli_batch_size:         로컬 NLI 순전파 1회에 넣을 최대 문장쌍 수 (None = 전부)
+
+    파일 위치: thread_profile_path 인자 > NLU_THREAD_PROFILE 환경 변수 > ./thread_profile.json
+"""
+
+DEFAULT_PROFILE_PATH = "thread_profile.json"
+KEYS = ("torch_threads", "torch_interop_threads", "tokenizers_parallelism",
+        "stage_workers", "request_workers", "nli_batch_size")
+
+
+def profile_path(path: str = None) -> str:
+    return path or os.getenv("NLU_THREAD_PROFILE") or DEFAULT_PROFILE_PATH
+
+
+def load_profile(path: str = None):
+    """
+    Returns:
+        dict 또는 None (파일 없음)
+
+    Raises:
+        ValueError: 알 수 없는 항목
+    """
+    path = profile_path(path)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    profile = data.get("profile", data)
+    unknown = [key for key in profile if key not in KEYS]
+    if unknown:
+        raise ValueError(f"스레드 프로파일 알 수 없는 항목: {unknown}")
+    log(f"🧵 스레드 프로파일 로드: {path} {profile}")
+    return profile
+
+
+def save_profile(profile: dict, path: str = None, report: dict = None):
+    """profile + (선택) 튜닝 리포트 저장"""
+    data = {"profile": profile}
+    if report is not None:
+        data["report"] = report
+    with open(profile_path(path), "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def apply_runtime(profile: dict):
+    """
+    프로세스 전역 설정 적용 (torch 스레드 수, tokenizers 병렬화)
+
+    - inter-op 스레드 수는 첫 병렬 연산 이후에는 바꿀 수 없으므로 실패하면 경고만 출력
+    """
+    import torch
+
+    if profile.get("tokenizers_parallelism") is not None:
+        os.environ["TOKENIZERS_PARALLELISM"] = "true" if profile["tokenizers_parallelism"] else "false"
+
+    if profile.get("torch_threads"):
+        torch.set_num_threads(int(profile["torch_threads"]))
+
+    if profile.get("torch_interop_threads"):
+        try:
+            torch.set_num_interop_threads(int(profile["torch_interop_threads"]))
+        except RuntimeError as e:
+            log(f"⚠️ inter-op 스레드 수 설정 불가 (이미 병렬 연산 시작됨): {e}")
@@ -0,0 +1,97 @@
+import glob
+import json
+import os
+import threading
+from utils import log
+
+"""
+    /process 트래픽 캡처 (회전 JSONL)
+
+    역할:
+        - 요청마다 도착 시각 / 텍스트 / 예산 / 결과 / 상태 코드 / 처리 시간을 한 줄로 기록
+        - 결과는 비교에 필요한 intent, slots, file, error 만 남겨 작게 유지 (timing 등 제외)
+        - 파일이 max_bytes를 넘으면 path.1, path.2 ... 로 밀어내고 backups 개수만 유지
+        - replay_traffic.py가 읽어 같은 간격(또는 배속)으로 서버에 다시 보냄
+
+    레코드 형식:
+        {"t": 1700000000.123, "text": "경보국 시험 방송 시작", "budget_ms": null,
+         "status": 200, "ms": 812.4, "result": {"intent": "...", "slots": {...}}}
+        (대화 세션 키가 있는 요청은 "client_id" 포함)
+"""
+
+RESULT_KEYS = ("intent", "slots", "file", "error")
+
+
+def compact_result(command: dict) -> dict:
+    """비교에 필요한 필드만 남긴 결과"""
+    return {key: command[key] for key in RESULT_KEYS if key in command}
+
+
+class TrafficRecorder:
+    """
+    Args:
+        path: 캡처 파일 경로
+        max_bytes: 회전 기준 크기
+        backups: 유지할 이전 파일 수
+    """
+
+    def __init__(self, path: str, max_bytes: int = 16 * 1024 * 1024, backups: int = 5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.records = 0
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+        log(f"📼 트래픽 캡처: {path} (최대 {max_bytes // 1024}KB × {backups + 1})")
+
+    def record(self, arrived_at: float, text: str, budget_ms, status: int, elapsed_ms: float, command: dict,
+               client_id: str = None):
+        entry = {
+            "t": round(arrived_at, 3),
+            "text": text,
+            "budget_ms": budget_ms,
+            "status": status,
+            "ms": round(elapsed_ms, 1),
+            "result": compact_result(command),
+        }
+        if client_id is not None:
+            entry["client_id"] = client_id
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.records += 1
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups, 0, -1):
+            source = self.path if i == 1 else f"{self.path}.{i - 1}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i}")
+        if self.backups == 0:
+            os.remove(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def load_capture(path: str) -> list:
+    """
+    캡처 파일 읽기 (회전된 path.N 파일 포함, 도착 시각 순)
+
+    Args:
+        path: 캡처 파일 경로 (TrafficRecorder의 path)
+    """
+    records = []
+    for name in [path] + glob.glob(glob.escape(path) + ".*"):
+        if not os.path.isfile(name):
+            continue
+        with open(name, encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    records.sort(key=lambda r: r["t"])
+    return records
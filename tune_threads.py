@@ -0,0 +1,154 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils import log
+from thread_profile import apply_runtime, profile_path, save_profile
+
+"""
+    CPU 스레드 자동 튜너
+
+    역할:
+        - 이 장비에서 UniversalNluEngine.parse_text를 설정 조합별로 벤치마크
+            torch_threads   : torch intra-op 스레드 수
+            request_workers : 동시에 처리할 요청 수 (서버 동시성 상한)
+            stage_workers   : parse_text 단계 실행 스레드 수
+            nli_batch_size  : 로컬 NLI 순전파 1회에 넣을 문장쌍 수
+        - 처리량이 가장 높은 조합을 고름 (--max-p95-ms 지정 시 p95 지연이 그 안인 조합 중에서)
+        - thread_profile.json으로 저장 → 엔진/서버가 시작할 때 적용
+
+    참고:
+        - torch_threads × request_workers 가 코어 수를 넘는 조합은 과다 구독이라 건너뜀
+        - inter-op 스레드 수는 프로세스당 한 번만 설정 가능해서 벤치마크하지 않고,
+          요청 동시성을 파이썬 스레드로 얻으므로 1로 고정
+        - 요청 스레드가 여럿이면 tokenizers 내부 병렬화는 끔 (스레드 과다 구독 방지)
+
+    사용법:
+        python tune_threads.py --rounds 3 --max-p95-ms 2000
+"""
+
+
+def _candidates(cores: int) -> list:
+    values, n = [], 1
+    while n < cores:
+        values.append(n)
+        n *= 2
+    values.append(cores)
+    return values
+
+
+def _percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * q))], 2) if values else 0.0
+
+
+def benchmark(engine, texts: list, request_workers: int, rounds: int) -> dict:
+    """현재 엔진 설정으로 texts × rounds 를 request_workers 동시성으로 처리"""
+    latencies = []
+
+    def run(text):
+        start = time.perf_counter()
+        engine.parse_text(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    workload = texts * rounds
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=request_workers) as executor:
+        list(executor.map(run, workload))
+    wall = time.perf_counter() - started
+
+    return {
+        "throughput_rps": round(len(workload) / wall, 3),
+        "p50_ms": _percentile(latencies, 0.5),
+        "p95_ms": _percentile(latencies, 0.95),
+    }
+
+
+def tune(engine, texts: list, cores: int = None, rounds: int = 2, max_p95_ms: float = None,
+         batch_sizes=(None, 8), stage_workers=(2, 4)) -> tuple:
+    """
+    설정 조합 탐색
+
+    Returns:
+        (profile, report)
+    """
+    import torch
+
+    cores = cores or os.cpu_count() or 1
+    results = []
+
+    # 첫 조합이 모델 초기화 비용을 떠안지 않도록 한 번 돌려 둠
+    benchmark(engine, texts[:1], 1, 1)
+
+    for threads in _candidates(cores):
+        torch.set_num_threads(threads)
+        for workers in _candidates(cores):
+            if threads * workers > cores:
+                continue
+            os.environ["TOKENIZERS_PARALLELISM"] = "true" if workers == 1 else "false"
+            for stages in stage_workers:
+                engine.set_stage_workers(stages)
+                for batch in batch_sizes:
+                    engine.nli_batch_size = batch
+                    row = {
+                        "torch_threads": threads,
+                        "request_workers": workers,
+                        "stage_workers": stages,
+                        "nli_batch_size": batch,
+                        **benchmark(engine, texts, workers, rounds),
+                    }
+                    results.append(row)
+                    log(f"🧵 {row}")
+
+    eligible = [r for r in results if max_p95_ms is None or r["p95_ms"] <= max_p95_ms] or results
+    best = max(eligible, key=lambda r: (r["throughput_rps"], -r["p95_ms"]))
+
+    profile = {
+        "torch_threads": best["torch_threads"],
+        "torch_interop_threads": 1,
+        "tokenizers_parallelism": best["request_workers"] == 1,
+        "stage_workers": best["stage_workers"],
+        "request_workers": best["request_workers"],
+        "nli_batch_size": best["nli_batch_size"],
+    }
+    report = {
+        "cores": cores,
+        "texts": len(texts),
+        "rounds": rounds,
+        "max_p95_ms": max_p95_ms,
+        "expected": {key: best[key] for key in ("throughput_rps", "p50_ms", "p95_ms")},
+        "results": results,
+    }
+    return profile, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UniversalNluEngine CPU 스레드 자동 튜닝")
+    parser.add_argument("--out", default=None, help="프로파일 저장 경로 (기본: NLU_THREAD_PROFILE 또는 thread_profile.json)")
+    parser.add_argument("--cores", type=int, default=None, help="사용할 코어 수 (기본: 전체)")
+    parser.add_argument("--rounds", type=int, default=2, help="조합마다 예문 목록 반복 횟수")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="허용 p95 지연 (ms)")
+    parser.add_argument("--batch-sizes", default="all,8", help="NLI 배치 크기 후보 (all = 전부 한 번에)")
+    parser.add_argument("--stage-workers", default="2,4", help="단계 실행 스레드 수 후보")
+    args = parser.parse_args()
+
+    # inter-op 스레드는 모델 로드 전에 고정 (기존 프로파일의 나머지 항목은 조합마다 덮어씀)
+    apply_runtime({"torch_interop_threads": 1})
+    from ai_nlu_engine import UniversalNluEngine
+    engine = UniversalNluEngine()
+
+    texts = [example for config in engine.COMMAND_HYPOTHESES.values() for example in config.get("examples", [])]
+    batch_sizes = tuple(None if v == "all" else int(v) for v in args.batch_sizes.split(","))
+    stage_workers = tuple(int(v) for v in args.stage_workers.split(","))
+
+    profile, report = tune(engine, texts, args.cores, args.rounds, args.max_p95_ms, batch_sizes, stage_workers)
+    save_profile(profile, args.out, report)
+
+    log(f"✅ 선택된 프로파일: {profile}")
+    log(f"   예상 처리량 {report['expected']['throughput_rps']} req/s, "
+        f"p50 {report['expected']['p50_ms']}ms, p95 {report['expected']['p95_ms']}ms")
+    log(f"💾 저장: {profile_path(args.out)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import re
+
+"""
+    요청 1건의 정규화된 발화
+
+    역할:
+        - parse_text 시작 시 한 번 만들어 모든 단계(키워드 / Intent / 정규식 슬롯 / 슬롯 NLU)가 공유
+        - 원문(raw)과 정규화 텍스트(text)만 바로 보관
+        - 숫자 언급(numbers)과 그 밖의 파생 값(키워드 후보, 슬롯 정규식 결과 등)은
+          memo()로 처음 요청될 때 한 번만 계산 (쓰지 않는 요청은 비용 없음)
+          (요청 하나 안에서는 Intent 설정이 고정되므로 설정에 의존하는 값도 재사용 가능)
+
+    주의:
+        - 단계들이 여러 스레드에서 동시에 읽음. memo()는 같은 키를 두 스레드가 동시에 처음 계산하면
+          둘 다 계산할 수 있지만 결과가 같으므로 어느 쪽이 남아도 무방함
+"""
+
+_NUMBER = re.compile(r'\d+')
+
+
+class Utterance:
+    __slots__ = ("raw", "text", "_memo")
+
+    def __init__(self, raw: str, text: str = None):
+        """
+        Args:
+            raw: 원문
+            text: 정규화된 텍스트 (생략 시 원문을 그대로 사용)
+        """
+        self.raw = raw
+        self.text = raw if text is None else text
+        self._memo = {}
+
+    @property
+    def numbers(self) -> list:
+        """숫자 언급 [(값, 시작, 끝)] - 정규화 텍스트 기준 위치"""
+        return self.memo("numbers", lambda: [(int(m.group(0)), m.start(), m.end()) for m in _NUMBER.finditer(self.text)])
+
+    @classmethod
+    def of(cls, value):
+        """Utterance는 그대로, 문자열은 (이미 정규화된 것으로 보고) 감싸서 반환"""
+        return value if isinstance(value, Utterance) else cls(value)
+
+    def memo(self, key, compute):
+        """파생 값 지연 계산 + 재사용"""
+        try:
+            return self._memo[key]
+        except KeyError:
+            value = self._memo[key] = compute()
+            return value
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"Utterance({self.text!r})"